@@ -18,12 +18,11 @@ do
        done
 done
 
-# copy images, js, css, 3rd_party
-cp -Rf 3rd_party display
-cp -Rf css display
+# copy images and html pages
+# (js, css and 3rd_party are published with fingerprinted names by the
+# reporting, see general.static in reporting.yaml)
 cp -Rf html/* display
 cp -Rf img display
-cp -Rf js display
 
 # if nothing is precised run all the reporting generation
 #  projet   |        option
@@ -42,7 +41,7 @@ function report_project()
   echo "********************************"
   echo " $project reporting "
   echo "********************************"
-  python ./reporting/$dir/reporting-$type.py
+  python -m reporting.cli $type
   if [ $? ]; then
     echo "$project reporting $type...OK"
   else
@@ -0,0 +1,46 @@
+// ******************************************
+// Status page of an installer
+// the gauges and the trend lines are static
+// SVG rendered with the page, they are
+// replaced by animated d3 charts when d3,
+// gauge.js and trend.js are bundled too:
+// each testcase row gives the score of its
+// gauge and the [date, score] trend file of
+// its trend line in its data attributes
+// ******************************************
+var statusPage = function() {
+  if (typeof d3 !== "undefined" && typeof gauge === "function" &&
+      typeof trend === "function") {
+    d3.selectAll(".testcase").each(function() {
+      var row = this;
+      var gaugeContainer = row.querySelector(".gauge-testcase");
+      gaugeContainer.innerHTML = "";
+      var gaugeTestcase = gauge(gaugeContainer);
+      gaugeTestcase.update(+row.getAttribute("data-score"));
+
+      d3.json(row.getAttribute("data-trend"), function(data) {
+        if (!data) {
+          return;
+        }
+        var trendContainer = row.querySelector(".trend-testcase");
+        trendContainer.innerHTML = "";
+        trend(trendContainer, data.map(function(d) {
+          return {date: parseDate(d[0]), score: +d[1]};
+        }));
+      });
+    });
+  }
+
+  if (typeof $ !== "undefined") {
+    $(".btn-more").click(function() {
+      $(this).hide();
+      $(this).parent().find(".panel-default").show();
+    });
+  }
+};
+
+if (document.readyState === "complete") {
+  statusPage();
+} else {
+  window.addEventListener("load", statusPage, false);
+}
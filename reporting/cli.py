@@ -0,0 +1,189 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Reporting command line
+
+  Single entry point of the reporting:
+      reporting status [--version VERSION] [--installer INSTALLER]
+      reporting export-csv [--version VERSION] [--installer INSTALLER]
+      reporting export-pdf [--version VERSION] [--installer INSTALLER]
+      reporting serve [--port PORT]
+
+  The configuration is read from --config or CONFIG_REPORTING_YAML.
+  --testapi-cache replay generates the outputs from the recorded
+  TestAPI answers only, without network access (see testapi.cache).
+  The modules of a command, and their dependencies (requests, jinja2,
+  pdfkit, tornado), are imported only when the command runs so that the
+  command line starts quickly.
+"""
+import argparse
+import os
+
+CONFIG_VARIABLE = "CONFIG_REPORTING_YAML"
+TESTAPI_CACHE_VARIABLE = "TESTAPI_CACHE_MODE"
+TESTAPI_CACHE_MODES = ("revalidate", "record", "replay")
+
+
+class SelectionError(ValueError):
+    """
+    The selected versions or installers are not configured
+    """
+
+
+def get_selection(args):
+    """
+    Get the versions and the installers selected on the command line,
+    all the configured ones by default
+    """
+    import reporting.utils.reporting_utils as rp_utils
+    selection = []
+    for name, selected in (('versions', args.version),
+                           ('installers', args.installer)):
+        configured = rp_utils.get_config('general.' + name)
+        unknown = [value for value in selected or []
+                   if value not in configured]
+        if unknown:
+            raise SelectionError("Unknown %s %s, configured %s: %s" % (
+                name, ", ".join(unknown), name, ", ".join(configured)))
+        selection.append(selected or configured)
+    return selection
+
+
+def run_status(args):
+    """
+    Generate the status pages, history and trend files
+    """
+    from reporting.functest import reporting_status
+    versions, installers = get_selection(args)
+    for page in reporting_status.StatusRun(versions, installers).run():
+        print(page)
+    return 0
+
+
+def run_export_csv(args):
+    """
+    Export the history of the selected versions and installers
+    """
+    import reporting.utils.history_store as history_store
+    import reporting.utils.reporting_utils as rp_utils
+    versions, installers = get_selection(args)
+    display_dir = rp_utils.get_config('general.static.display_dir')
+    history = history_store.HistoryStore(
+        rp_utils.get_config('general.history.db'))
+    try:
+        for version in versions:
+            directory = os.path.join(display_dir, version, "functest")
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            outputs = [(os.path.join(directory, "testcases_history.txt"),
+                        None, None)]
+            outputs.extend((os.path.join(
+                directory, "scenario_history_%s.csv" % installer), installer,
+                            history_store.SCENARIO_HISTORY_HEADER)
+                           for installer in installers)
+            for csv_file, installer, header in outputs:
+                history.export_csv(csv_file, version, installer,
+                                   header=header)
+                print(csv_file)
+    finally:
+        history.close()
+    return 0
+
+
+def run_export_pdf(args):
+    """
+    Export the status pages of the selection to PDF
+    """
+    import reporting.functest.status as status
+    import reporting.utils.pdf_export as pdf_export
+    import reporting.utils.reporting_utils as rp_utils
+    versions, installers = get_selection(args)
+    display_dir = rp_utils.get_config('general.static.display_dir')
+    pages = [status.get_page_path(version, installer, display_dir)
+             for version in versions for installer in installers]
+    statuses = pdf_export.export_pages(
+        [page for page in pages if os.path.exists(page)],
+        rp_utils.get_config('general.pdf.manifest'),
+        assets=rp_utils.get_config('general.pdf.assets'),
+        options=rp_utils.get_config('general.pdf.options'),
+        nb_processes=rp_utils.get_config('general.pdf.nb_processes'))
+    for page, pdf_status in statuses:
+        print("%s %s" % (pdf_export.get_pdf_path(page), pdf_status))
+    return int(any(pdf_status == pdf_export.FAILED
+                   for _, pdf_status in statuses))
+
+
+def run_serve(args):
+    """
+    Run the reporting service
+    """
+    import reporting.server.app as app
+    import reporting.utils.reporting_utils as rp_utils
+    app.serve(args.port or rp_utils.get_config('service.port'))
+    return 0
+
+
+def get_parser():
+    """
+    Get the parser of the command line
+    """
+    parser = argparse.ArgumentParser(prog="reporting",
+                                     description="ONAP test reporting")
+    parser.add_argument("--config",
+                        help="reporting configuration file "
+                        "(default: $%s)" % CONFIG_VARIABLE)
+    parser.add_argument("--testapi-cache", choices=TESTAPI_CACHE_MODES,
+                        help="mode of the cache of the TestAPI answers "
+                        "(default: testapi.cache.mode)")
+    subparsers = parser.add_subparsers(title="commands")
+    for name, func in (("status", run_status),
+                       ("export-csv", run_export_csv),
+                       ("export-pdf", run_export_pdf)):
+        subparser = subparsers.add_parser(name, help=func.__doc__.strip())
+        subparser.add_argument("--version", action="append",
+                               help="version to process (default: all), "
+                               "may be repeated")
+        subparser.add_argument("--installer", action="append",
+                               help="installer to process (default: all), "
+                               "may be repeated")
+        subparser.set_defaults(func=func)
+    subparser = subparsers.add_parser("serve",
+                                      help=run_serve.__doc__.strip())
+    subparser.add_argument("--port", type=int,
+                           help="port of the service (default: service.port)")
+    subparser.set_defaults(func=run_serve)
+    return parser
+
+
+def main(argv=None):
+    """
+    Run a command of the reporting
+    """
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.config:
+        os.environ[CONFIG_VARIABLE] = args.config
+    if args.testapi_cache:
+        os.environ[TESTAPI_CACHE_VARIABLE] = args.testapi_cache
+    if not os.environ.get(CONFIG_VARIABLE):
+        parser.error("no configuration, use --config or set %s" %
+                     CONFIG_VARIABLE)
+
+    import reporting.utils.reporting_utils as rp_utils
+    rp_utils.getLogger("ONAP-Reporting")
+    try:
+        return args.func(args)
+    except (SelectionError, rp_utils.ConfigError) as exc:
+        # the other errors of a run are not usage errors
+        parser.error(str(exc))
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
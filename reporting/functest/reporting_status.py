@@ -0,0 +1,468 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Functest reporting status
+
+  Generation of the static status pages, the history and the trend
+  files of the testcases of all the versions and installers, or of a
+  single version or installer, run by:
+      reporting status [--version VERSION] [--installer INSTALLER]
+  The results pushed to the reporting service are ingested by StatusRun
+  too, generating the outputs of their cells only.
+"""
+import datetime
+import logging
+import os
+
+import reporting.functest.status as status
+import reporting.functest.testCase as tc
+import reporting.utils.bundle as bundle
+import reporting.utils.cell_stats as cell_stats
+import reporting.utils.history_store as history_store
+import reporting.utils.manifest as manifest
+import reporting.utils.metrics as metrics
+import reporting.utils.render as render
+import reporting.utils.reporting_utils as rp_utils
+import reporting.utils.static_output as static_output
+import reporting.utils.trend as trend
+
+# tag of the lines of the former reporting-status.py script
+LOGGER = logging.getLogger("ONAP-Functest-Status")
+
+
+class StatusRun(object):
+    """
+    Generation of the outputs of a selection of versions and installers
+
+    only the outputs whose inputs changed since the last run are
+    generated again
+    """
+
+    def __init__(self, versions=None, installers=None):
+        self.date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.period = rp_utils.get_config('general.period')
+        self.versions = versions or rp_utils.get_config('general.versions')
+        self.installers = (installers or
+                           rp_utils.get_config('general.installers'))
+        self.testcases = rp_utils.get_config('functest.test_list')
+        self.constraints = tc.ConstraintIndex(
+            rp_utils.get_config('functest.constraints'))
+        self.display_dir = rp_utils.get_config('general.static.display_dir')
+        self.manifest = manifest.Manifest(
+            rp_utils.get_config('general.manifest'))
+        self.template_hash = manifest.get_file_hash(
+            os.path.join(render.TEMPLATE_DIR, status.TEMPLATE_NAME))
+        self.config_hash = manifest.get_file_hash(
+            rp_utils.get_reporting_config().config_file)
+        self.stats = cell_stats.StatsStore(
+            rp_utils.get_config('general.stats.file'),
+            rp_utils.get_config('general.stats.windows'),
+            rp_utils.get_config('general.store.overlap'))
+        self.assets = {}
+        self.results = {}
+        self.history = None
+
+    def log_banner(self):
+        """
+        Log the settings of the run
+        """
+        LOGGER.info("*******************************************")
+        LOGGER.info("*                                         *")
+        LOGGER.info("*   Generating reporting scenario status  *")
+        LOGGER.info("*   Data retention: %s days               *",
+                    self.period)
+        LOGGER.info("*   Log level: %s                         *",
+                    rp_utils.get_config('general.log.log_level'))
+        LOGGER.info("*   Version: %s                           *",
+                    self.versions)
+        LOGGER.info("*   Installers! %s                        *",
+                    self.installers)
+        LOGGER.info("*******************************************")
+
+    def fetch(self):
+        """
+        Fetch stage: retrieve the results of all the cells concurrently
+        """
+        queries = status.get_queries(self.versions, self.installers,
+                                     self.testcases, self.constraints)
+        LOGGER.info("Retrieve results for %s queries", len(queries))
+        cache = rp_utils.get_testapi_client().cache
+        if cache is not None:
+            LOGGER.info("TestAPI answers cached in %s (%s)", cache.cache_dir,
+                        cache.mode)
+            if not cache.replay:
+                LOGGER.info("%s unused TestAPI answers removed", cache.prune(
+                    rp_utils.get_config('testapi.cache.retention'),
+                    rp_utils.get_config('testapi.cache.max_size')))
+        with metrics.span('fetch_all'):
+            self.results = rp_utils.getApiResultsPool(
+                queries, store=rp_utils.get_result_store(),
+                batch=rp_utils.get_config('testapi.batch'))
+
+    def publish_assets(self):
+        """
+        CSS/JS of the pages bundled with the vendored libraries then
+        published with fingerprinted names
+        """
+        try:
+            for output in bundle.build(rp_utils.get_reporting_config()):
+                LOGGER.info("Bundle generated: %s", output)
+        except bundle.BundleError as exc:
+            LOGGER.warning("Bundles built without the libraries not "
+                           "vendored (python -m reporting.utils.bundle): "
+                           "%s", exc)
+        self.assets = static_output.publish_assets(
+            rp_utils.get_config('general.static.assets'), self.display_dir)
+
+    def get_history_file(self, version):
+        """
+        Path of the testcases_history.txt file of a version
+        """
+        return os.path.join(self.display_dir, version, "functest",
+                            "testcases_history.txt")
+
+    def open_history(self):
+        """
+        Open the history of the scores, the history files of the
+        previous runs are imported then older scores than the retention
+        are removed
+        """
+        self.history = history_store.HistoryStore(
+            rp_utils.get_config('general.history.db'))
+        for version in self.versions:
+            # import the scenario file of the previous runs in the history
+            history_file = self.get_history_file(version)
+            if (not self.history.has_history(version) and
+                    os.path.isfile(history_file)):
+                LOGGER.info("Import %s history entries from %s",
+                            self.history.import_history_file(
+                                version, history_file),
+                            history_file)
+        oldest = (datetime.datetime.now() - datetime.timedelta(
+            days=rp_utils.get_config('general.history.retention'))).strftime(
+                "%Y-%m-%d %H:%M")
+        LOGGER.info("Prune %s history entries older than %s",
+                    self.history.prune(oldest), oldest)
+
+    def generate_cell(self, version, installer, testcase):
+        """
+        Score a cell, save it in the history and export its trend
+        return the result of the testcase and the fingerprints of the
+        content of the cell (results and trend line) and of its history
+        (None for the cells not applicable, without history)
+        """
+        if not self.constraints.is_applicable(version, installer, testcase):
+            LOGGER.info("%s not applicable", testcase)
+            metrics.incr('cells_not_applicable', version=version,
+                         installer=installer)
+            return (status.get_not_applicable_result(),
+                    manifest.get_fingerprint("not applicable"), None)
+        LOGGER.info("Search for results for %s", testcase)
+        scenario_directory = os.path.join(self.display_dir, version,
+                                          "functest/")
+        # get the score on the last 10 days
+        # and the score considering the last 4 CI runs
+        query_results = self.results[(testcase, installer, version, False)]
+        cell_labels = {'version': version, 'installer': installer,
+                       'testcase': testcase}
+        with metrics.span('score', **cell_labels):
+            testcase_result = status.get_testcase_result(
+                testcase, installer, version, query_results)
+        if not isinstance(query_results, Exception):
+            # only the results newer than the last run are applied
+            with metrics.span('stats', **cell_labels):
+                testcase_result['stats'] = self.stats.update(
+                    (version, installer, testcase), query_results['results'])
+
+        # the history and the trend of a cell change only with its results
+        cell = "/".join((version, installer, testcase))
+        cell_fingerprint = manifest.get_results_fingerprint(query_results)
+        history_fingerprint = manifest.get_fingerprint(self.config_hash,
+                                                       cell_fingerprint)
+        if self.manifest.is_changed("history:" + cell, history_fingerprint):
+            # Save daily results in the history
+            with metrics.span('write', output='history', **cell_labels):
+                self.history.add(version, installer, testcase, self.date,
+                                 testcase_result['result_4'],
+                                 testcase_result['result_percent'])
+            self.manifest.update("history:" + cell, history_fingerprint)
+
+        # and the trend line slice of the status page, moving with the
+        # trend window
+        trend_window = rp_utils.get_config('general.trend.window')
+        trend_file = trend.get_trend_file_name(installer, testcase)
+        trend_fingerprint = manifest.get_fingerprint(
+            history_fingerprint, trend.get_window_start(trend_window)[:10])
+        if self.manifest.is_changed(scenario_directory + trend_file,
+                                    trend_fingerprint,
+                                    scenario_directory + trend_file):
+            with metrics.span('write', output='trend', **cell_labels):
+                trend.export_trend(
+                    self.history, scenario_directory, version, installer,
+                    testcase, trend_window,
+                    rp_utils.get_config('general.trend.max_points'))
+            self.manifest.update(scenario_directory + trend_file,
+                                 trend_fingerprint)
+        testcase_result['trend_file'] = trend_file
+        # the trend line is drawn in the page
+        return (testcase_result,
+                manifest.get_fingerprint(cell_fingerprint, trend_fingerprint),
+                history_fingerprint)
+
+    def generate_page(self, version, installer):
+        """
+        Generate the history and the trends of the cells of an installer
+        return the render job of its page, None if its inputs did not
+        change, and the fingerprints of the history of its cells
+        """
+        LOGGER.info("Search for installer %s...............", installer)
+        scenario_directory = os.path.join(self.display_dir, version,
+                                          "functest/")
+        page_path = status.get_page_path(version, installer,
+                                         self.display_dir)
+        testcase_results = {}
+        cell_fingerprints = []
+        history_fingerprints = []
+        for testcase in self.testcases:
+            (testcase_results[testcase], cell_fingerprint,
+             history_fingerprint) = self.generate_cell(
+                 version, installer, testcase)
+            cell_fingerprints.append(cell_fingerprint)
+            if history_fingerprint is not None:
+                history_fingerprints.append(history_fingerprint)
+
+        # the page is rendered once all the results are computed
+        page_fingerprint = manifest.get_fingerprint(
+            self.template_hash, self.config_hash, self.assets,
+            cell_fingerprints)
+        if not self.manifest.is_changed(page_path, page_fingerprint,
+                                        page_path):
+            return None, history_fingerprints
+        for testcase, testcase_result in testcase_results.items():
+            if testcase_result.get('applicable', True):
+                testcase_result['trend'] = trend.load_trend(
+                    scenario_directory, installer, testcase)
+        self.manifest.update(page_path, page_fingerprint)
+        return ((status.TEMPLATE_NAME, page_path,
+                 status.get_page_context(testcase_results, installer,
+                                         self.period, version, self.date,
+                                         self.assets)),
+                history_fingerprints)
+
+    def generate_version(self, version):
+        """
+        Generate the history and the trends of the cells of a version
+        return the render jobs of its pages whose inputs changed
+        """
+        LOGGER.info("Search for version %s...............", version)
+        scenario_directory = os.path.join(self.display_dir, version,
+                                          "functest/")
+        scenario_file_name = self.get_history_file(version)
+        # check that the directory exists, if not create it
+        # (first run on new version)
+        if not os.path.exists(scenario_directory):
+            os.makedirs(scenario_directory)
+
+        render_jobs = []
+        history_fingerprints = []
+        for installer in self.installers:
+            render_job, page_history_fingerprints = self.generate_page(
+                version, installer)
+            if render_job is not None:
+                render_jobs.append(render_job)
+            history_fingerprints.extend(page_history_fingerprints)
+
+        # Export the history of the version
+        csv_fingerprint = manifest.get_fingerprint(history_fingerprints)
+        if self.manifest.is_changed(scenario_file_name, csv_fingerprint,
+                                    scenario_file_name):
+            with metrics.span('write', output='csv', version=version):
+                self.history.export_csv(scenario_file_name, version)
+            self.manifest.update(scenario_file_name, csv_fingerprint)
+            LOGGER.debug("Scenario file exported: %s", scenario_file_name)
+        return render_jobs
+
+    def render(self, render_jobs, nb_processes=None):
+        """
+        Render stage: render all the pages in parallel
+        """
+        if nb_processes is None:
+            nb_processes = rp_utils.get_config('general.render.nb_processes')
+        with metrics.span('render_all'):
+            pages = render.render_pages(
+                render_jobs,
+                nb_processes=nb_processes,
+                cache_dir=rp_utils.get_config('general.render.cache_dir'))
+        for page in pages:
+            LOGGER.debug("Page generated: %s", page)
+        return pages
+
+    @staticmethod
+    def export_pdf(pages):
+        """
+        PDF stage: export the pages which changed since their last export
+        """
+        # pdfkit is only needed when the PDF export is enabled
+        import reporting.utils.pdf_export as pdf_export
+
+        with metrics.span('pdf_all'):
+            pdf_statuses = pdf_export.export_pages(
+                pages,
+                rp_utils.get_config('general.pdf.manifest'),
+                assets=rp_utils.get_config('general.pdf.assets'),
+                options=rp_utils.get_config('general.pdf.options'),
+                nb_processes=rp_utils.get_config('general.pdf.nb_processes'))
+        for page, pdf_status in pdf_statuses:
+            LOGGER.info("PDF of %s %s", page, pdf_status)
+            metrics.incr('pdf', status=pdf_status)
+
+    def precompress(self):
+        """
+        Precompress the outputs which changed for nginx gzip_static
+        """
+        with metrics.span('precompress_all'):
+            LOGGER.info("%s files precompressed",
+                        len(static_output.precompress_tree(
+                            self.display_dir,
+                            rp_utils.get_config('general.static.brotli'))))
+
+    def write_metrics(self):
+        """
+        Timing and metrics of the run, written last (and compressed on
+        their own) so that they cover the whole run
+        """
+        metrics.incr('outputs_skipped', len(self.manifest.skipped))
+        for stage, stage_summary in sorted(
+                metrics.METRICS.get_stages().items()):
+            LOGGER.info("Stage %s: %.3fs (%s spans, max %.3fs)", stage,
+                        stage_summary['total'], stage_summary['count'],
+                        stage_summary['max'])
+        for metrics_file, write in (
+                (rp_utils.get_config('general.metrics.summary'),
+                 metrics.METRICS.write_summary),
+                (rp_utils.get_config('general.metrics.prometheus'),
+                 metrics.METRICS.write_prometheus)):
+            if not metrics_file:
+                continue
+            if not os.path.exists(os.path.dirname(metrics_file)):
+                os.makedirs(os.path.dirname(metrics_file))
+            write(metrics_file)
+            if (rp_utils.get_config('general.static.precompress') and
+                    metrics_file.endswith(
+                        static_output.COMPRESSED_EXTENSIONS)):
+                static_output.precompress_file(
+                    metrics_file,
+                    rp_utils.get_config('general.static.brotli'))
+
+    def is_reported(self, version, installer, testcase):
+        """
+        Whether a cell is in the status pages of the selection
+        """
+        return (version in self.versions and installer in self.installers
+                and testcase in self.testcases and
+                self.constraints.is_applicable(version, installer, testcase))
+
+    def ingest(self, results):
+        """
+        Generate the outputs of the cells of results pushed by CI jobs
+
+        the results are added to the result store, only the history and
+        the trend of their cells and the pages of their installers are
+        generated again, the other cells of the pages being scored from
+        the store; the results of the cells not reported are ignored
+        return the ingested (version, installer, testcase) cells and the
+        rendered pages
+        raise a ValueError if a result is not valid or without store
+        """
+        store = rp_utils.get_result_store()
+        if store is None:
+            raise ValueError("No result store to ingest the results in, "
+                             "see general.store.dir")
+        cells = {}
+        for result in results:
+            cell = status.get_result_cell(result)
+            if self.is_reported(*cell):
+                cells.setdefault(cell, []).append(result)
+            else:
+                LOGGER.warning("Result of %s not reported, ignored",
+                               "/".join(cell))
+                metrics.incr('results_ignored')
+        fields = None
+        if rp_utils.get_config('testapi.streaming'):
+            # stored like the results retrieved from the TestAPI
+            fields = rp_utils.get_config('testapi.fields')
+        for (version, installer, testcase), cell_results in cells.items():
+            if fields is not None:
+                cell_results = [dict((field, result.get(field))
+                                     for field in fields)
+                                for result in cell_results]
+            rp_utils.addStoredResults(testcase, installer, version,
+                                      cell_results, store)
+            metrics.incr('results_ingested', len(cell_results))
+
+        self.assets = static_output.load_assets(self.display_dir)
+        self.history = history_store.HistoryStore(
+            rp_utils.get_config('general.history.db'))
+        render_jobs = []
+        try:
+            for version, installer in sorted(set(
+                    cell[:2] for cell in cells)):
+                scenario_directory = os.path.join(self.display_dir, version,
+                                                  "functest/")
+                if not os.path.exists(scenario_directory):
+                    os.makedirs(scenario_directory)
+                self.results = dict(
+                    (query, rp_utils.loadStoredResults(*query, store=store))
+                    for query in status.get_queries(
+                        [version], [installer], self.testcases,
+                        self.constraints))
+                render_job, _ = self.generate_page(version, installer)
+                if render_job is not None:
+                    render_jobs.append(render_job)
+        finally:
+            self.history.close()
+        # a few pages, rendered by the process
+        pages = self.render(render_jobs, nb_processes=1)
+        self.manifest.save()
+        self.stats.save()
+        if rp_utils.get_config('general.static.precompress'):
+            for version in set(cell[0] for cell in cells):
+                static_output.precompress_tree(
+                    os.path.join(self.display_dir, version, "functest"),
+                    rp_utils.get_config('general.static.brotli'))
+        return sorted(cells), pages
+
+    def run(self):
+        """
+        Generate all the outputs of the selection
+        return the list of the rendered pages
+        """
+        self.log_banner()
+        self.fetch()
+        self.publish_assets()
+        self.open_history()
+        render_jobs = []
+        try:
+            for version in self.versions:
+                render_jobs.extend(self.generate_version(version))
+        finally:
+            self.history.close()
+        pages = self.render(render_jobs)
+        self.manifest.save()
+        self.stats.save()
+        LOGGER.info("%s unchanged outputs skipped",
+                    len(self.manifest.skipped))
+        for output in self.manifest.skipped:
+            LOGGER.debug("Output skipped: %s", output)
+        if rp_utils.get_config('general.pdf.enabled'):
+            self.export_pdf(pages)
+        if rp_utils.get_config('general.static.precompress'):
+            self.precompress()
+        self.write_metrics()
+        return pages
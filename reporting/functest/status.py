@@ -0,0 +1,121 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Functest status of the testcases
+
+  Shared by the static page generation (reporting status) and the
+  reporting service
+"""
+import logging
+
+import reporting.utils.reporting_utils as rp_utils
+import reporting.utils.testapi_client as testapi
+
+LOGGER = logging.getLogger(__name__)
+
+TEMPLATE_NAME = "index-status-tmpl.html"
+
+# fields of the (version, installer, testcase) cell of a result document
+CELL_FIELDS = ('version', 'installer', 'case_name')
+
+
+def get_queries(versions, installers, testcases, constraints=None):
+    """
+    Get the (case, installer, version, criteria) queries of all the cells
+    the results over the period are enough to get the score on the
+    last 10 days and the score considering the last 4 CI runs
+    the cells not applicable according to the testCase.ConstraintIndex
+    constraints are not queried
+    """
+    return [(testcase, installer, version, False)
+            for version in versions
+            for installer in installers
+            for testcase in testcases
+            if constraints is None or
+            constraints.is_applicable(version, installer, testcase)]
+
+
+def get_result_cell(result):
+    """
+    Get the (version, installer, testcase) cell of a result document
+    raise a ValueError if the document is not a result
+    """
+    if not isinstance(result, dict):
+        raise ValueError("Result is not an object: %r" % (result,))
+    missing = [field for field in CELL_FIELDS + ('start_date',)
+               if not result.get(field)]
+    if missing:
+        raise ValueError("Result without %s: %r" % (", ".join(missing),
+                                                    result))
+    return tuple(result[field] for field in CELL_FIELDS)
+
+
+def get_empty_result():
+    """
+    Result of a testcase without any result
+    """
+    return {'result_4': "0/3",
+            'result_period': "0/0",
+            'result_percent': 0}
+
+
+def get_not_applicable_result():
+    """
+    Result of a testcase which cannot run on an installer or a version
+    """
+    return {'result_4': "n/a",
+            'result_period': "n/a",
+            'result_percent': 0,
+            'applicable': False}
+
+
+def get_testcase_result(testcase, installer, version, functest_results):
+    """
+    Get the scores of a testcase from the results of its period query
+    functest_results may be the testapi_client.TestApiError of the query
+    """
+    try:
+        if isinstance(functest_results, testapi.TestApiError):
+            LOGGER.error("Results not retrieved for %s: %s",
+                         testcase, functest_results)
+            raise functest_results
+        testcase_result = rp_utils.getCaseResults(testcase,
+                                                  installer,
+                                                  version,
+                                                  functest_results)
+        LOGGER.info("Case score: %s", testcase_result['result_4'])
+    except (TypeError, testapi.TestApiError):
+        testcase_result = get_empty_result()
+
+    LOGGER.info("Nb tests OK/run over the test window period:%s",
+                testcase_result['result_period'])
+    return testcase_result
+
+
+def get_page_path(version, installer, display_dir="./display/"):
+    """
+    Path of the status page of an installer
+    """
+    return (display_dir + version + "/functest/status-" +
+            installer + ".html")
+
+
+def get_page_context(testcase_results, installer, period, version, date,
+                     assets=None):
+    """
+    Context of the status page template
+    assets is the {path: fingerprinted path} of the CSS/JS of the page
+    """
+    # pylint: disable=too-many-arguments
+    return {'testcase_results': testcase_results,
+            'installer': installer,
+            'period': period,
+            'version': version,
+            'date': date,
+            'assets': assets or {}}
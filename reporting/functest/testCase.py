@@ -10,6 +10,53 @@ import re
 
 # pylint: disable=missing-docstring
 
+# criteria of the constraints of a testcase
+CRITERIA = ("installer", "scenario", "version")
+
+
+def compile_constraints(constraints):
+    """
+    Compile the {criteria: regular expression} constraints of a testcase
+    the unknown criteria are ignored
+    """
+    if not constraints or not isinstance(constraints, dict):
+        return {}
+    return dict((criteria, re.compile(pattern))
+                for criteria, pattern in constraints.items()
+                if criteria in CRITERIA)
+
+
+class ConstraintIndex(object):
+    """
+    Constraints of the testcases compiled once
+
+    a (version, installer, testcase) cell is applicable if its installer
+    and its version match the constraints of its testcase, the scenario
+    constraints are not considered as the results of all the scenarios
+    are reported in the same cell
+    """
+
+    def __init__(self, constraints=None):
+        self.patterns = dict(
+            (testcase, compile_constraints(testcase_constraints))
+            for testcase, testcase_constraints in (constraints or
+                                                   {}).items())
+        self.cells = {}
+
+    def is_applicable(self, version, installer, testcase):
+        cell = (version, installer, testcase)
+        try:
+            return self.cells[cell]
+        except KeyError:
+            context = {'installer': installer, 'version': version}
+            applicable = all(
+                pattern.search(context[criteria]) is not None
+                for criteria, pattern in self.patterns.get(testcase,
+                                                           {}).items()
+                if criteria in context)
+            self.cells[cell] = applicable
+            return applicable
+
 
 class TestCase(object):
 
@@ -18,6 +65,7 @@ class TestCase(object):
         self.name = name
         self.project = project
         self.constraints = constraints
+        self.patterns = compile_constraints(constraints)
         self.criteria = criteria
         self.is_runnable = is_runnable
         self.tier = tier
@@ -71,15 +119,21 @@ class TestCase(object):
 
         # By default we assume that all the tests are always runnable...
         # if test_env not empty => dependencies to be checked
-        if config_test is not None and len(config_test) > 0:
-            # possible criteria = ["installer", "scenario"]
-            # consider test criteria from config file
-            # compare towards CI env through CI en variable
-            for criteria in config_test:
-                if re.search(config_test[criteria],
-                             test_execution_context[criteria]) is None:
-                    # print "Test "+ test + " cannot be run on the environment"
-                    is_runnable = False
+        # the constraints of the testcase are compiled once
+        if not config_test:
+            patterns = {}
+        elif config_test == self.constraints:
+            patterns = self.patterns
+        else:
+            patterns = compile_constraints(config_test)
+        # possible criteria = ["installer", "scenario"]
+        # consider test criteria from config file
+        # compare towards CI env through CI en variable
+        for criteria, pattern in patterns.items():
+            if (criteria in test_execution_context and pattern.search(
+                    test_execution_context[criteria]) is None):
+                # print "Test "+ test + " cannot be run on the environment"
+                is_runnable = False
         # print is_runnable
         self.is_runnable = is_runnable
 
@@ -0,0 +1,312 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Reporting service
+
+  Serves the status pages and the trend data from an in-process cache
+  of the TestAPI results refreshed in the background instead of the
+  static pages regenerated by cron.
+  The timing and metrics of the service are exposed on /metrics in the
+  Prometheus text format.
+  The result documents POSTed by CI jobs on /api/v1/results are added to
+  the result store and the static outputs of their cells are generated
+  again, without waiting for the next run of reporting status.
+
+  The configuration is read from CONFIG_REPORTING_YAML, to run it
+  locally against a stub API set testapi.url to the stub url:
+      reporting serve --port 8888
+"""
+import argparse
+import datetime
+import json
+import logging
+
+from concurrent import futures
+from tornado import gen
+from tornado import ioloop
+from tornado import web
+
+import reporting.functest.reporting_status as reporting_status
+import reporting.functest.status as status
+import reporting.functest.testCase as tc
+import reporting.utils.bundle as bundle
+import reporting.utils.cell_stats as cell_stats
+import reporting.utils.history_store as history_store
+import reporting.utils.metrics as metrics
+import reporting.utils.render as render
+import reporting.utils.reporting_utils as rp_utils
+import reporting.utils.testapi_client as testapi
+import reporting.utils.trend as trend
+from reporting.server.cache import TTLCache
+
+LOGGER = logging.getLogger(__name__)
+
+STATIC_DIRS = ("3rd_party", "bundle", "css", "img", "js")
+
+
+class ReportingService(object):
+    """
+    Status of the testcases computed from cached TestAPI results
+    """
+
+    def __init__(self, ttl, store=None, history=None):
+        self.period = rp_utils.get_config('general.period')
+        self.versions = rp_utils.get_config('general.versions')
+        self.installers = rp_utils.get_config('general.installers')
+        self.testcases = rp_utils.get_config('functest.test_list')
+        self.constraints = tc.ConstraintIndex(
+            rp_utils.get_config('functest.constraints'))
+        self.store = store
+        self.history = history
+        # computed from the cached results, the status runs persist theirs
+        self.stats = cell_stats.StatsStore(
+            None, rp_utils.get_config('general.stats.windows'),
+            rp_utils.get_config('general.store.overlap'))
+        self.cache = TTLCache(self._load_results, ttl,
+                              rp_utils.get_config('general.nb_workers'))
+        # the ingestions update the same outputs, one at a time
+        self.ingest_executor = futures.ThreadPoolExecutor(max_workers=1)
+
+    def _load_results(self, query):
+        if self.store is not None:
+            return rp_utils.getStoredResults(*query, store=self.store)
+        return rp_utils.getApiResults(*query)
+
+    def get_queries(self):
+        """
+        Queries of all the cells
+        """
+        return status.get_queries(self.versions, self.installers,
+                                  self.testcases, self.constraints)
+
+    def refresh(self):
+        """
+        Refresh in the background the stale results of all the cells
+        """
+        return self.cache.refresh(self.get_queries())
+
+    def shutdown(self):
+        """
+        Stop the refresh and ingestion workers
+        """
+        self.cache.shutdown()
+        self.ingest_executor.shutdown(wait=True)
+
+    def _ingest(self, results):
+        with metrics.span('ingest'):
+            cells, pages = reporting_status.StatusRun().ingest(results)
+        if self.store is not None:
+            for version, installer, testcase in cells:
+                query = (testcase, installer, version, False)
+                self.cache.set(query, rp_utils.loadStoredResults(
+                    *query, store=self.store))
+        return cells, pages
+
+    def ingest(self, results):
+        """
+        Get a future of the ingestion of result documents, see
+        reporting_status.StatusRun.ingest
+        """
+        return self.ingest_executor.submit(self._ingest, results)
+
+    @gen.coroutine
+    def get_testcase_results(self, version, installer):
+        """
+        Get the scores of the testcases of an installer
+        """
+        testcase_results = {}
+        for testcase in self.testcases:
+            if not self.constraints.is_applicable(version, installer,
+                                                  testcase):
+                testcase_results[testcase] = (
+                    status.get_not_applicable_result())
+                continue
+            try:
+                results = yield self.cache.get(
+                    (testcase, installer, version, False))
+            except testapi.TestApiError as exc:
+                results = exc
+            testcase_result = status.get_testcase_result(
+                testcase, installer, version, results)
+            if not isinstance(results, Exception):
+                testcase_result['stats'] = self.stats.update(
+                    (version, installer, testcase), results['results'])
+            testcase_result['trend_file'] = trend.get_trend_file_name(
+                installer, testcase)
+            testcase_result['trend'] = self.get_trend(version, installer,
+                                                      testcase)
+            testcase_results[testcase] = testcase_result
+        raise gen.Return(testcase_results)
+
+    def get_trend(self, version, installer, testcase):
+        """
+        Get the trend line points of a testcase
+        """
+        if self.history is None:
+            return []
+        return trend.get_trend(
+            self.history, version, installer, testcase,
+            rp_utils.get_config('general.trend.window'),
+            rp_utils.get_config('general.trend.max_points'))
+
+
+class BaseHandler(web.RequestHandler):
+    # pylint: disable=abstract-method
+
+    def initialize(self, service):
+        # pylint: disable=arguments-differ
+        self.service = service
+
+    def check_cell(self, version, installer, testcase=None):
+        if (version not in self.service.versions or
+                installer not in self.service.installers or
+                (testcase is not None and
+                 testcase not in self.service.testcases)):
+            raise web.HTTPError(404)
+
+
+class StatusHandler(BaseHandler):
+    # pylint: disable=abstract-method
+
+    @gen.coroutine
+    def get(self, version, installer):
+        # pylint: disable=arguments-differ
+        self.check_cell(version, installer)
+        testcase_results = yield self.service.get_testcase_results(
+            version, installer)
+        template = render.get_environment().get_template(
+            status.TEMPLATE_NAME)
+        with metrics.span('render', version=version, installer=installer):
+            page = template.render(**status.get_page_context(
+                testcase_results, installer, self.service.period, version,
+                datetime.datetime.now().strftime("%Y-%m-%d %H:%M")))
+        self.write(page)
+
+
+class TrendHandler(BaseHandler):
+    # pylint: disable=abstract-method
+
+    def get(self, version, installer, testcase):
+        # pylint: disable=arguments-differ
+        self.check_cell(version, installer, testcase)
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps(
+            self.service.get_trend(version, installer, testcase),
+            separators=(',', ':')))
+
+
+class IngestHandler(BaseHandler):
+    # pylint: disable=abstract-method
+
+    def fail(self, status_code, message):
+        self.set_status(status_code)
+        self.finish({'error': message})
+
+    @gen.coroutine
+    def post(self):
+        token = rp_utils.get_config('service.ingest.token')
+        if not token:
+            # no results are accepted without a token
+            self.fail(403, "Ingestion disabled")
+            return
+        if self.request.headers.get('X-Auth-Token') != token:
+            self.fail(403, "Invalid token")
+            return
+        try:
+            document = json.loads(self.request.body.decode('utf-8'))
+        except ValueError as exc:
+            self.fail(400, "Invalid JSON: %s" % exc)
+            return
+        # a result, a list of results or a TestAPI answer
+        if isinstance(document, dict) and 'results' in document:
+            document = document['results']
+        if not isinstance(document, list):
+            document = [document]
+        try:
+            cells, pages = yield self.service.ingest(document)
+        except ValueError as exc:
+            self.fail(400, str(exc))
+            return
+        self.write({'cells': ["/".join(cell) for cell in cells],
+                    'pages': pages})
+
+
+class MetricsHandler(web.RequestHandler):
+    # pylint: disable=abstract-method
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.write(metrics.METRICS.get_prometheus())
+
+
+def make_app(service):
+    """
+    Build the tornado application of the service
+    """
+    handlers = [
+        (r"/", web.RedirectHandler, {'url': "/index.html"}),
+        (r"/([^/]+)/functest/status-([^/]+)\.html", StatusHandler,
+         {'service': service}),
+        (r"/([^/]+)/functest/trend-([^/-]+)-([^/]+)\.json", TrendHandler,
+         {'service': service}),
+        (r"/api/v1/results", IngestHandler, {'service': service}),
+        (r"/metrics", MetricsHandler),
+    ]
+    for static_dir in STATIC_DIRS:
+        handlers.append((r"/(%s/.*)" % static_dir, web.StaticFileHandler,
+                         {'path': "."}))
+    handlers.append((r"/([^/]+\.html)", web.StaticFileHandler,
+                     {'path': "./html"}))
+    return web.Application(handlers)
+
+
+def serve(port):
+    """
+    Run the reporting service on a port
+    """
+    try:
+        bundle.build(rp_utils.get_reporting_config())
+    except bundle.BundleError as exc:
+        LOGGER.warning("Bundles built without the libraries not "
+                       "vendored (python -m reporting.utils.bundle): %s",
+                       exc)
+    service = ReportingService(
+        rp_utils.get_config('service.ttl'),
+        store=rp_utils.get_result_store(),
+        history=history_store.HistoryStore(
+            rp_utils.get_config('general.history.db')))
+    # load all the results then refresh them when they get stale
+    service.refresh()
+    ioloop.PeriodicCallback(
+        service.refresh,
+        rp_utils.get_config('service.refresh_interval') * 1000).start()
+
+    make_app(service).listen(port)
+    LOGGER.info("Reporting service listening on port %s", port)
+    try:
+        ioloop.IOLoop.current().start()
+    finally:
+        service.shutdown()
+
+
+def main():
+    """
+    Run the reporting service
+    """
+    parser = argparse.ArgumentParser(description="ONAP reporting service")
+    parser.add_argument("--port", type=int,
+                        default=rp_utils.get_config('service.port'))
+    args = parser.parse_args()
+
+    rp_utils.getLogger("ONAP-Reporting-Service")
+    serve(args.port)
+
+
+if __name__ == "__main__":
+    main()
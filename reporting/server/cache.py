@@ -0,0 +1,109 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  In-process TTL cache refreshed in the background
+
+  A value older than the ttl is still served while it is reloaded in
+  a worker thread, so that only the very first load of a key waits for
+  the loader
+  A load started before a value was set is dropped, the value set is
+  fresher
+"""
+import logging
+import threading
+import time
+
+from concurrent import futures
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TTLCache(object):
+    """
+    Cache of the values returned by loader(key)
+    """
+
+    def __init__(self, loader, ttl, nb_workers=4):
+        self.loader = loader
+        self.ttl = ttl
+        self.executor = futures.ThreadPoolExecutor(max_workers=nb_workers)
+        self._lock = threading.Lock()
+        # key: (value, load time)
+        self._values = {}
+        # key: future of the load in flight
+        self._loads = {}
+
+    def shutdown(self):
+        """
+        Stop the refresh workers
+        """
+        self.executor.shutdown(wait=True)
+
+    def _load(self, key, start):
+        try:
+            value = self.loader(key)
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.exception("Cannot load %s", key)
+            with self._lock:
+                del self._loads[key]
+            raise
+        with self._lock:
+            del self._loads[key]
+            if key in self._values and self._values[key][1] >= start:
+                # set during the load
+                return self._values[key][0]
+            self._values[key] = (value, time.time())
+        return value
+
+    def _refresh(self, key):
+        # must be called with the lock
+        try:
+            return self._loads[key]
+        except KeyError:
+            future = self.executor.submit(self._load, key, time.time())
+            self._loads[key] = future
+            return future
+
+    def get(self, key):
+        """
+        Get a future of the value of a key
+
+        the future is already done if a value is cached, even a stale one
+        which is then refreshed in the background
+        """
+        with self._lock:
+            try:
+                value, load_time = self._values[key]
+            except KeyError:
+                return self._refresh(key)
+            if time.time() - load_time > self.ttl:
+                self._refresh(key)
+        future = futures.Future()
+        future.set_result(value)
+        return future
+
+    def set(self, key, value):
+        """
+        Cache a value known to be fresh
+        """
+        with self._lock:
+            self._values[key] = (value, time.time())
+
+    def refresh(self, keys=None):
+        """
+        Refresh the stale values of keys, default to all the cached keys
+        return the futures of the loads
+        """
+        with self._lock:
+            if keys is None:
+                keys = list(self._values)
+            now = time.time()
+            return [self._refresh(key) for key in keys
+                    if key not in self._values or
+                    now - self._values[key][1] > self.ttl]
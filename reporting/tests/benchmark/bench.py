@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+"""
+  Benchmark of the reporting pipeline
+
+  Synthetic results are served by a local fake TestAPI and each scenario
+  is timed several times, the timings are written as JSON so that they
+  can be compared between releases:
+      python -m reporting.tests.benchmark.bench --nb-results 100 \\
+          --output bench.json
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import yaml
+
+from reporting.functest import status
+from reporting.tests import legacy
+from reporting.tests import synthetic
+from reporting.tests.fake_testapi import FakeTestApi
+from reporting.utils import history_store
+from reporting.utils import render
+from reporting.utils import reporting_utils
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                        "..", "..", ".."))
+CONFIG_FILE = os.path.join(REPO_DIR, "reporting", "reporting.yaml")
+
+ASSET_REFERENCE = re.compile(r'<(?:script|link)[^>]*\s(?:src|href)="([^"]+)"')
+
+
+def measure(func, repeat):
+    """
+    Time repeat calls of func
+    """
+    timings = []
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        func()
+        timings.append(timeit.default_timer() - start)
+    return {'runs': repeat,
+            'min': min(timings),
+            'mean': sum(timings) / len(timings),
+            'max': max(timings)}
+
+
+class Benchmark(object):
+    """
+    Scenarios of the benchmark
+    """
+
+    def __init__(self, args, work_dir):
+        self.args = args
+        self.work_dir = work_dir
+        self.versions = synthetic.VERSIONS[:args.nb_versions]
+        self.installers = ["installer%s" % index
+                           for index in range(args.nb_installers)]
+        self.testcases = synthetic.TESTCASES
+        self.results = synthetic.generate_results(
+            args.nb_results, args.pass_ratio, self.installers,
+            self.versions, self.testcases)
+        self.cell_results = [
+            res for res in self.results
+            if (res['version'], res['installer'], res['case_name']) ==
+            (self.versions[0], self.installers[0], self.testcases[0])]
+
+    def bench_nb_test_ok(self):
+        return measure(
+            lambda: reporting_utils.getNbtestOk(self.cell_results),
+            self.args.repeat)
+
+    def bench_case_score(self):
+        return measure(
+            lambda: reporting_utils.getCaseScore(
+                self.testcases[0], self.installers[0], self.versions[0],
+                {'results': list(self.cell_results)}),
+            self.args.repeat)
+
+    def bench_case_results(self):
+        return measure(
+            lambda: reporting_utils.getCaseResults(
+                self.testcases[0], self.installers[0], self.versions[0],
+                {'results': self.cell_results}),
+            self.args.repeat)
+
+    def bench_scoring_gain(self):
+        """
+        Timings of the scoring of a cell against the former functions
+        """
+        timings = {}
+        for name, func, legacy_func in (
+                ('nb_test_ok',
+                 lambda: reporting_utils.getNbtestOk(self.cell_results),
+                 lambda: legacy.get_legacy_nb_ok(self.cell_results)),
+                ('case_score',
+                 lambda: reporting_utils.getCaseScore(
+                     self.testcases[0], self.installers[0], self.versions[0],
+                     {'results': list(self.cell_results)}),
+                 lambda: legacy.get_legacy_score(
+                     {'results': list(self.cell_results)}))):
+            current = measure(func, self.args.repeat)
+            former = measure(legacy_func, self.args.repeat)
+            timings[name] = {'current': current, 'legacy': former,
+                             'speedup': former['min'] / current['min']}
+        return timings
+
+    def _write_config(self, fake_api, run_dir):
+        with open(CONFIG_FILE) as my_file:
+            config = yaml.safe_load(my_file)
+        config['general']['versions'] = self.versions
+        config['general']['installers'] = self.installers
+        config['general']['log']['log_level'] = 'ERROR'
+        config['general']['store']['dir'] = os.path.join(run_dir, "store")
+        config['general']['history']['db'] = os.path.join(run_dir,
+                                                          "history.db")
+        config['general']['render']['cache_dir'] = os.path.join(
+            run_dir, "jinja2_cache")
+        config['general']['manifest'] = os.path.join(run_dir,
+                                                     "manifest.json")
+        config['functest']['test_list'] = self.testcases
+        config['testapi']['url'] = fake_api.url
+        config_file = os.path.join(run_dir, "reporting.yaml")
+        with open(config_file, "w") as my_file:
+            yaml.safe_dump(config, my_file)
+        return config_file
+
+    def bench_status_sweep(self):
+        with FakeTestApi(results=self.results) as fake_api:
+            run_dir = tempfile.mkdtemp(dir=self.work_dir)
+            os.symlink(os.path.join(REPO_DIR, "reporting"),
+                       os.path.join(run_dir, "reporting"))
+            env = dict(os.environ,
+                       CONFIG_REPORTING_YAML=self._write_config(fake_api,
+                                                                run_dir),
+                       PYTHONPATH=REPO_DIR)
+
+            def sweep():
+                subprocess.check_call(
+                    [sys.executable, "-m", "reporting.cli", "status"],
+                    cwd=run_dir, env=env)
+
+            timings = measure(sweep, self.args.repeat)
+            timings['nb_requests'] = len(fake_api.requests)
+        return timings
+
+    def bench_cli_startup(self):
+        """
+        Start of the command line, without running any command
+        """
+        env = dict(os.environ, PYTHONPATH=REPO_DIR)
+        with open(os.devnull, "w") as devnull:
+            return measure(
+                lambda: subprocess.check_call(
+                    [sys.executable, "-m", "reporting.cli", "--help"],
+                    stdout=devnull, env=env),
+                self.args.repeat)
+
+    def _fill_history(self):
+        history = history_store.HistoryStore(
+            os.path.join(tempfile.mkdtemp(dir=self.work_dir), "history.db"))
+        now = datetime.datetime.now()
+        rows = []
+        for run in range(self.args.nb_runs):
+            date = (now - datetime.timedelta(hours=run)).strftime(
+                "%Y-%m-%d %H:%M")
+            for version in self.versions:
+                for installer in self.installers:
+                    for testcase in self.testcases:
+                        rows.append((version, installer, testcase, date,
+                                     "2/3", 50.0))
+        history.add_many(rows)
+        return history
+
+    def bench_history_export(self):
+        history = self._fill_history()
+        csv_file = os.path.join(self.work_dir, "testcases_history.txt")
+        try:
+            return measure(
+                lambda: history.export_csv(csv_file, self.versions[0]),
+                self.args.repeat)
+        finally:
+            history.close()
+
+    def bench_render(self):
+        page_dir = tempfile.mkdtemp(dir=self.work_dir)
+        testcase_results = dict(
+            (testcase, dict(status.get_empty_result(),
+                            trend_file="trend.json"))
+            for testcase in self.testcases)
+        jobs = [(status.TEMPLATE_NAME,
+                 os.path.join(page_dir, "status-%s-%s.html" % (
+                     version, installer)),
+                 status.get_page_context(testcase_results, installer, 10,
+                                         version, "2018-03-01 10:00"))
+                for version in self.versions
+                for installer in self.installers]
+        template_dir = os.path.join(REPO_DIR, "reporting", "functest",
+                                    "template")
+        return measure(
+            lambda: render.render_pages(
+                jobs, nb_processes=self.args.nb_processes,
+                template_dir=template_dir),
+            self.args.repeat)
+
+    def bench_page_assets(self):
+        """
+        CSS/JS requests of a status page, the remote ones need an
+        external round trip before the first paint
+        """
+        testcase_results = dict(
+            (testcase, dict(status.get_empty_result(),
+                            trend_file="trend.json"))
+            for testcase in self.testcases)
+        template_dir = os.path.join(REPO_DIR, "reporting", "functest",
+                                    "template")
+        page = render.get_environment(template_dir).get_template(
+            status.TEMPLATE_NAME).render(**status.get_page_context(
+                testcase_results, self.installers[0], 10, self.versions[0],
+                "2018-03-01 10:00"))
+        assets = ASSET_REFERENCE.findall(page)
+        return {'nb_requests': len(assets),
+                'nb_remote': len([asset for asset in assets
+                                  if re.match(r"(https?:)?//", asset)])}
+
+    def run(self, scenarios):
+        """
+        Run the scenarios, return their timings
+        """
+        return dict((name, getattr(self, "bench_" + name)())
+                    for name in scenarios)
+
+
+SCENARIOS = ['nb_test_ok', 'case_score', 'case_results', 'scoring_gain',
+             'status_sweep', 'cli_startup', 'history_export', 'render',
+             'page_assets']
+
+
+def main():
+    """
+    Run the benchmark and write the JSON report
+    """
+    parser = argparse.ArgumentParser(description="Reporting benchmark")
+    parser.add_argument("--nb-results", type=int, default=100,
+                        help="nb of results per case, installer, version")
+    parser.add_argument("--pass-ratio", type=float, default=0.8)
+    parser.add_argument("--nb-installers", type=int, default=3)
+    parser.add_argument("--nb-versions", type=int, default=3)
+    parser.add_argument("--nb-runs", type=int, default=1000,
+                        help="nb of runs in the history")
+    parser.add_argument("--nb-processes", type=int, default=0,
+                        help="nb of rendering processes, 0 for all cores")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="scenario to run, default to all")
+    parser.add_argument("--output", help="JSON report, default to stdout")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    # config of the functions run in process (criteria, period)
+    os.environ.setdefault("CONFIG_REPORTING_YAML", CONFIG_FILE)
+    work_dir = tempfile.mkdtemp()
+    try:
+        timings = Benchmark(args, work_dir).run(args.scenario or SCENARIOS)
+    finally:
+        shutil.rmtree(work_dir)
+
+    report = {'date': datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+              'python': platform.python_version(),
+              'params': dict((key, value) for key, value
+                             in vars(args).items()
+                             if key not in ('output', 'scenario')),
+              'scenarios': timings}
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as my_file:
+            my_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
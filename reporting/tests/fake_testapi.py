@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+"""
+  Fake TestAPI served on a local port in a background thread
+
+  By default the results given at init are filtered on the case,
+  installer, version, from and last query parameters like the TestAPI
+  does, and paginated if a page size is given.
+  The answers have an ETag, a request with a matching If-None-Match
+  header is answered with a 304 without body.
+  A responder can be set to control the answers (status, body, headers).
+  The queries missing one of the required parameters are answered with
+  a 400 error, like a TestAPI not supporting multi-case queries.
+
+  It can be run standalone with synthetic results:
+      python -m reporting.tests.fake_testapi --port 8000 --nb-results 20
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import threading
+import time
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+
+RESULTS_PATH = "/api/v1/results"
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients giving up on purpose (timeouts) are expected
+        pass
+
+
+def _make_handler(fake_api):
+
+    class FakeTestApiHandler(BaseHTTPRequestHandler):
+        # keep-alive connections
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            fake_api.record(self)
+            status, body, headers = fake_api.respond(self)
+            if not isinstance(body, bytes):
+                body = body.encode('utf-8')
+            if (body and fake_api.gzip and
+                    'gzip' in self.headers.get('Accept-Encoding', '')):
+                buf = io.BytesIO()
+                with gzip.GzipFile(fileobj=buf, mode='wb') as gz_file:
+                    gz_file.write(body)
+                body = buf.getvalue()
+                headers = dict(headers, **{'Content-Encoding': 'gzip'})
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    return FakeTestApiHandler
+
+
+class FakeTestApi(object):
+    """
+    Local TestAPI stub
+    """
+
+    def __init__(self, results=None, responder=None, gzip_answers=True,
+                 port=0, page_size=None, required_params=()):
+        # pylint: disable=too-many-arguments
+        self.results = results or []
+        self.port = port
+        self.page_size = page_size
+        self.required_params = required_params
+        self.responder = responder
+        self.gzip = gzip_answers
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        url of the results endpoint
+        """
+        return "http://127.0.0.1:%s%s" % (
+            self._server.server_address[1], RESULTS_PATH)
+
+    def start(self):
+        """
+        Start serving in a background thread
+        """
+        self._server = _ThreadingHTTPServer(('127.0.0.1', self.port),
+                                            _make_handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def record(self, handler):
+        """
+        Keep track of the received requests
+        """
+        with self._lock:
+            self.requests.append({'path': handler.path,
+                                  'headers': dict(handler.headers.items()),
+                                  'client_address': handler.client_address})
+
+    def respond(self, handler):
+        """
+        Get the (status, body, headers) answer of a request
+        """
+        if self.responder is not None:
+            return self.responder(handler)
+        url = urlparse(handler.path)
+        if url.path != RESULTS_PATH:
+            return 404, json.dumps({'error': 'not found'}), {}
+        query = parse_qs(url.query)
+        missing = [param for param in self.required_params
+                   if param not in query]
+        if missing:
+            return 400, json.dumps({'error': 'missing %s' % missing}), {}
+        answer = {'results': self.filter(query)}
+        if self.page_size:
+            page = int(query.get('page', ['1'])[0])
+            total_pages = max(1, -(-len(answer['results']) //
+                                   self.page_size))
+            answer['results'] = answer['results'][
+                (page - 1) * self.page_size:page * self.page_size]
+            answer['pagination'] = {'current_page': page,
+                                    'total_pages': total_pages}
+        body = json.dumps(answer)
+        etag = '"%s"' % hashlib.sha1(body.encode('utf-8')).hexdigest()
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, "", {'ETag': etag}
+        return 200, body, {'Content-Type': 'application/json', 'ETag': etag}
+
+    def filter(self, query):
+        """
+        Filter the results like the TestAPI, newest results first
+        """
+        results = self.results
+        for param, field in (('case', 'case_name'),
+                             ('installer', 'installer'),
+                             ('version', 'version')):
+            if param in query:
+                results = [res for res in results
+                           if res.get(field) == query[param][0]]
+        if 'from' in query:
+            results = [res for res in results
+                       if res['start_date'] >= query['from'][0]]
+        results = sorted(results, key=lambda res: res['start_date'],
+                         reverse=True)
+        if 'last' in query:
+            results = results[:int(query['last'][0])]
+        return results
+
+
+def main():
+    """
+    Serve synthetic results until interrupted
+    """
+    from reporting.tests import synthetic
+
+    parser = argparse.ArgumentParser(description="Fake TestAPI")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--nb-results", type=int, default=20,
+                        help="nb of results per case, installer, version")
+    parser.add_argument("--pass-ratio", type=float, default=0.8)
+    args = parser.parse_args()
+
+    fake_api = FakeTestApi(
+        results=synthetic.generate_results(args.nb_results, args.pass_ratio),
+        port=args.port).start()
+    print("Fake TestAPI serving %s results on %s" % (len(fake_api.results),
+                                                     fake_api.url))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake_api.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+"""
+  Former scoring functions of reporting_utils
+
+  Reference of the scores for the tests and of the timings for the
+  benchmark
+"""
+
+
+def get_legacy_nb_ok(results):
+    """
+    getNbtestOk before the result batches
+    """
+    nb_test_ok = 0
+    for my_result in results:
+        for _, res_v in my_result.iteritems():
+            try:
+                if "PASS" in res_v:
+                    nb_test_ok += 1
+            except TypeError:
+                pass
+    return nb_test_ok
+
+
+def get_legacy_score(results):
+    """
+    getCaseScore before the result batches
+    """
+    test_results = results['results']
+    test_result_indicator = 0
+    if test_results is not None:
+        test_results.reverse()
+        scenario_results = []
+        for res_r in test_results:
+            scenario_results.append({res_r["start_date"]: res_r["criteria"]})
+        scenario_results.sort()
+        nb_test_ok = get_legacy_nb_ok(scenario_results)
+        if len(scenario_results) < 1:
+            test_result_indicator = 0
+        elif nb_test_ok < 1:
+            test_result_indicator = 0
+        elif nb_test_ok < 2:
+            test_result_indicator = 1
+        else:
+            if len(scenario_results) > 3:
+                last_4_run_results = scenario_results[-4:]
+                if get_legacy_nb_ok(last_4_run_results) > 3:
+                    test_result_indicator = 3
+                else:
+                    test_result_indicator = 2
+            else:
+                test_result_indicator = 2
+    return test_result_indicator
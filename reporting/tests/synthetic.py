@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+"""
+  Synthetic TestAPI result documents
+"""
+import datetime
+import random
+
+INSTALLERS = ['oom', 'heat', 'ansible']
+VERSIONS = ['master', 'amsterdam', 'beijing']
+TESTCASES = ['robot_healthcheck', 'robot_dcae', 'robot_multicloud',
+             'robot_3rdparty']
+
+
+def generate_results(nb_results, pass_ratio=0.8, installers=None,
+                     versions=None, testcases=None, period=10, seed=0,
+                     now=None):
+    """
+    Generate nb_results result documents per (case, installer, version)
+    spread over the period, pass_ratio of them being PASS
+    """
+    # pylint: disable=too-many-arguments
+    rand = random.Random(seed)
+    if now is None:
+        now = datetime.datetime.utcnow()
+    step = datetime.timedelta(days=period) // max(nb_results, 1)
+    results = []
+    for version in versions or VERSIONS:
+        for installer in installers or INSTALLERS:
+            for testcase in testcases or TESTCASES:
+                for index in range(nb_results):
+                    criteria = 'PASS' if rand.random() < pass_ratio else 'FAIL'
+                    start_date = now - step * (index + 1)
+                    stop_date = start_date + datetime.timedelta(minutes=30)
+                    results.append({
+                        '_id': "%s-%s-%s-%s" % (version, installer,
+                                                testcase, index),
+                        'project_name': 'functest',
+                        'case_name': testcase,
+                        'installer': installer,
+                        'version': version,
+                        'scenario': 'onap-nofeature-noha',
+                        'pod_name': 'pod-%s' % installer,
+                        'build_tag': "jenkins-%s-%s" % (installer, index),
+                        'start_date': str(start_date),
+                        'stop_date': str(stop_date),
+                        'criteria': criteria,
+                        'details': {'tests': 10,
+                                    'failures': 0 if criteria == 'PASS'
+                                    else rand.randint(1, 10)}})
+    return results
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+import yaml
+
+from reporting.functest import reporting_status
+from reporting.tests.fake_testapi import FakeTestApi
+from reporting.utils import reporting_utils
+
+TESTCASES = ['robot_healthcheck', 'robot_dcae']
+
+
+def build_results():
+    now = datetime.datetime.utcnow()
+    return [{'_id': "id%s%s" % (installer, index),
+             'case_name': testcase,
+             'installer': installer,
+             'version': 'master',
+             'start_date': str(now - datetime.timedelta(hours=index)),
+             'criteria': 'PASS'}
+            for installer in ('oom', 'heat')
+            for testcase in TESTCASES
+            for index in range(3)]
+
+
+class reportingStatusTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.fake_api = FakeTestApi(results=build_results()).start()
+        self.addCleanup(self.fake_api.stop)
+        with open(os.path.join("reporting", "reporting.yaml")) as my_file:
+            config = yaml.safe_load(my_file)
+        general = config['general']
+        general['versions'] = ['master', 'beijing']
+        general['installers'] = ['oom', 'heat']
+        general['store']['dir'] = ""
+        general['history']['db'] = os.path.join(self.tmp_dir, "history.db")
+        general['render'] = {'nb_processes': 1, 'cache_dir': ""}
+        general['manifest'] = os.path.join(self.tmp_dir, "manifest.json")
+        general['stats']['file'] = os.path.join(self.tmp_dir,
+                                                "cell_stats.json")
+        general['bundle']['vendor'] = []
+        general['bundle']['bundles'] = {}
+        general['static'] = {'display_dir': self.tmp_dir + "/display/",
+                             'assets': [], 'precompress': False,
+                             'brotli': False}
+        general['metrics'] = {
+            'summary': os.path.join(self.tmp_dir, "run_summary.json"),
+            'prometheus': ""}
+        config['functest']['test_list'] = TESTCASES
+        config['testapi']['url'] = self.fake_api.url
+        config['testapi']['retries'] = 0
+        config['testapi']['cache']['dir'] = os.path.join(self.tmp_dir,
+                                                         "testapi_cache")
+        config_file = os.path.join(self.tmp_dir, "reporting.yaml")
+        with open(config_file, "w") as my_file:
+            yaml.safe_dump(config, my_file)
+        patcher = mock.patch.dict(os.environ,
+                                  {'CONFIG_REPORTING_YAML': config_file})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(reporting_utils.CONFIGS.pop, config_file, None)
+        self.addCleanup(self._close_clients)
+
+    @staticmethod
+    def _close_clients():
+        # the connections kept alive to the fake TestAPI
+        for client in reporting_utils.TESTAPI_CLIENTS.values():
+            client.close()
+        reporting_utils.TESTAPI_CLIENTS.clear()
+
+    def _display(self, *path):
+        return os.path.join(self.tmp_dir, "display", *path)
+
+    def test_run(self):
+        pages = reporting_status.StatusRun().run()
+        self.assertEqual(sorted(pages), sorted(
+            self._display(version, "functest", "status-%s.html" % installer)
+            for version in ('master', 'beijing')
+            for installer in ('oom', 'heat')))
+        with open(self._display("master", "functest",
+                                "status-oom.html")) as my_file:
+            page = my_file.read()
+        self.assertIn("<td>3/3</td>", page)
+        # the gauges and the trend lines are drawn in the page
+        self.assertEqual(page.count('<svg class="gauge"'), 2)
+        self.assertEqual(page.count('<svg class="trend"'), 2)
+        self.assertTrue(os.path.exists(self._display(
+            "master", "functest", "trend-heat-robot_dcae.json")))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir,
+                                                    "run_summary.json")))
+        # the statistics of the cells are shown and kept for the next run
+        self.assertEqual(page.count('class="cell-stats"'), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir,
+                                                    "cell_stats.json")))
+        # nothing changed since the last run
+        self.assertEqual(reporting_status.StatusRun().run(), [])
+
+    def test_run_constraints(self):
+        with open(os.environ['CONFIG_REPORTING_YAML']) as my_file:
+            config = yaml.safe_load(my_file)
+        config['functest']['constraints'] = {
+            'robot_dcae': {'installer': '^oom$'}}
+        with open(os.environ['CONFIG_REPORTING_YAML'], "w") as my_file:
+            yaml.safe_dump(config, my_file)
+        reporting_status.StatusRun(['master']).run()
+        # the results of robot_dcae on heat are not queried
+        self.assertEqual(sorted(request['path'].split("?")[1]
+                                for request in self.fake_api.requests), [
+            "case=robot_healthcheck&period=10&installer=heat&version=master",
+            "period=10&installer=oom&version=master"])
+        with open(self._display("master", "functest",
+                                "status-heat.html")) as my_file:
+            page = my_file.read()
+        self.assertIn("not applicable on heat", page)
+        self.assertIn("trend-heat-robot_healthcheck.json", page)
+        self.assertNotIn("trend-heat-robot_dcae.json", page)
+        self.assertFalse(os.path.exists(self._display(
+            "master", "functest", "trend-heat-robot_dcae.json")))
+
+    def test_run_replay(self):
+        with mock.patch.dict(os.environ,
+                             {reporting_utils.TESTAPI_CACHE_VARIABLE:
+                              "record"}):
+            reporting_status.StatusRun(['master']).run()
+        self.fake_api.stop()
+        shutil.rmtree(self._display())
+        os.remove(os.path.join(self.tmp_dir, "manifest.json"))
+        with mock.patch.dict(os.environ,
+                             {reporting_utils.TESTAPI_CACHE_VARIABLE:
+                              "replay"}):
+            pages = reporting_status.StatusRun(['master']).run()
+        # the display tree is generated again without the TestAPI
+        self.assertEqual(len(pages), 2)
+        with open(self._display("master", "functest",
+                                "status-heat.html")) as my_file:
+            self.assertIn("<td>3/3</td>", my_file.read())
+
+    def _set_config(self, section, key, value):
+        with open(os.environ['CONFIG_REPORTING_YAML']) as my_file:
+            config = yaml.safe_load(my_file)
+        config[section][key] = value
+        with open(os.environ['CONFIG_REPORTING_YAML'], "w") as my_file:
+            yaml.safe_dump(config, my_file)
+
+    def test_history_imported_then_pruned(self):
+        os.makedirs(self._display("master", "functest"))
+        recent = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        with open(self._display("master", "functest",
+                                "testcases_history.txt"), "w") as my_file:
+            my_file.write("date,testcase,installer,detail,score\n"
+                          "2000-01-01 10:00,robot_dcae,oom,3/3,100.0\n"
+                          "%s,robot_dcae,oom,3/3,100.0\n" % recent)
+        for _ in range(2):
+            status_run = reporting_status.StatusRun(['master'])
+            status_run.open_history()
+            self.assertEqual([row[0] for row in
+                              status_run.history.get_history('master')],
+                             [recent])
+            status_run.history.close()
+
+    def test_ingest(self):
+        self._set_config('general', 'store', {
+            'dir': os.path.join(self.tmp_dir, "store"), 'overlap': 6})
+        reporting_status.StatusRun(['master']).run()
+        nb_requests = len(self.fake_api.requests)
+        result = dict(build_results()[6], _id="new",
+                      start_date=str(datetime.datetime.utcnow()))
+        cells, pages = reporting_status.StatusRun().ingest([
+            result, dict(result, installer='ansible')])
+        # the results of the other installers are ignored
+        self.assertEqual(cells, [('master', 'heat', 'robot_healthcheck')])
+        self.assertEqual(pages, [self._display("master", "functest",
+                                               "status-heat.html")])
+        self.assertEqual(len(self.fake_api.requests), nb_requests)
+        with open(self._display("master", "functest",
+                                "status-heat.html")) as my_file:
+            page = my_file.read()
+        # 4 results over the period for the ingested cell
+        self.assertIn("<td>4/4</td>", page)
+        self.assertIn("<td>3/3</td>", page)
+        self.assertRaises(ValueError, reporting_status.StatusRun().ingest,
+                          [{'case_name': 'robot_dcae'}])
+
+    def test_ingest_without_store(self):
+        self.assertRaises(ValueError, reporting_status.StatusRun().ingest,
+                          build_results())
+
+    def test_run_selection(self):
+        pages = reporting_status.StatusRun(['master'], ['heat']).run()
+        self.assertEqual(pages, [self._display("master", "functest",
+                                               "status-heat.html")])
+        self.assertFalse(os.path.exists(self._display("beijing")))
+        self.assertEqual(
+            set(request['path'].split("installer=")[1].split("&")[0]
+                for request in self.fake_api.requests), set(['heat']))
+        # the other cells are generated by the next run
+        pages = reporting_status.StatusRun().run()
+        self.assertEqual(len(pages), 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
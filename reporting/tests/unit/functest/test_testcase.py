@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import logging
+import unittest
+
+import mock
+
+from reporting.functest import status
+from reporting.functest import testCase as tc
+
+CONSTRAINTS = {'robot_multicloud': {'installer': '^(oom|heat)$',
+                                    'version': 'master'},
+               'robot_3rdparty': {'scenario': 'nofeature'}}
+
+
+class testCaseTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def test_compile_constraints(self):
+        self.assertEqual(tc.compile_constraints(-1), {})
+        self.assertEqual(tc.compile_constraints(None), {})
+        patterns = tc.compile_constraints(CONSTRAINTS['robot_multicloud'])
+        self.assertTrue(patterns['installer'].search('heat'))
+        # the unknown criteria are ignored
+        self.assertEqual(tc.compile_constraints({'pod': 'pod1'}), {})
+        tc.TestCase('robot_dcae', 'functest', {'pod': 'pod1'})
+
+    def test_constraint_index(self):
+        index = tc.ConstraintIndex(CONSTRAINTS)
+        with mock.patch('re.compile') as mock_compile:
+            self.assertTrue(index.is_applicable('master', 'oom',
+                                                'robot_multicloud'))
+            self.assertFalse(index.is_applicable('master', 'ansible',
+                                                 'robot_multicloud'))
+            self.assertFalse(index.is_applicable('beijing', 'heat',
+                                                 'robot_multicloud'))
+            # no constraint or a constraint on the scenario only
+            self.assertTrue(index.is_applicable('beijing', 'ansible',
+                                                'robot_healthcheck'))
+            self.assertTrue(index.is_applicable('beijing', 'ansible',
+                                                'robot_3rdparty'))
+            self.assertFalse(mock_compile.called)
+        self.assertTrue(tc.ConstraintIndex().is_applicable(
+            'master', 'oom', 'robot_dcae'))
+
+    def test_get_queries(self):
+        queries = status.get_queries(
+            ['master', 'beijing'], ['oom', 'ansible'],
+            ['robot_healthcheck', 'robot_multicloud'],
+            tc.ConstraintIndex(CONSTRAINTS))
+        self.assertEqual(len(queries), 5)
+        self.assertEqual([query[1:3] for query in queries
+                          if query[0] == 'robot_multicloud'],
+                         [('oom', 'master')])
+
+    def test_check_runnable(self):
+        testcase = tc.TestCase('robot_3rdparty', 'functest',
+                               CONSTRAINTS['robot_3rdparty'])
+        testcase.checkRunnable('oom', 'os-nosdn-nofeature-ha',
+                               CONSTRAINTS['robot_3rdparty'])
+        self.assertTrue(testcase.is_runnable)
+        testcase.checkRunnable('oom', 'os-odl-sfc-ha',
+                               CONSTRAINTS['robot_3rdparty'])
+        self.assertFalse(testcase.is_runnable)
+        testcase.checkRunnable('ansible', 'os-odl-sfc-ha',
+                               {'installer': 'oom|ansible'})
+        self.assertTrue(testcase.is_runnable)
+        # runnable without constraints given
+        testcase.checkRunnable('oom', 'os-odl-sfc-ha', None)
+        self.assertTrue(testcase.is_runnable)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import datetime
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+from tornado import testing
+
+from reporting.server import app
+from reporting.server.cache import TTLCache
+from reporting.tests.fake_testapi import FakeTestApi
+from reporting.utils import history_store
+from reporting.utils import testapi_client
+
+CONFIG = {'general.period': 10,
+          'general.versions': ['master'],
+          'general.installers': ['oom', 'heat'],
+          'general.nb_workers': 2,
+          'general.nb_iteration_tests_success_criteria': 4,
+          'general.trend.window': 30,
+          'general.trend.max_points': 60,
+          'general.stats.windows': [4, 10],
+          'functest.test_list': ['robot_healthcheck', 'robot_dcae'],
+          'functest.constraints': {'robot_dcae': {'installer': 'oom'}},
+          'service.ingest.token': "secret"}
+
+TOKEN = {'X-Auth-Token': "secret"}
+
+
+def build_results():
+    now = datetime.datetime.utcnow()
+    return [{'_id': "id%s" % index,
+             'case_name': 'robot_healthcheck',
+             'installer': 'oom',
+             'version': 'master',
+             'start_date': str(now - datetime.timedelta(hours=index)),
+             'criteria': 'PASS'} for index in range(5)]
+
+
+class ttlCacheTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def test_serve_stale_while_refreshing(self):
+        release = threading.Event()
+        loads = []
+
+        def loader(key):
+            loads.append(key)
+            if len(loads) > 1:
+                release.wait(5)
+            return len(loads)
+
+        cache = TTLCache(loader, ttl=0.01, nb_workers=1)
+        self.addCleanup(cache.shutdown)
+        self.addCleanup(release.set)
+        self.assertEqual(cache.get('key').result(timeout=5), 1)
+        time.sleep(0.02)
+        # stale value served immediately, a single refresh in flight
+        for _ in range(3):
+            future = cache.get('key')
+            self.assertTrue(future.done())
+            self.assertEqual(future.result(), 1)
+        refresh = cache.refresh(['key'])
+        self.assertEqual(len(refresh), 1)
+        release.set()
+        refresh[0].result(timeout=5)
+        self.assertEqual(len(loads), 2)
+        self.assertEqual(cache.get('key').result(), 2)
+
+    def test_set_during_load(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def loader(_):
+            started.set()
+            release.wait(5)
+            return "refreshed"
+
+        cache = TTLCache(loader, ttl=300, nb_workers=1)
+        self.addCleanup(cache.shutdown)
+        self.addCleanup(release.set)
+        future = cache.get('key')
+        started.wait(5)
+        # ingested while the load is in flight, the load is dropped
+        cache.set('key', "ingested")
+        release.set()
+        self.assertEqual(future.result(timeout=5), "ingested")
+        self.assertEqual(cache.get('key').result(), "ingested")
+
+    def test_failed_refresh_keeps_value(self):
+        values = [1]
+
+        def loader(_):
+            if values:
+                return values.pop()
+            raise ValueError("down")
+
+        cache = TTLCache(loader, ttl=0, nb_workers=1)
+        self.addCleanup(cache.shutdown)
+        self.assertEqual(cache.get('key').result(timeout=5), 1)
+        future = cache.refresh()[0]
+        self.assertRaises(ValueError, future.result, 5)
+        self.assertEqual(cache.get('key').result(), 1)
+
+
+class reportingServiceTesting(testing.AsyncHTTPTestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def get_app(self):
+        self.fake_api = FakeTestApi(results=build_results()).start()
+        self.addCleanup(self.fake_api.stop)
+        client = testapi_client.TestApiClient(self.fake_api.url, retries=0)
+        self.addCleanup(client.close)
+        for target, kwargs in (('get_config', {'side_effect': CONFIG.get}),
+                               ('get_testapi_client',
+                                {'return_value': client})):
+            patcher = mock.patch(
+                'reporting.utils.reporting_utils.' + target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        history = history_store.HistoryStore(
+            os.path.join(tmp_dir, "history.db"))
+        self.addCleanup(history.close)
+        history.add('master', 'oom', 'robot_healthcheck',
+                    datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+                    '3/3', 100.0)
+        self.service = app.ReportingService(300, history=history)
+        self.addCleanup(self.service.shutdown)
+        return app.make_app(self.service)
+
+    def test_status_page(self):
+        response = self.fetch("/master/functest/status-oom.html")
+        self.assertEqual(response.code, 200)
+        body = response.body.decode('utf-8')
+        self.assertIn("trend-oom-robot_healthcheck.json", body)
+        self.assertIn("<td>5/5</td>", body)
+        self.assertIn("<td>0/0</td>", body)
+        self.assertIn('<svg class="gauge"', body)
+        # served from the cache
+        nb_requests = len(self.fake_api.requests)
+        self.fetch("/master/functest/status-oom.html")
+        self.assertEqual(len(self.fake_api.requests), nb_requests)
+
+    def test_not_applicable(self):
+        response = self.fetch("/master/functest/status-heat.html")
+        self.assertEqual(response.code, 200)
+        self.assertIn("not applicable on heat", response.body.decode('utf-8'))
+        self.assertNotIn("case=robot_dcae&period=10&installer=heat",
+                         " ".join(req['path']
+                                  for req in self.fake_api.requests))
+
+    def test_trend(self):
+        response = self.fetch(
+            "/master/functest/trend-oom-robot_healthcheck.json")
+        self.assertEqual(response.code, 200)
+        self.assertEqual([point[1] for point in json.loads(response.body)],
+                         [100.0])
+
+    def test_metrics(self):
+        self.fetch("/master/functest/status-oom.html")
+        response = self.fetch("/metrics")
+        self.assertEqual(response.code, 200)
+        body = response.body.decode('utf-8')
+        self.assertIn('reporting_stage_duration_seconds_count{'
+                      'stage="render",installer="oom",version="master"}',
+                      body)
+        self.assertIn('reporting_testapi_requests_total{status="200"}', body)
+
+    @mock.patch('reporting.functest.reporting_status.StatusRun')
+    def test_ingest(self, mock_run):
+        mock_run.return_value.ingest.return_value = (
+            [('master', 'oom', 'robot_healthcheck')], ["status-oom.html"])
+        results = build_results()[:2]
+        response = self.fetch("/api/v1/results", method="POST",
+                              headers=TOKEN,
+                              body=json.dumps({'results': results}))
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body.decode('utf-8')), {
+            'cells': ["master/oom/robot_healthcheck"],
+            'pages': ["status-oom.html"]})
+        mock_run.return_value.ingest.assert_called_once_with(results)
+        self.fetch("/api/v1/results", method="POST", headers=TOKEN,
+                   body=json.dumps(results[0]))
+        mock_run.return_value.ingest.assert_called_with(results[:1])
+
+    @mock.patch('reporting.functest.reporting_status.StatusRun')
+    def test_ingest_errors(self, mock_run):
+        response = self.fetch("/api/v1/results", method="POST",
+                              headers=TOKEN, body="{")
+        self.assertEqual(response.code, 400)
+        mock_run.return_value.ingest.side_effect = ValueError("no store")
+        response = self.fetch("/api/v1/results", method="POST",
+                              headers=TOKEN, body="[]")
+        self.assertEqual(response.code, 400)
+        self.assertEqual(json.loads(response.body.decode('utf-8')),
+                         {'error': "no store"})
+        self.assertEqual(self.fetch("/api/v1/results", method="POST",
+                                    headers={'X-Auth-Token': "other"},
+                                    body="[]").code, 403)
+        # refused without a token configured
+        with mock.patch.dict(CONFIG, {'service.ingest.token': ""}):
+            self.assertEqual(self.fetch("/api/v1/results", method="POST",
+                                        headers=TOKEN, body="[]").code, 403)
+        self.assertEqual(mock_run.return_value.ingest.call_count, 1)
+
+    def test_unknown_cell(self):
+        self.assertEqual(
+            self.fetch("/master/functest/status-foo.html").code, 404)
+        self.assertEqual(
+            self.fetch("/master/functest/trend-oom-foo.json").code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
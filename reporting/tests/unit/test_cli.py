@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import mock
+
+from reporting import cli
+from reporting.utils import history_store
+from reporting.utils import reporting_utils
+
+CONFIG = {'general.versions': ['master', 'beijing'],
+          'general.installers': ['oom', 'heat'],
+          'general.log.log_file': os.devnull,
+          'general.log.log_level': 'ERROR'}
+
+
+class cliTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.config = dict(CONFIG)
+        for patcher in (
+                mock.patch('reporting.utils.reporting_utils.get_config',
+                           side_effect=lambda key: self.config[key]),
+                mock.patch('reporting.utils.reporting_utils.getLogger'),
+                mock.patch.dict(os.environ,
+                                {cli.CONFIG_VARIABLE: "reporting.yaml"})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_import_without_dependencies(self):
+        # the command line starts without the dependencies of the commands
+        modules = subprocess.check_output([
+            sys.executable, "-c",
+            "import sys; import reporting.cli; "
+            "import reporting.utils.reporting_utils; "
+            "print(' '.join(sorted(sys.modules)))"]).split()
+        for module in ('requests', 'pdfkit', 'jinja2', 'tornado',
+                       'reporting.utils.testapi_client'):
+            self.assertNotIn(module, modules)
+
+    @mock.patch('reporting.functest.reporting_status.StatusRun')
+    def test_status(self, mock_run):
+        mock_run.return_value.run.return_value = []
+        self.assertEqual(cli.main(["status", "--installer", "heat"]), 0)
+        mock_run.assert_called_once_with(['master', 'beijing'], ['heat'])
+        cli.main(["status", "--version", "beijing", "--version", "master"])
+        mock_run.assert_called_with(['beijing', 'master'], ['oom', 'heat'])
+
+    @mock.patch('reporting.functest.reporting_status.StatusRun')
+    def test_testapi_cache(self, mock_run):
+        mock_run.return_value.run.return_value = []
+        with mock.patch.dict(os.environ):
+            cli.main(["--testapi-cache", "replay", "status"])
+            self.assertEqual(os.environ[cli.TESTAPI_CACHE_VARIABLE],
+                             "replay")
+        with mock.patch('sys.stderr'):
+            self.assertRaises(SystemExit, cli.main,
+                              ["--testapi-cache", "offline", "status"])
+
+    @mock.patch('reporting.functest.reporting_status.StatusRun')
+    def test_unknown_selection(self, mock_run):
+        with mock.patch('sys.stderr'):
+            self.assertRaises(SystemExit, cli.main,
+                              ["status", "--installer", "foo"])
+        mock_run.assert_not_called()
+
+    @mock.patch('reporting.functest.reporting_status.StatusRun')
+    def test_run_error(self, mock_run):
+        # not reported as a usage error
+        mock_run.return_value.run.side_effect = ValueError("bad result")
+        self.assertRaises(ValueError, cli.main, ["status"])
+        with mock.patch('reporting.utils.reporting_utils.get_config',
+                        side_effect=reporting_utils.ConfigError("no")):
+            with mock.patch('sys.stderr'):
+                self.assertRaises(SystemExit, cli.main, ["status"])
+
+    def test_no_configuration(self):
+        with mock.patch.dict(os.environ, {cli.CONFIG_VARIABLE: ""}):
+            with mock.patch('sys.stderr'):
+                self.assertRaises(SystemExit, cli.main, ["status"])
+
+    def test_export_csv(self):
+        history_db = os.path.join(self.tmp_dir, "history.db")
+        history = history_store.HistoryStore(history_db)
+        history.add('master', 'oom', 'robot_healthcheck', "2018-03-01 10:00",
+                    '3/3', 100.0)
+        history.close()
+        self.config['general.history.db'] = history_db
+        self.config['general.static.display_dir'] = self.tmp_dir
+        with mock.patch('sys.stdout'):
+            self.assertEqual(cli.main(["export-csv", "--version", "master",
+                                       "--installer", "oom"]), 0)
+        directory = os.path.join(self.tmp_dir, "master", "functest")
+        self.assertEqual(sorted(os.listdir(directory)),
+                         ["scenario_history_oom.csv",
+                          "testcases_history.txt"])
+        with open(os.path.join(directory,
+                               "scenario_history_oom.csv")) as my_file:
+            self.assertEqual(my_file.readline(),
+                             "date,scenario,installer,detail,score\n")
+            self.assertIn("robot_healthcheck", my_file.read())
+
+    @mock.patch('reporting.server.app.serve')
+    def test_serve(self, mock_serve):
+        self.config['service.port'] = 8888
+        cli.main(["serve"])
+        mock_serve.assert_called_once_with(8888)
+        cli.main(["serve", "--port", "9000"])
+        mock_serve.assert_called_with(9000)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
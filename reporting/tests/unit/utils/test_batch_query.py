@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from reporting.functest import status
+from reporting.tests import synthetic
+from reporting.tests.fake_testapi import FakeTestApi
+from reporting.utils import reporting_utils
+from reporting.utils import result_store
+from reporting.utils import testapi_client
+
+CONFIG = {'general.period': 10,
+          'general.store.overlap': 6,
+          'general.nb_iteration_tests_success_criteria': 4,
+          'general.nb_workers': 4,
+          'testapi.streaming': True,
+          'testapi.fields': ['_id', 'start_date', 'criteria']}
+
+INSTALLERS = ['oom', 'heat']
+VERSIONS = ['master', 'beijing']
+TESTCASES = ['robot_healthcheck', 'robot_dcae', 'robot_multicloud']
+
+
+class batchQueryTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.results = synthetic.generate_results(
+            6, 0.7, INSTALLERS, VERSIONS, TESTCASES, period=8, seed=3,
+            now=datetime.datetime.utcnow())
+        self.queries = status.get_queries(VERSIONS, INSTALLERS, TESTCASES)
+        patcher = mock.patch('reporting.utils.reporting_utils.get_config',
+                             side_effect=CONFIG.get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _start(self, **kwargs):
+        fake_api = FakeTestApi(results=self.results, **kwargs).start()
+        self.addCleanup(fake_api.stop)
+        client = testapi_client.TestApiClient(fake_api.url, retries=0)
+        self.addCleanup(client.close)
+        patcher = mock.patch(
+            'reporting.utils.reporting_utils.get_testapi_client',
+            return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return fake_api
+
+    def _ids(self, results):
+        return dict((query, [res['_id'] for res in answer['results']])
+                    for query, answer in results.items())
+
+    def test_same_results_as_per_case_queries(self):
+        fake_api = self._start()
+        expected = self._ids(reporting_utils.getApiResultsPool(self.queries))
+        self.assertEqual(len(fake_api.requests), len(self.queries))
+        for batch, nb_calls in (('installer', 4), ('version', 2)):
+            del fake_api.requests[:]
+            results = reporting_utils.getApiResultsPool(self.queries,
+                                                        batch=batch)
+            self.assertEqual(self._ids(results), expected, batch)
+            self.assertEqual(len(fake_api.requests), nb_calls, batch)
+            for request in fake_api.requests:
+                self.assertNotIn('case=', request['path'])
+
+    def test_default_fields_keep_the_scores(self):
+        for res in self.results:
+            res['details'] = ["PASS"]
+        self._start()
+        fields = reporting_utils.get_parameter_from_yaml(
+            'testapi.fields', os.path.join("reporting", "reporting.yaml"))
+        case, installer, version, _ = self.queries[0]
+        scores = []
+        for config in ({'testapi.fields': fields},
+                       {'testapi.streaming': False}):
+            with mock.patch.dict(CONFIG, config):
+                scores.append(reporting_utils.getCaseResults(
+                    case, installer, version, reporting_utils.getApiResults(
+                        case, installer, version, False)))
+        # the PASS values of the details are counted like without
+        # projection
+        self.assertEqual(scores[0], scores[1])
+
+    def test_batch_follows_pages(self):
+        self._start(page_size=5)
+        expected = self._ids(reporting_utils.getApiResultsPool(self.queries))
+        results = reporting_utils.getApiResultsPool(self.queries,
+                                                    batch='version')
+        self.assertEqual(self._ids(results), expected)
+
+    def test_fallback_to_per_case_queries(self):
+        fake_api = self._start(required_params=('case',))
+        results = reporting_utils.getApiResultsPool(self.queries,
+                                                    batch='installer')
+        # one rejected batch call per installer and version
+        self.assertEqual(len(fake_api.requests), 4 + len(self.queries))
+        fake_api.required_params = ()
+        self.assertEqual(self._ids(results), self._ids(
+            reporting_utils.getApiResultsPool(self.queries)))
+
+    def test_batch_error(self):
+        self._start(responder=lambda _: (500, '', {}))
+        results = reporting_utils.getApiResultsPool(self.queries,
+                                                    batch='installer')
+        self.assertEqual(len(results), len(self.queries))
+        for error in results.values():
+            self.assertIsInstance(error, testapi_client.TestApiHTTPError)
+
+    def test_batch_with_store(self):
+        fake_api = self._start()
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir)
+        store = result_store.ResultStore(store_dir)
+        expected = self._ids(reporting_utils.getApiResultsPool(self.queries))
+        for _ in range(2):
+            del fake_api.requests[:]
+            results = reporting_utils.getApiResultsPool(
+                self.queries, store=store, batch='installer')
+            self.assertEqual(self._ids(results), expected)
+            self.assertEqual(len(fake_api.requests), 4)
+        # the second run only retrieves the new results
+        for request in fake_api.requests:
+            self.assertIn('&from=', request['path'])
+
+    def test_batch_with_store_empty_cell(self):
+        empty_cell = ('robot_multicloud', 'oom', 'master')
+        self.results = [res for res in self.results
+                        if (res['case_name'], res['installer'],
+                            res['version']) != empty_cell]
+        fake_api = self._start()
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir)
+        store = result_store.ResultStore(store_dir)
+        queries = [query for query in self.queries
+                   if query[:3] != ('robot_dcae', 'oom', 'master')]
+        reporting_utils.getApiResultsPool(queries, store=store,
+                                          batch='installer')
+        self.assertIsNotNone(store.load(*empty_cell)['fetched'])
+        # a cell without results does not retrieve the whole period
+        del fake_api.requests[:]
+        reporting_utils.getApiResultsPool(queries, store=store,
+                                          batch='installer')
+        for request in fake_api.requests:
+            self.assertIn('&from=', request['path'])
+        # a cell never retrieved is retrieved alone
+        expected = self._ids(reporting_utils.getApiResultsPool(self.queries))
+        del fake_api.requests[:]
+        results = reporting_utils.getApiResultsPool(
+            self.queries, store=store, batch='installer')
+        self.assertEqual(self._ids(results), expected)
+        self.assertEqual(len(fake_api.requests), 5)
+        full_requests = [request['path'] for request in fake_api.requests
+                         if '&from=' not in request['path']]
+        self.assertEqual(len(full_requests), 1)
+        self.assertIn('case=robot_dcae&', full_requests[0])
+
+    def test_get_batches(self):
+        queries = self.queries + [('robot_dcae', 'oom', 'master', True),
+                                  ('robot_dcae', 'ansible', 'master', False)]
+        batches, single_queries = reporting_utils.getBatches(queries,
+                                                             'installer')
+        self.assertEqual(sorted(batches), [('heat', 'beijing'),
+                                           ('heat', 'master'),
+                                           ('oom', 'beijing'),
+                                           ('oom', 'master')])
+        self.assertEqual(sorted(single_queries),
+                         [('robot_dcae', 'ansible', 'master', False),
+                          ('robot_dcae', 'oom', 'master', True)])
+        batches, single_queries = reporting_utils.getBatches(queries, None)
+        self.assertEqual((batches, single_queries), ({}, queries))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
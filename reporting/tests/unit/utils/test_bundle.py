@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from reporting.tests.fake_testapi import FakeTestApi
+from reporting.utils import bundle
+
+LIBRARY = "/*! lib */var lib = {};"
+
+
+class bundleTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.vendor_dir = os.path.join(self.tmp_dir, "vendor")
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w") as my_file:
+            my_file.write(content)
+        return path
+
+    def _start(self, status=200):
+        fake_api = FakeTestApi(
+            responder=lambda _: (status, LIBRARY, {}), gzip_answers=False)
+        fake_api.start()
+        self.addCleanup(fake_api.stop)
+        return fake_api
+
+    def test_vendor_libraries(self):
+        fake_api = self._start()
+        libraries = [{'name': "lib.min.js", 'url': fake_api.url,
+                      'sha256': hashlib.sha256(LIBRARY).hexdigest()}]
+        for _ in range(2):
+            self.assertEqual(
+                bundle.vendor_libraries(libraries, self.vendor_dir), [])
+        with open(os.path.join(self.vendor_dir, "lib.min.js")) as my_file:
+            self.assertEqual(my_file.read(), LIBRARY)
+        # a vendored library is not downloaded again
+        self.assertEqual(len(fake_api.requests), 1)
+
+    def test_vendor_errors(self):
+        fake_api = self._start()
+        self.assertRaises(bundle.BundleError, bundle.vendor_library,
+                          fake_api.url, os.path.join(self.vendor_dir, "a.js"),
+                          sha256="0" * 64)
+        fake_api = self._start(status=404)
+        self.assertEqual(bundle.vendor_libraries(
+            [{'name': "b.js", 'url': fake_api.url}], self.vendor_dir),
+            ["b.js"])
+        self.assertFalse(os.path.exists(self.vendor_dir))
+
+    def test_build_bundles(self):
+        sources = [self._write("lib.js", LIBRARY),
+                   self._write("page.js", "statusPage()")]
+        bundle_dir = os.path.join(self.tmp_dir, "bundle")
+        bundles = {'status.js': sources,
+                   'status.css': [self._write("default.css", "body {}")]}
+        self.assertEqual(bundle.build_bundles(bundles, bundle_dir),
+                         [os.path.join(bundle_dir, "status.css"),
+                          os.path.join(bundle_dir, "status.js")])
+        with open(os.path.join(bundle_dir, "status.js")) as my_file:
+            self.assertEqual(my_file.read(), LIBRARY + ";\nstatusPage()")
+        # unchanged bundles are not written again
+        self.assertEqual(bundle.build_bundles(bundles, bundle_dir), [])
+
+    def test_build_offline(self):
+        fake_api = self._start()
+        bundle_dir = os.path.join(self.tmp_dir, "bundle")
+        config = {
+            'general.proxy': None,
+            'general.bundle.vendor_dir': self.vendor_dir,
+            'general.bundle.vendor': [{'name': "lib.min.js",
+                                       'url': fake_api.url}],
+            'general.bundle.dir': bundle_dir,
+            'general.bundle.bundles': {'status.js': [
+                os.path.join(self.vendor_dir, "lib.min.js"),
+                self._write("page.js", "statusPage()")]}}
+        # the library is not downloaded, the bundle is built without it
+        with self.assertRaises(bundle.BundleError):
+            bundle.build(config)
+        self.assertEqual(fake_api.requests, [])
+        with open(os.path.join(bundle_dir, "status.js")) as my_file:
+            self.assertEqual(my_file.read(), "statusPage()")
+        self.assertEqual(bundle.build(config, download=True),
+                         [os.path.join(bundle_dir, "status.js")])
+        self.assertEqual(len(fake_api.requests), 1)
+        self.assertEqual(bundle.build(config), [])
+
+    def test_minify(self):
+        with mock.patch.object(bundle, 'rjsmin') as mock_rjsmin:
+            mock_rjsmin.jsmin.return_value = "min"
+            self.assertEqual(bundle.minify("var a = 1;", ".js"), "min")
+            self.assertEqual(bundle.minify("body {}", ".html"), "body {}")
+        with mock.patch.object(bundle, 'rcssmin', None):
+            self.assertEqual(bundle.minify("body {}", ".css"), "body {}")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from reporting.utils import cell_stats
+
+CELL = ('master', 'oom', 'robot_healthcheck')
+
+# oldest first: F F P P F P P P
+CRITERIA = ['FAIL', 'FAIL', 'PASS', 'PASS', 'FAIL', 'PASS', 'PASS', 'PASS']
+
+
+def build_results(criteria, first_day=1):
+    """
+    Results of consecutive days, newest first like the TestAPI
+    """
+    return [{'_id': "id%s" % (first_day + index),
+             'start_date': "2018-03-%02d 10:00:00" % (first_day + index),
+             'criteria': value}
+            for index, value in enumerate(criteria)][::-1]
+
+
+class cellStatsTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_summary(self):
+        stats = cell_stats.CellStats([4, 10])
+        self.assertEqual(stats.update(build_results(CRITERIA)), 8)
+        summary = stats.get_summary()
+        self.assertEqual(summary['nb_results'], 8)
+        self.assertEqual(summary['streak'], 3)
+        self.assertTrue(summary['streak_passing'])
+        self.assertEqual(summary['longest_pass_streak'], 3)
+        # 3 flips over 7 consecutive pairs
+        self.assertEqual(summary['flip_rate'], 42.9)
+        self.assertEqual(summary['pass_rates'], [[4, 75.0], [10, 62.5]])
+        # failures of 2 days then of 1 day
+        self.assertEqual(summary['mttr'], 36.0)
+        self.assertIsNone(summary['failing_since'])
+
+    def test_incremental(self):
+        stats = cell_stats.CellStats([2, 3])
+        stats.update(build_results(CRITERIA[:5]))
+        # the results already applied are skipped, only the new ones
+        # are read
+        results = build_results(CRITERIA)
+        self.assertEqual(stats.update(results), 3)
+        self.assertEqual(stats.update(results), 0)
+        whole = cell_stats.CellStats([2, 3])
+        whole.update(results)
+        self.assertEqual(stats.get_summary(), whole.get_summary())
+        self.assertEqual(stats.to_dict(), whole.to_dict())
+        # the windows slide
+        self.assertEqual(stats.get_summary()['pass_rates'],
+                         [[2, 100.0], [3, 100.0]])
+        self.assertEqual(stats.get_summary()['flip_rate'], 0.0)
+
+    def test_late_result(self):
+        # oldest first: F F P P F P P P with the 4th one pushed last
+        results = build_results(CRITERIA)
+        stats = cell_stats.CellStats([2, 3], overlap=24 * 4)
+        stats.update(results[5:])
+        stats.update(results[:4])
+        # applied in order from the checkpoint, through the saved state
+        stats = cell_stats.CellStats([2, 3], json.loads(
+            json.dumps(stats.to_dict())), 24 * 4)
+        self.assertEqual(stats.update(results), 1)
+        self.assertEqual(stats.update(results), 0)
+        whole = cell_stats.CellStats([2, 3], overlap=24 * 4)
+        whole.update(results)
+        self.assertEqual(stats.get_summary(), whole.get_summary())
+        self.assertEqual(stats.to_dict(), whole.to_dict())
+        self.assertEqual(stats.get_summary()['mttr'], 36.0)
+
+    def test_replay_only_late_results(self):
+        results = build_results(CRITERIA)
+        stats = cell_stats.CellStats([2, 3], overlap=24 * 10)
+        stats.update(results[5:])
+        with mock.patch.object(stats, 'add', wraps=stats.add) as mock_add:
+            # in order, only the new result is applied
+            self.assertEqual(stats.update(results[2:3] + results[5:]), 1)
+            self.assertEqual(mock_add.call_count, 1)
+            # 2 results pushed late, the window is applied again
+            self.assertEqual(stats.update(results), 4)
+            self.assertEqual(mock_add.call_count, 1 + len(CRITERIA))
+        whole = cell_stats.CellStats([2, 3], overlap=24 * 10)
+        whole.update(results)
+        self.assertEqual(stats.to_dict(), whole.to_dict())
+
+    def test_late_result_ignored(self):
+        # older than the overlap window
+        stats = cell_stats.CellStats([4], overlap=24)
+        stats.update(build_results(['PASS', 'PASS', 'PASS'], first_day=10))
+        late = build_results(['FAIL'], first_day=5)
+        self.assertEqual(stats.update(late), 0)
+        self.assertEqual(stats.get_summary()['streak'], 3)
+
+    def test_failing(self):
+        stats = cell_stats.CellStats([4])
+        stats.update(build_results(['PASS', 'FAIL', 'FAIL']))
+        summary = stats.get_summary()
+        self.assertFalse(summary['streak_passing'])
+        self.assertEqual(summary['streak'], 2)
+        self.assertEqual(summary['failing_since'], "2018-03-02 10:00:00")
+        self.assertIsNone(summary['mttr'])
+
+    def test_store(self):
+        stats_file = os.path.join(self.tmp_dir, "stats", "cell_stats.json")
+        store = cell_stats.StatsStore(stats_file, [4, 10])
+        store.update(CELL, build_results(CRITERIA[:4]))
+        store.save()
+        store = cell_stats.StatsStore(stats_file, [10, 4])
+        self.assertEqual(store.update(CELL, build_results(CRITERIA)),
+                         cell_stats.StatsStore(None, [4, 10]).update(
+                             CELL, build_results(CRITERIA)))
+        # other windows, computed again
+        store = cell_stats.StatsStore(stats_file, [5])
+        self.assertEqual(store.get(CELL).nb_results, 0)
+        with open(stats_file) as my_file:
+            self.assertEqual(list(json.load(my_file)),
+                             ["master/oom/robot_healthcheck"])
+
+    def test_no_file(self):
+        store = cell_stats.StatsStore("", [4])
+        store.update(CELL, build_results(CRITERIA))
+        store.save()
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from reporting.utils import history_store
+
+HISTORY = """date,testcase,installer,detail,score
+2018-03-01 10:00,robot_healthcheck,oom,2/3,50.0
+2018-03-01 10:00,robot_oom_dcae,heat,1/3,25.0
+2018-03-02 10:00,robot_healthcheck,oom,3/3,100.0
+2018-03-02 10:00,robot_oom_dcae,heat,0/3,0
+"""
+
+
+class historyStoreTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.history_file = os.path.join(self.tmp_dir,
+                                         "testcases_history.txt")
+        with open(self.history_file, "w") as my_file:
+            my_file.write(HISTORY)
+        self.store = history_store.HistoryStore(
+            os.path.join(self.tmp_dir, "history.db"))
+        self.addCleanup(self.store.close)
+
+    def test_import_and_export(self):
+        self.assertFalse(self.store.has_history('master'))
+        self.assertEqual(
+            self.store.import_history_file('master', self.history_file), 4)
+        self.assertTrue(self.store.has_history('master'))
+        # importing twice does not duplicate the history
+        self.store.import_history_file('master', self.history_file)
+        csv_file = os.path.join(self.tmp_dir, "export.csv")
+        with open(csv_file, "w") as my_file:
+            my_file.write("previous export\n")
+        with open(csv_file) as previous_file:
+            self.store.export_csv(csv_file, 'master')
+            # replaced, not truncated under the readers
+            self.assertEqual(previous_file.read(), "previous export\n")
+        with open(csv_file) as my_file:
+            self.assertEqual(my_file.read(), HISTORY)
+
+    def test_export_scenario_header(self):
+        self.store.import_history_file('master', self.history_file)
+        csv_file = os.path.join(self.tmp_dir, "scenario_history_oom.csv")
+        self.store.export_csv(csv_file, 'master', 'oom',
+                              header=history_store.SCENARIO_HISTORY_HEADER)
+        with open(csv_file) as my_file:
+            self.assertEqual(my_file.readline(),
+                             "date,scenario,installer,detail,score\n")
+            self.assertEqual(len(my_file.readlines()), 2)
+
+    def test_installer_is_not_a_substring_match(self):
+        self.store.import_history_file('master', self.history_file)
+        rows = self.store.get_history('master', installer='oom')
+        self.assertEqual([row[1] for row in rows],
+                         ['robot_healthcheck', 'robot_healthcheck'])
+
+    def test_get_history(self):
+        self.store.import_history_file('master', self.history_file)
+        self.store.add('master', 'oom', 'robot_healthcheck',
+                       '2018-03-03 10:00', '3/3', 100.0)
+        self.store.add('beijing', 'oom', 'robot_healthcheck',
+                       '2018-03-03 10:00', '0/3', 0)
+        rows = self.store.get_history('master', 'oom', 'robot_healthcheck',
+                                      since='2018-03-02 00:00')
+        self.assertEqual([(row[0], row[4]) for row in rows],
+                         [('2018-03-02 10:00', '100.0'),
+                          ('2018-03-03 10:00', '100.0')])
+
+    def test_prune(self):
+        self.store.import_history_file('master', self.history_file)
+        self.assertEqual(self.store.prune('2018-03-02 00:00'), 2)
+        self.assertEqual(len(self.store.get_history('master')), 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
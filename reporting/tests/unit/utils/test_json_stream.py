@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import logging
+import unittest
+
+from reporting.utils import json_stream
+
+DOCUMENT = {'pagination': {'current_page': 1, 'total_pages': 12345},
+            'results': [{'_id': "id%s" % index,
+                         'start_date': "2018-03-01 10:00:%02d" % index,
+                         'criteria': 'PASS',
+                         'details': {'name': u'd\xe9tail', 'tests': 1234}}
+                        for index in range(20)],
+            'total': 1234567}
+
+
+def chunked(data, size):
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+class jsonStreamTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def _parse(self, data, size):
+        items = []
+        members = {}
+        for key, value in json_stream.iter_object(chunked(data, size),
+                                                  'results'):
+            if key is json_stream.ITEM:
+                items.append(value)
+            else:
+                members[key] = value
+        return items, members
+
+    def test_iter_object(self):
+        data = json.dumps(DOCUMENT, indent=2).encode('utf-8')
+        for size in (1, 3, 7, 64, len(data)):
+            items, members = self._parse(data, size)
+            self.assertEqual(items, DOCUMENT['results'], size)
+            self.assertEqual(members, {'pagination': DOCUMENT['pagination'],
+                                       'total': DOCUMENT['total']})
+
+    def test_multibyte_characters(self):
+        data = json.dumps({'results': [{'name': u'd\xe9tail'}]},
+                          ensure_ascii=False).encode('utf-8')
+        items, _ = self._parse(data, 1)
+        self.assertEqual(items, [{'name': u'd\xe9tail'}])
+
+    def test_empty(self):
+        self.assertEqual(self._parse(b'{}', 1), ([], {}))
+        self.assertEqual(self._parse(b'{"results": []}', 1), ([], {}))
+
+    def test_not_an_array(self):
+        self.assertEqual(self._parse(b'{"results": null}', 4),
+                         ([], {'results': None}))
+
+    def test_invalid(self):
+        for data in (b'[]', b'{"results": [{"a": 1}', b'not json'):
+            self.assertRaises(json_stream.JSONStreamError, self._parse,
+                              data, 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
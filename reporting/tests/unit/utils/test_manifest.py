@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from reporting.utils import manifest
+from reporting.utils import testapi_client
+
+RESULTS = {'results': [{'_id': "id%s" % index,
+                        'start_date': "2018-03-%02d 10:00:00" % (index + 1),
+                        'criteria': 'PASS'} for index in range(4)]}
+
+
+class manifestTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.manifest_file = os.path.join(self.tmp_dir, "manifest.json")
+        self.page = os.path.join(self.tmp_dir, "status-oom.html")
+
+    def test_results_fingerprint(self):
+        fingerprint = manifest.get_results_fingerprint(RESULTS)
+        # the order of the results does not matter
+        self.assertEqual(manifest.get_results_fingerprint(
+            {'results': list(reversed(RESULTS['results']))}), fingerprint)
+        self.assertNotEqual(manifest.get_results_fingerprint(
+            {'results': RESULTS['results'][1:]}), fingerprint)
+        error = testapi_client.TestApiTimeout("timeout")
+        self.assertEqual(manifest.get_results_fingerprint(error),
+                         manifest.get_results_fingerprint(
+                             testapi_client.TestApiTimeout("again")))
+
+    def test_skip_unchanged_outputs(self):
+        fingerprint = manifest.get_fingerprint("template", ["results"])
+        my_manifest = manifest.Manifest(self.manifest_file)
+        self.assertTrue(my_manifest.is_changed(self.page, fingerprint))
+        with open(self.page, "w") as my_file:
+            my_file.write("page")
+        my_manifest.update(self.page, fingerprint)
+        my_manifest.save()
+
+        my_manifest = manifest.Manifest(self.manifest_file)
+        self.assertFalse(my_manifest.is_changed(self.page, fingerprint,
+                                                self.page))
+        self.assertTrue(my_manifest.is_changed(
+            self.page, manifest.get_fingerprint("template", ["new"])))
+        self.assertEqual(my_manifest.skipped, [self.page])
+
+        # a removed output is generated again
+        os.remove(self.page)
+        self.assertTrue(my_manifest.is_changed(self.page, fingerprint,
+                                               self.page))
+
+    def test_file_hash(self):
+        with open(self.page, "w") as my_file:
+            my_file.write("page")
+        file_hash = manifest.get_file_hash(self.page)
+        with open(self.page, "a") as my_file:
+            my_file.write(" changed")
+        self.assertNotEqual(manifest.get_file_hash(self.page), file_hash)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from reporting.tests.fake_testapi import FakeTestApi
+from reporting.utils import metrics
+from reporting.utils import render
+from reporting.utils import testapi_client
+
+RESULTS = [{'_id': "id%s" % index,
+            'case_name': 'robot_healthcheck',
+            'installer': 'oom',
+            'version': 'master',
+            'start_date': "2018-03-%02d 10:00:00" % (index + 1),
+            'criteria': 'PASS'} for index in range(6)]
+
+
+class metricsTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.metrics = metrics.Metrics()
+        patcher = mock.patch('reporting.utils.metrics.METRICS', self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_spans(self):
+        self.metrics.observe('fetch', 2.0, version='master',
+                             installer='oom', testcase='robot_dcae')
+        self.metrics.observe('fetch', 1.0, version='master',
+                             installer='oom', testcase='robot_dcae')
+        self.metrics.observe('fetch', 0.5, version='master',
+                             installer='heat', testcase='robot_dcae')
+        with self.assertRaises(ValueError):
+            with metrics.span('score', version='master', installer='heat',
+                              testcase='robot_dcae'):
+                raise ValueError("failed")
+        stages = self.metrics.get_stages()
+        self.assertEqual(stages['fetch'],
+                         {'count': 3, 'total': 3.5, 'max': 2.0})
+        self.assertEqual(stages['score']['count'], 1)
+        cells = self.metrics.get_cells()
+        self.assertEqual([(cell['installer'], cell['total'])
+                          for cell in cells][0], ('oom', 3.0))
+        self.assertEqual(sorted(cells[1]['stages']), ['fetch', 'score'])
+
+    def test_counters_threads(self):
+        def count():
+            for _ in range(1000):
+                metrics.incr('testapi_requests', status=200)
+
+        threads = [threading.Thread(target=count) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        metrics.incr('testapi_bytes', 512)
+        self.assertEqual(self.metrics.get_summary()['counters'], [
+            {'name': 'testapi_bytes', 'labels': {}, 'value': 512},
+            {'name': 'testapi_requests', 'labels': {'status': '200'},
+             'value': 4000}])
+
+    def test_prometheus(self):
+        self.metrics.observe('write', 0.25, output='page',
+                             page='status "oom".html')
+        self.metrics.incr('testapi_errors', error='timeout')
+        text = self.metrics.get_prometheus()
+        self.assertIn('reporting_stage_duration_seconds_sum{stage="write",'
+                      'output="page",page="status \\"oom\\".html"} 0.25\n',
+                      text)
+        self.assertIn('reporting_stage_duration_seconds_count{'
+                      'stage="write",output="page",'
+                      'page="status \\"oom\\".html"} 1\n', text)
+        self.assertIn('# TYPE reporting_testapi_errors_total counter\n'
+                      'reporting_testapi_errors_total{error="timeout"} 1\n',
+                      text)
+        self.assertIn('reporting_run_start_timestamp_seconds', text)
+
+    def test_write(self):
+        self.metrics.observe('render', 0.5, page='status-oom.html')
+        summary_file = os.path.join(self.tmp_dir, "run_summary.json")
+        prometheus_file = os.path.join(self.tmp_dir, "reporting.prom")
+        self.metrics.write_summary(summary_file)
+        self.metrics.write_prometheus(prometheus_file)
+        with open(summary_file) as my_file:
+            summary = json.load(my_file)
+        self.assertEqual(summary['spans'], [
+            {'stage': 'render', 'labels': {'page': 'status-oom.html'},
+             'count': 1, 'total': 0.5, 'max': 0.5}])
+        with open(prometheus_file) as my_file:
+            self.assertIn('stage="render"', my_file.read())
+
+    def test_testapi_client(self):
+        fake_api = FakeTestApi(results=RESULTS).start()
+        self.addCleanup(fake_api.stop)
+        client = testapi_client.TestApiClient(fake_api.url, retries=0)
+        self.addCleanup(client.close)
+        client.get_results('robot_healthcheck', 'oom', 'master', 10)
+        self.assertEqual(len(list(client.iter_results(
+            'robot_healthcheck', 'oom', 'master', 10))), 6)
+        summary = self.metrics.get_summary()
+        counters = dict((counter['name'], counter['value'])
+                        for counter in summary['counters'])
+        self.assertEqual(counters['testapi_requests'], 2)
+        self.assertGreater(counters['testapi_bytes'], 0)
+        self.assertEqual(summary['stages']['request']['count'], 2)
+        self.assertEqual(summary['stages']['parse']['count'], 2)
+
+    def test_render_pages_parallel(self):
+        template_dir = os.path.join(self.tmp_dir, "templates")
+        os.mkdir(template_dir)
+        with open(os.path.join(template_dir, "page.html"), "w") as my_file:
+            my_file.write("<p>{{ installer }}</p>")
+        jobs = [("page.html", os.path.join(self.tmp_dir, "%s.html" % name),
+                 {'installer': name}) for name in ('oom', 'heat')]
+        render.render_pages(jobs, nb_processes=2, template_dir=template_dir)
+        stages = self.metrics.get_stages()
+        # the durations of the worker processes are recorded
+        self.assertEqual(stages['render']['count'], 2)
+        self.assertEqual(stages['write']['count'], 2)
+        self.assertEqual(self.metrics.get_summary()['counters'][0]['value'],
+                         len("<p>oom</p>") + len("<p>heat</p>"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from reporting.utils import manifest
+from reporting.utils import pdf_export
+
+PAGE = """<html><head>
+<link href="https://cdn.example.org/bootstrap.min.css" rel="stylesheet">
+<link href="../../css/default.css" rel="stylesheet">
+<script type="text/javascript" src="http://cdn.example.org/jquery.min.js">
+</script>
+<script type="text/javascript" src="//cdn.example.org/d3.min.js"></script>
+<script type="text/javascript" src="../../js/gauge.js"></script>
+</head><body>%s</body></html>"""
+
+ASSETS = {'http://cdn.example.org/jquery.min.js':
+          './3rd_party/js/jquery.min.js',
+          '//cdn.example.org/d3.min.js': './3rd_party/vendor/missing.js'}
+
+
+def fake_from_file(html_path, pdf_path, options=None):
+    # the "PDF" is a copy of the converted page
+    shutil.copy(html_path, pdf_path)
+
+
+class pdfExportTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.manifest = os.path.join(self.tmp_dir, "manifest.json")
+        self.pages = []
+        for installer in ('oom', 'heat', 'ansible'):
+            self.pages.append(os.path.join(self.tmp_dir,
+                                           "status-%s.html" % installer))
+            self._write(self.pages[-1], installer)
+
+    def _write(self, page, body):
+        with open(page, "w") as my_file:
+            my_file.write(PAGE % body)
+
+    def _export(self, nb_processes=1):
+        return dict(pdf_export.export_pages(self.pages, self.manifest,
+                                            assets=ASSETS,
+                                            options={'quiet': ''},
+                                            nb_processes=nb_processes))
+
+    def test_localize_assets(self):
+        html = pdf_export.localize_assets(PAGE % "", ASSETS)
+        self.assertNotIn("cdn.example.org", html)
+        self.assertIn('src="file://%s"' % os.path.abspath(
+            './3rd_party/js/jquery.min.js'), html)
+        # the local copy does not exist
+        self.assertNotIn('missing.js', html)
+        self.assertIn('href="../../css/default.css"', html)
+        self.assertIn('src="../../js/gauge.js"', html)
+
+    @mock.patch('reporting.utils.pdf_export.pdfkit.from_file',
+                side_effect=fake_from_file)
+    def test_export_pages(self, mock_convert):
+        statuses = self._export()
+        self.assertEqual(statuses, dict((page, pdf_export.EXPORTED)
+                                        for page in self.pages))
+        self.assertEqual(mock_convert.call_count, 3)
+        with open(pdf_export.get_pdf_path(self.pages[0])) as my_file:
+            pdf = my_file.read()
+        self.assertIn("oom", pdf)
+        self.assertNotIn("cdn.example.org", pdf)
+        # only the PDF are left next to the pages
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), sorted(
+            [os.path.basename(page) for page in self.pages] +
+            [os.path.basename(pdf_export.get_pdf_path(page))
+             for page in self.pages] + ["manifest.json"]))
+
+    def test_set_base(self):
+        html = pdf_export.set_base(PAGE % "", self.tmp_dir)
+        self.assertTrue(html.startswith(
+            '<html><head><base href="file://%s/">' % self.tmp_dir))
+        self.assertTrue(pdf_export.set_base("<p>", "/tmp").startswith(
+            '<base href="file:///tmp/">'))
+
+    @mock.patch('reporting.utils.pdf_export.pdfkit.from_file')
+    def test_converted_out_of_display(self, mock_convert):
+        def convert(html_path, pdf_path, options=None):
+            # the converted copy is not in the served directory
+            self.assertNotEqual(os.path.dirname(html_path), self.tmp_dir)
+            with open(html_path) as my_file:
+                self.assertIn('<base href="file://%s/">' % self.tmp_dir,
+                              my_file.read())
+            fake_from_file(html_path, pdf_path, options)
+        mock_convert.side_effect = convert
+        self.assertEqual(set(self._export().values()),
+                         set([pdf_export.EXPORTED]))
+
+    @mock.patch('reporting.utils.pdf_export.pdfkit.from_file',
+                side_effect=fake_from_file)
+    def test_skip_unchanged_pages(self, mock_convert):
+        self._export()
+        self._write(self.pages[1], "heat changed")
+        os.remove(pdf_export.get_pdf_path(self.pages[2]))
+        statuses = self._export()
+        self.assertEqual(statuses, {self.pages[0]: pdf_export.SKIPPED,
+                                    self.pages[1]: pdf_export.EXPORTED,
+                                    self.pages[2]: pdf_export.EXPORTED})
+        self.assertEqual(mock_convert.call_count, 5)
+
+    @mock.patch('reporting.utils.pdf_export.pdfkit.from_file',
+                side_effect=fake_from_file)
+    def test_export_pages_parallel(self, _):
+        statuses = self._export(nb_processes=2)
+        self.assertEqual(set(statuses.values()), set([pdf_export.EXPORTED]))
+        for page in self.pages:
+            self.assertTrue(os.path.exists(pdf_export.get_pdf_path(page)))
+        statuses = self._export(nb_processes=2)
+        self.assertEqual(set(statuses.values()), set([pdf_export.SKIPPED]))
+
+    @mock.patch('reporting.utils.pdf_export.pdfkit.from_file')
+    def test_failed_export(self, mock_convert):
+        mock_convert.side_effect = OSError("wkhtmltopdf not found")
+        statuses = self._export()
+        self.assertEqual(set(statuses.values()), set([pdf_export.FAILED]))
+        self.assertEqual(manifest.Manifest(self.manifest).fingerprints, {})
+        self.assertEqual(len(os.listdir(self.tmp_dir)), 4)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from reporting.utils import render
+
+
+class renderTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.template_dir = os.path.join(self.tmp_dir, "template")
+        os.makedirs(self.template_dir)
+        with open(os.path.join(self.template_dir, "page.html"), "w") as tmpl:
+            tmpl.write("<h2>{{installer}}</h2>{{version}}")
+        self.cache_dir = os.path.join(self.tmp_dir, "cache")
+
+    def _jobs(self):
+        return [("page.html",
+                 os.path.join(self.tmp_dir, "status-%s-%s.html" % (
+                     version, installer)),
+                 {'installer': installer, 'version': version})
+                for version in ('master', 'beijing')
+                for installer in ('oom', 'heat', '<ansible>')]
+
+    def _check_pages(self, pages):
+        self.assertEqual(len(pages), 6)
+        with open(pages[-1]) as page:
+            self.assertEqual(page.read(),
+                             "<h2>&lt;ansible&gt;</h2>beijing")
+        self.assertFalse([name for name in os.listdir(self.tmp_dir)
+                          if name.endswith(".tmp")])
+
+    def test_render_pages_parallel(self):
+        pages = render.render_pages(self._jobs(), nb_processes=2,
+                                    template_dir=self.template_dir,
+                                    cache_dir=self.cache_dir)
+        self._check_pages(pages)
+        self.assertTrue(os.listdir(self.cache_dir))
+
+    def test_render_pages_serial(self):
+        pages = render.render_pages(self._jobs(), nb_processes=1,
+                                    template_dir=self.template_dir)
+        self._check_pages(pages)
+
+    def test_write_atomic(self):
+        path = os.path.join(self.tmp_dir, "page.html")
+        render.write_atomic(path, b"old")
+        render.write_atomic(path, b"new")
+        with open(path) as page:
+            self.assertEqual(page.read(), "new")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)),
+                         ["page.html", "template"])
+
+    def test_asset_filter(self):
+        with open(os.path.join(self.template_dir, "assets.html"),
+                  "w") as tmpl:
+            tmpl.write("{{ 'css/default.css'|asset }} {{ 'js/a.js'|asset }}")
+        path = os.path.join(self.tmp_dir, "assets-page.html")
+        render.render_page(
+            "assets.html", path,
+            {'assets': {'css/default.css': "css/default.0123abcd.css"}},
+            template_dir=self.template_dir)
+        with open(path) as page:
+            self.assertEqual(page.read(), "css/default.0123abcd.css js/a.js")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+from reporting.tests.fake_testapi import FakeTestApi
+from reporting.utils import metrics
+from reporting.utils import response_cache
+from reporting.utils import testapi_client
+
+RESULTS = [{'_id': "id%s" % index,
+            'case_name': 'robot_healthcheck',
+            'installer': 'oom',
+            'version': 'master',
+            'start_date': "2018-03-%02d 10:00:00" % (index + 1),
+            'criteria': 'PASS'} for index in range(6)]
+
+
+class responseCacheTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.fake_api = FakeTestApi(results=RESULTS, page_size=4).start()
+        self.addCleanup(self.fake_api.stop)
+        self.metrics = metrics.Metrics()
+        patcher = mock.patch('reporting.utils.metrics.METRICS', self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _client(self, mode=response_cache.REVALIDATE):
+        client = testapi_client.TestApiClient(
+            self.fake_api.url, retries=2, backoff_factor=0,
+            cache=response_cache.ResponseCache(self.cache_dir, mode))
+        self.addCleanup(client.close)
+        return client
+
+    def _counters(self):
+        return dict((counter['labels'].get('result'), counter['value'])
+                    for counter in self.metrics.get_summary()['counters']
+                    if counter['name'] == 'testapi_cache')
+
+    def test_normalize_url(self):
+        self.assertEqual(
+            response_cache.normalize_url(
+                "http://API:80/results?version=master&case=a%20b&period=10"),
+            response_cache.normalize_url(
+                "http://api:80/results?period=10&case=a+b&version=master"))
+
+    def test_save_load(self):
+        cache = response_cache.ResponseCache(self.cache_dir)
+        url = "http://api/results?case=robot_dcae&period=10"
+        self.assertIsNone(cache.load(url))
+        cache.save(url, {'ETag': '"abc"', 'Content-Type': 'json'},
+                   b'{"results": []}\n')
+        entry = cache.load("http://api/results?period=10&case=robot_dcae")
+        self.assertEqual(entry['headers'], {'ETag': '"abc"'})
+        self.assertEqual(entry['body'], b'{"results": []}\n')
+        self.assertEqual(cache.get_conditional_headers(entry),
+                         {'If-None-Match': '"abc"'})
+        self.assertRaises(ValueError, response_cache.ResponseCache,
+                          self.cache_dir, "offline")
+
+    def test_revalidate(self):
+        client = self._client()
+        first = client.get_results('robot_healthcheck', 'oom', 'master', 10)
+        second = client.get_results('robot_healthcheck', 'oom', 'master', 10)
+        self.assertEqual(first, second)
+        self.assertEqual([
+            'if-none-match' in [name.lower() for name in request['headers']]
+            for request in self.fake_api.requests], [False, False, True, True])
+        # two pages
+        self.assertEqual(self._counters(), {'miss': 2, 'not_modified': 2})
+
+    def test_revalidate_modified(self):
+        client = self._client()
+        client.get_results('robot_healthcheck', 'oom', 'master', 10)
+        self.fake_api.results = RESULTS[:2]
+        self.assertEqual(len(client.get_results(
+            'robot_healthcheck', 'oom', 'master', 10)['results']), 2)
+        self.assertEqual(self._counters(), {'miss': 2, 'modified': 1})
+
+    def test_iter_results(self):
+        client = self._client()
+        first = list(client.iter_results('robot_healthcheck', 'oom',
+                                         'master', 10))
+        second = list(client.iter_results('robot_healthcheck', 'oom',
+                                          'master', 10))
+        self.assertEqual(len(first), 6)
+        self.assertEqual(first, second)
+        # two pages, revalidated on the second iteration
+        self.assertEqual(self._counters(), {'miss': 2, 'not_modified': 2})
+
+    def test_replay(self):
+        recorded = list(self._client(response_cache.RECORD).iter_results(
+            'robot_healthcheck', 'oom', 'master', 10))
+        self.fake_api.stop()
+        client = self._client(response_cache.REPLAY)
+        self.assertEqual(list(client.iter_results(
+            'robot_healthcheck', 'oom', 'master', 10)), recorded)
+        # not retried
+        self.assertRaises(testapi_client.TestApiNotRecorded,
+                          client.get_results, 'robot_dcae', 'oom', 'master',
+                          10)
+        self.assertEqual(self._counters(), {'miss': 3, 'replay': 2})
+
+    def _tmp_files(self):
+        return [name for _, _, names in os.walk(self.cache_dir)
+                for name in names if name.endswith(".tmp")]
+
+    def test_recording_written_while_read(self):
+        cache = response_cache.ResponseCache(self.cache_dir)
+        url = "http://api/results?case=robot_dcae"
+        first_chunk = b'{"results": [' + b' ' * 65536
+        response = mock.Mock(status_code=200, headers={'ETag': '"v1"'})
+        response.iter_content.return_value = iter([first_chunk, b']}'])
+        chunks = response_cache.RecordingResponse(
+            response, cache, url).iter_content(65536)
+        self.assertEqual(next(chunks), first_chunk)
+        # the chunk is written, not kept in memory until the end
+        tmp_files = self._tmp_files()
+        self.assertEqual(len(tmp_files), 1)
+        self.assertGreaterEqual(os.path.getsize(os.path.join(
+            os.path.dirname(cache.get_path(url)), tmp_files[0])), 65536)
+        self.assertIsNone(cache.load(url))
+        self.assertEqual(list(chunks), [b']}'])
+        self.assertEqual(cache.load(url)['body'], first_chunk + b']}')
+        self.assertEqual(self._tmp_files(), [])
+
+    def test_recording_dropped(self):
+        cache = response_cache.ResponseCache(self.cache_dir)
+        url = "http://api/results?case=robot_dcae"
+        response = mock.Mock(status_code=200, headers={})
+        response.iter_content.return_value = iter([b'{"results"', b': []}'])
+        chunks = response_cache.RecordingResponse(
+            response, cache, url).iter_content(4)
+        next(chunks)
+        # the body is not read entirely
+        chunks.close()
+        self.assertEqual(self._tmp_files(), [])
+        self.assertIsNone(cache.load(url))
+
+    def test_prune(self):
+        cache = response_cache.ResponseCache(self.cache_dir)
+        cache.save("http://api/results?case=old", {}, b"{}")
+        cache.save("http://api/results?case=new", {}, b"{}")
+        old_time = time.time() - 8 * 86400
+        os.utime(cache.get_path("http://api/results?case=old"),
+                 (old_time, old_time))
+        self.assertEqual(cache.prune(7), 1)
+        self.assertIsNone(cache.load("http://api/results?case=old"))
+        self.assertIsNotNone(cache.load("http://api/results?case=new"))
+
+    def test_prune_size(self):
+        cache = response_cache.ResponseCache(self.cache_dir)
+        now = time.time()
+        for index in range(3):
+            url = "http://api/results?case=%s" % index
+            cache.save(url, {}, b"x" * 400 * 1024)
+            os.utime(cache.get_path(url), (now - index, now - index))
+        # the least recently used entry beyond 1 MB
+        self.assertEqual(cache.prune(7, 1), 1)
+        self.assertIsNone(cache.load("http://api/results?case=2"))
+        self.assertIsNotNone(cache.load("http://api/results?case=1"))
+        self.assertEqual(cache.prune(7), 0)
+
+    def test_incremental_queries_not_cached(self):
+        client = self._client()
+        for _ in range(2):
+            client.get_results('robot_healthcheck', 'oom', 'master', 10,
+                               from_date="2018-03-03 10:00:00")
+        self.assertEqual(os.listdir(self.cache_dir), [])
+        self.assertEqual(self._counters(), {})
+        recorded = self._client(response_cache.RECORD).get_results(
+            'robot_healthcheck', 'oom', 'master', 10,
+            from_date="2018-03-03 10:00:00")
+        self.fake_api.stop()
+        self.assertEqual(self._client(response_cache.REPLAY).get_results(
+            'robot_healthcheck', 'oom', 'master', 10,
+            from_date="2018-03-03 10:00:00"), recorded)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
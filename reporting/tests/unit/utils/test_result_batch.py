@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import copy
+import logging
+import random
+import unittest
+
+from reporting.tests.legacy import get_legacy_nb_ok
+from reporting.tests.legacy import get_legacy_score
+from reporting.utils import reporting_utils
+
+CRITERIAS = ['PASS', 'FAIL', 'PASS', None, 'PASSED']
+
+
+def random_results(rand, nb_results):
+    results = []
+    for index in range(nb_results):
+        result = {'_id': "id%s" % index,
+                  'case_name': rand.choice(['healthcheck', 'vFW']),
+                  'installer': 'oom',
+                  'version': rand.choice(['master', 'beijing']),
+                  'start_date': "2018-03-%02d 10:00:00" % rand.randint(1, 9),
+                  'criteria': rand.choice(CRITERIAS),
+                  'build_tag': rand.choice(['PASS-tag', 'tag']),
+                  'details': {'tests': 1}}
+        results.append(result)
+    return results
+
+
+class resultBatchTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def test_matches_legacy_scores(self):
+        rand = random.Random(42)
+        for nb_results in range(12) * 20:
+            results = random_results(rand, nb_results)
+            self.assertEqual(
+                reporting_utils.getNbtestOk(copy.deepcopy(results)),
+                get_legacy_nb_ok(results))
+            self.assertEqual(
+                reporting_utils.getCaseScore(
+                    'healthcheck', 'oom', 'master',
+                    {'results': copy.deepcopy(results)}),
+                get_legacy_score({'results': copy.deepcopy(results)}))
+
+    def test_no_side_effect(self):
+        results = random_results(random.Random(1), 6)
+        expected = copy.deepcopy(results)
+        reporting_utils.getCaseScore('healthcheck', 'oom', 'master',
+                                     {'results': results})
+        self.assertEqual(results, expected)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
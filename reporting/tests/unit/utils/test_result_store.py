@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from reporting.tests.fake_testapi import FakeTestApi
+from reporting.utils import reporting_utils
+from reporting.utils import result_store
+from reporting.utils import testapi_client
+
+CONFIG = {'general.period': 10,
+          'general.store.overlap': 6,
+          'general.nb_iteration_tests_success_criteria': 4}
+
+
+def build_result(index, hours_ago, criteria='PASS', installer='oom'):
+    start_date = (datetime.datetime.utcnow() -
+                  datetime.timedelta(hours=hours_ago))
+    return {'_id': "id%s" % index,
+            'case_name': 'robot_healthcheck',
+            'installer': installer,
+            'version': 'master',
+            'start_date': str(start_date),
+            'criteria': criteria}
+
+
+class resultStoreTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.store_dir)
+        self.store = result_store.ResultStore(self.store_dir)
+        self.fake_api = FakeTestApi(
+            results=[build_result(index, 24 * index + 2, installer=installer)
+                     for index, installer in enumerate(['oom', 'heat'] * 4)])
+        self.fake_api.start()
+        self.addCleanup(self.fake_api.stop)
+        client = testapi_client.TestApiClient(self.fake_api.url, retries=0)
+        self.addCleanup(client.close)
+        for target, kwargs in (('get_config', {'side_effect': CONFIG.get}),
+                               ('get_testapi_client',
+                                {'return_value': client})):
+            patcher = mock.patch(
+                'reporting.utils.reporting_utils.' + target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get(self, criteria=False):
+        return reporting_utils.getStoredResults(
+            'robot_healthcheck', 'oom', 'master', criteria, self.store)
+
+    def _get_api(self, criteria=False):
+        return reporting_utils.getApiResults(
+            'robot_healthcheck', 'oom', 'master', criteria)
+
+    def test_first_run_full_period(self):
+        self.assertEqual(self._get(), self._get_api())
+        self.assertNotIn('from=', self.fake_api.requests[0]['path'])
+        entry = self.store.load('robot_healthcheck', 'oom', 'master')
+        self.assertEqual(entry['watermark'],
+                         self.fake_api.results[0]['start_date'])
+
+    def test_incremental_run(self):
+        self._get()
+        self.fake_api.results.append(build_result(10, 1, 'FAIL'))
+        self.fake_api.results.append(build_result(11, 0.5, 'FAIL', 'heat'))
+        results = self._get()
+        self.assertIn('from=', self.fake_api.requests[1]['path'])
+        self.assertEqual(results, self._get_api())
+        self.assertEqual(self._get(True), self._get_api(True))
+        self.assertEqual(results['results'][0]['_id'], "id10")
+
+    def test_no_duplicates_with_overlap(self):
+        self._get()
+        results = self._get()
+        self.assertEqual(len(results['results']), 4)
+
+    def test_period_change(self):
+        self._get()
+        CONFIG['general.period'] = 20
+        self.addCleanup(CONFIG.__setitem__, 'general.period', 10)
+        self._get()
+        self.assertNotIn('from=', self.fake_api.requests[1]['path'])
+
+    def test_pushed_results_keep_the_retrieval(self):
+        for legacy in (False, True):
+            self.fake_api.results = [build_result(0, 24 * 6)]
+            self.store = result_store.ResultStore(self.store_dir + str(legacy))
+            self.addCleanup(shutil.rmtree, self.store.store_dir)
+            self._get()
+            # the last retrieval was 5 days ago
+            entry = self.store.load('robot_healthcheck', 'oom', 'master')
+            if legacy:
+                entry['watermark'] = str(datetime.datetime.utcnow() -
+                                         datetime.timedelta(days=5))
+                del entry['fetched']
+            else:
+                entry['fetched'] = str(datetime.datetime.utcnow() -
+                                       datetime.timedelta(days=5))
+            self.store.save('robot_healthcheck', 'oom', 'master', entry)
+            # a result of 3 days ago not retrieved yet, then a pushed one
+            self.fake_api.results.append(build_result(1, 24 * 3))
+            reporting_utils.addStoredResults(
+                'robot_healthcheck', 'oom', 'master', [build_result(2, 0)],
+                self.store)
+            self.assertEqual([res['_id'] for res in self._get()['results']],
+                             ["id2", "id1", "id0"], legacy)
+
+    def test_ingest_during_retrieval(self):
+        self._get()
+        self.fake_api.results.append(build_result(21, 0.2))
+        get_api_results = reporting_utils.getApiResults
+
+        def get_api_results_ingest(*args):
+            # a result pushed while the retrieval is in flight
+            ingest = threading.Thread(
+                target=reporting_utils.addStoredResults,
+                args=('robot_healthcheck', 'oom', 'master',
+                      [build_result(20, 0.5)],
+                      result_store.ResultStore(self.store_dir)))
+            ingest.start()
+            ingest.join()
+            return get_api_results(*args)
+
+        with mock.patch('reporting.utils.reporting_utils.getApiResults',
+                        side_effect=get_api_results_ingest):
+            results = self._get()
+        self.assertEqual([res['_id'] for res in results['results']][:2],
+                         ["id21", "id20"])
+        self.assertEqual(self.store.load('robot_healthcheck', 'oom',
+                                         'master')['results'],
+                         results['results'])
+
+    def test_merge_evicts_old_results(self):
+        entry = {'period': 10, 'watermark': None,
+                 'results': [build_result(0, 24 * 12), build_result(1, 24)]}
+        entry = self.store.merge(entry, [build_result(2, 1)],
+                                 result_store.get_period_start(10))
+        self.assertEqual([res['_id'] for res in entry['results']],
+                         ["id2", "id1"])
+        self.assertEqual(entry['watermark'],
+                         entry['results'][0]['start_date'])
+
+    def test_period_start_utc(self):
+        # the TestAPI dates are in UTC whatever the timezone of the host
+        patcher = mock.patch.dict(os.environ, {'TZ': "Asia/Tokyo"})
+        patcher.start()
+        self.addCleanup(time.tzset)
+        self.addCleanup(patcher.stop)
+        time.tzset()
+        period_start = datetime.datetime.strptime(
+            result_store.get_period_start(1)[:19], "%Y-%m-%d %H:%M:%S")
+        self.assertLess(abs(datetime.datetime.utcnow() - period_start -
+                            datetime.timedelta(days=1)),
+                        datetime.timedelta(minutes=1))
+
+    def test_get_from_date(self):
+        entry = {'period': 10, 'watermark': "2018-03-10 12:00:00.123456",
+                 'results': []}
+        self.assertEqual(self.store.get_from_date(entry, 10, 6),
+                         "2018-03-10 06:00:00")
+        self.assertIsNone(self.store.get_from_date(entry, 20, 6))
+        # from the last retrieval, even without results
+        entry = {'period': 10, 'watermark': None,
+                 'fetched': "2018-03-12 12:00:00.123456", 'results': []}
+        self.assertEqual(self.store.get_from_date(entry, 10, 6),
+                         "2018-03-12 06:00:00")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import copy
+import logging
+import unittest
+
+import mock
+
+from reporting.utils import reporting_utils
+
+NB_TESTS = 4
+
+# criteria of the results over the period, from the oldest to the newest
+FIXTURES = {
+    'no_result': [],
+    'one_pass': ['PASS'],
+    'one_fail': ['FAIL'],
+    'all_fail': ['FAIL'] * 8,
+    'all_pass': ['PASS'] * 8,
+    'three_pass': ['PASS'] * 3,
+    'flaky': ['PASS', 'FAIL'] * 5,
+    'recovered': ['FAIL'] * 6 + ['PASS'] * 4,
+    'broken': ['PASS'] * 6 + ['FAIL'],
+    'single_pass_old': ['PASS'] + ['FAIL'] * 9,
+    'two_pass_recent': ['FAIL'] * 5 + ['PASS', 'PASS'],
+}
+
+
+def build_results(criterias, shuffle=False):
+    """
+    Build TestAPI result documents from a list of criteria
+    """
+    results = []
+    for index, criteria in enumerate(criterias):
+        results.append({'_id': "id%s" % index,
+                        'case_name': 'robot_healthcheck',
+                        'installer': 'oom',
+                        'version': 'master',
+                        'start_date': "2018-03-%02d 10:00:00" % (index + 1),
+                        'criteria': criteria})
+    if shuffle:
+        # TestAPI returns the newest results first
+        results.reverse()
+    return results
+
+
+def api_last(results, nb_tests):
+    """
+    Mimic the TestAPI answer to a query with the last parameter
+    """
+    last = sorted(results, key=lambda r: r['start_date'], reverse=True)
+    return {'results': copy.deepcopy(last[:nb_tests])}
+
+
+class reportingScoringTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.test = reporting_utils
+        patcher = mock.patch(
+            'reporting.utils.reporting_utils.get_config',
+            return_value=NB_TESTS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _two_calls(self, results):
+        """
+        Scores computed with a period query and a last query
+        """
+        period = {'results': copy.deepcopy(results)}
+        nb_tests_period_run = len(period['results'])
+        nb_tests_period_ok = self.test.getNbtestOk(period['results'])
+        functest_score = self.test.getCaseScore(
+            'robot_healthcheck', 'oom', 'master',
+            api_last(results, NB_TESTS))
+        return {'result_4': str(functest_score) + "/3",
+                'result_period': (str(nb_tests_period_ok) + "/" +
+                                  str(nb_tests_period_run)),
+                'result_percent': self.test.getScenarioPercent(
+                    nb_tests_period_ok, nb_tests_period_run)}
+
+    def _single_fetch(self, results):
+        return self.test.getCaseResults('robot_healthcheck', 'oom', 'master',
+                                        {'results': copy.deepcopy(results)})
+
+    def test_single_fetch_matches_two_calls(self):
+        for name, criterias in sorted(FIXTURES.items()):
+            for shuffle in (False, True):
+                results = build_results(criterias, shuffle)
+                self.assertEqual(self._single_fetch(results),
+                                 self._two_calls(results),
+                                 "%s (shuffle=%s)" % (name, shuffle))
+
+    def test_single_fetch_scores(self):
+        results = build_results(FIXTURES['recovered'])
+        self.assertEqual(self._single_fetch(results),
+                         {'result_4': "3/3",
+                          'result_period': "4/10",
+                          'result_percent': 40.0})
+
+    @mock.patch('reporting.utils.reporting_utils.getApiResults')
+    def test_single_fetch_one_request(self, mock_get):
+        mock_get.return_value = {'results': build_results(FIXTURES['flaky'])}
+        self.test.getCaseResults('robot_healthcheck', 'oom', 'master')
+        mock_get.assert_called_once_with('robot_healthcheck', 'oom',
+                                         'master', False)
+
+    def test_single_fetch_no_results(self):
+        self.assertRaises(TypeError, self.test.getCaseResults,
+                          'robot_healthcheck', 'oom', 'master', "[]")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from reporting.utils import static_output
+
+
+class staticOutputTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.css_dir = os.path.join(self.tmp_dir, "css")
+        os.makedirs(os.path.join(self.css_dir, "fonts"))
+        self._write(os.path.join(self.css_dir, "default.css"), "body {}")
+        self._write(os.path.join(self.css_dir, "fonts", "font.woff"), "font")
+        self.display_dir = os.path.join(self.tmp_dir, "display")
+
+    def _write(self, path, content):
+        with open(path, "w") as my_file:
+            my_file.write(content)
+
+    def test_publish_assets(self):
+        assets = static_output.publish_assets([self.css_dir],
+                                              self.display_dir)
+        self.assertEqual(sorted(assets), ["css/default.css",
+                                          "css/fonts/font.woff"])
+        fingerprinted = assets["css/default.css"]
+        self.assertRegexpMatches(fingerprinted,
+                                 r"^css/default\.[0-9a-f]{8}\.css$")
+        for path in (fingerprinted, "css/default.css"):
+            with open(os.path.join(self.display_dir, path)) as my_file:
+                self.assertEqual(my_file.read(), "body {}")
+        with open(os.path.join(self.display_dir, "assets.json")) as my_file:
+            self.assertEqual(json.load(my_file), assets)
+
+        # a new fingerprint replaces the old one
+        self._write(os.path.join(self.css_dir, "default.css"), "body {a}")
+        new_assets = static_output.publish_assets([self.css_dir],
+                                                  self.display_dir)
+        self.assertNotEqual(new_assets["css/default.css"], fingerprinted)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.display_dir, "css"))),
+            sorted(["default.css", "fonts",
+                    os.path.basename(new_assets["css/default.css"])]))
+
+    def test_precompress_tree(self):
+        page = os.path.join(self.tmp_dir, "status-oom.html")
+        self._write(page, "<html>%s</html>" % ("oom " * 200))
+        self._write(os.path.join(self.tmp_dir, "small.json"), "[]")
+        compressed = static_output.precompress_tree(self.tmp_dir,
+                                                    use_brotli=False)
+        self.assertEqual(compressed, [page])
+        with gzip.open(page + ".gz") as my_file:
+            self.assertEqual(my_file.read(),
+                             "<html>%s</html>" % ("oom " * 200))
+        self.assertFalse(os.path.exists(page + ".br"))
+        # only the changed outputs are compressed again
+        self.assertEqual(static_output.precompress_tree(self.tmp_dir), [])
+        mtime = os.path.getmtime(page) + 10
+        os.utime(page, (mtime, mtime))
+        self.assertEqual(static_output.precompress_tree(
+            self.tmp_dir, use_brotli=False), [page])
+
+    def test_precompress_brotli(self):
+        page = os.path.join(self.tmp_dir, "history.csv")
+        self._write(page, "date,score\n" * 50)
+        with mock.patch.object(static_output, 'brotli') as mock_brotli:
+            mock_brotli.compress.return_value = b"compressed"
+            written = static_output.precompress_file(page)
+        self.assertEqual(written, [page + ".gz", page + ".br"])
+        with open(page + ".br", "rb") as my_file:
+            self.assertEqual(my_file.read(), b"compressed")
+        self.assertEqual(os.path.getmtime(page + ".br"),
+                         os.path.getmtime(page + ".gz"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import logging
+import unittest
+from xml.etree import ElementTree
+
+from reporting.utils import render
+from reporting.utils import svg
+
+SVG_NS = "{http://www.w3.org/2000/svg}"
+
+
+class svgTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def test_gauge_angle(self):
+        self.assertEqual(svg.get_gauge_angle(0), -90)
+        self.assertEqual(svg.get_gauge_angle(50), 0)
+        self.assertEqual(svg.get_gauge_angle(100), 90)
+        self.assertEqual(svg.get_gauge_angle(250), 90)
+
+    def test_gauge_color(self):
+        self.assertEqual(svg.get_gauge_color(0), "#ff0000")
+        self.assertEqual(svg.get_gauge_color(0.5), "#ffff00")
+        self.assertEqual(svg.get_gauge_color(1), "#00ff00")
+
+    def test_gauge(self):
+        root = ElementTree.fromstring(svg.get_gauge_svg(75))
+        self.assertEqual(root.get('width'), "250")
+        self.assertEqual(root.find(SVG_NS + "title").text, "75%")
+        self.assertEqual(len(root.findall(".//%sg[@class='arc']/%spath" % (
+            SVG_NS, SVG_NS))), svg.GAUGE_SECTIONS)
+        pointer = root.find(".//%sg[@class='pointer']/%spath" % (SVG_NS,
+                                                                 SVG_NS))
+        self.assertEqual(pointer.get('transform'), "rotate(45)")
+        # no score yet
+        self.assertIn('rotate(-90)"/>', svg.get_gauge_svg("n/a"))
+
+    def test_trend(self):
+        root = ElementTree.fromstring(svg.get_trend_svg([
+            ["2018-03-01 10:00", 50.0],
+            ["2018-03-02 10:00", 100.0],
+            ["2018-03-05 10:00", 75.0]]))
+        line = root.find(".//%spath[@class='line']" % SVG_NS)
+        self.assertEqual(line.get('d'), "M0,30L57.5,0L230,15")
+        circles = root.findall(".//%scircle" % SVG_NS)
+        self.assertEqual(len(circles), 3)
+        self.assertEqual(circles[1].find(SVG_NS + "title").text,
+                         "2018-03-02 10:00: 100%")
+        self.assertEqual([text.text for text in root.findall(
+            ".//%sg[@class='x axis']/%stext" % (SVG_NS, SVG_NS))],
+                         ["03-01", "03-05"])
+
+    def test_trend_single_point(self):
+        root = ElementTree.fromstring(svg.get_trend_svg([
+            ["2018-03-01 10:00", 0.0]]))
+        self.assertEqual(root.find(".//%scircle" % SVG_NS).get('cx'), "115")
+        self.assertEqual(svg.get_trend_svg([]), "")
+
+    def test_trend_invalid_points(self):
+        # imported history rows with other date formats
+        root = ElementTree.fromstring(svg.get_trend_svg([
+            ["2018-03-01", 50.0],
+            ["2018-03-02 10:00", 100.0],
+            [None, 20.0],
+            ["2018-03-03 10:00", "n/a"],
+            ["2018-03-05 10:00", 75.0]]))
+        self.assertEqual(len(root.findall(".//%scircle" % SVG_NS)), 2)
+        self.assertEqual(svg.get_trend_svg([["2018-03-01", 50.0]]), "")
+
+    def test_filters(self):
+        template = render.get_environment().from_string(
+            "{{ 20.5|gauge_svg }}{{ none|trend_svg }}")
+        page = template.render()
+        self.assertTrue(page.startswith('<svg class="gauge"'))
+        self.assertNotIn("&lt;", page)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import logging
+import threading
+import unittest
+
+from reporting.tests.fake_testapi import FakeTestApi
+from reporting.utils import testapi_client
+
+RESULTS = [{'_id': "id%s" % index,
+            'case_name': 'robot_healthcheck',
+            'installer': 'oom',
+            'version': 'master',
+            'start_date': "2018-03-%02d 10:00:00" % (index + 1),
+            'criteria': 'PASS'} for index in range(6)]
+
+
+class testApiClientTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def _start(self, **kwargs):
+        fake_api = FakeTestApi(**kwargs).start()
+        self.addCleanup(fake_api.stop)
+        client = testapi_client.TestApiClient(fake_api.url, timeout=1,
+                                              retries=2, backoff_factor=0)
+        self.addCleanup(client.close)
+        return fake_api, client
+
+    def test_get_results(self):
+        fake_api, client = self._start(results=RESULTS)
+        results = client.get_results('robot_healthcheck', 'oom', 'master', 10)
+        self.assertEqual(len(results['results']), 6)
+        results = client.get_results('robot_healthcheck', 'oom', 'master', 10,
+                                     last=4)
+        self.assertEqual([res['_id'] for res in results['results']],
+                         ['id5', 'id4', 'id3', 'id2'])
+        self.assertIn('&last=4', fake_api.requests[-1]['path'])
+
+    def test_get_results_pages(self):
+        fake_api, client = self._start(results=RESULTS, page_size=4)
+        results = client.get_results('robot_healthcheck', 'oom', 'master', 10)
+        self.assertEqual([res['_id'] for res in results['results']],
+                         ['id5', 'id4', 'id3', 'id2', 'id1', 'id0'])
+        self.assertIn('&page=2', fake_api.requests[1]['path'])
+
+    def test_gzip_and_keep_alive(self):
+        fake_api, client = self._start(results=RESULTS)
+        for _ in range(3):
+            client.get_results('robot_healthcheck', 'oom', 'master', 10)
+        headers = fake_api.requests[0]['headers']
+        accept_encoding = [value for key, value in headers.items()
+                           if key.lower() == 'accept-encoding']
+        self.assertIn('gzip', accept_encoding[0])
+        # the same connection is reused for all the requests
+        self.assertEqual(
+            len(set(req['client_address'] for req in fake_api.requests)), 1)
+
+    def test_retry_on_server_error(self):
+        answers = [(503, '', {}), ('bad', 'not json', {}),
+                   (200, json.dumps({'results': []}), {})]
+
+        def responder(_):
+            status, body, headers = answers.pop(0)
+            return (200 if status == 'bad' else status), body, headers
+
+        fake_api, client = self._start(responder=responder)
+        results = client.get_results('robot_healthcheck', 'oom', 'master', 10)
+        self.assertEqual(results, {'results': []})
+        self.assertEqual(len(fake_api.requests), 3)
+
+    def test_retries_exhausted(self):
+        fake_api, client = self._start(
+            responder=lambda _: (500, '', {}))
+        with self.assertRaises(testapi_client.TestApiHTTPError) as ctx:
+            client.get_results('robot_healthcheck', 'oom', 'master', 10)
+        self.assertEqual(ctx.exception.status_code, 500)
+        self.assertEqual(len(fake_api.requests), 3)
+
+    def test_no_retry_on_client_error(self):
+        fake_api, client = self._start(
+            responder=lambda _: (404, '', {}))
+        self.assertRaises(testapi_client.TestApiHTTPError,
+                          client.get_results,
+                          'robot_healthcheck', 'oom', 'master', 10)
+        self.assertEqual(len(fake_api.requests), 1)
+
+    def test_bad_response(self):
+        _, client = self._start(
+            responder=lambda _: (200, 'not json', {}))
+        self.assertRaises(testapi_client.TestApiBadResponse,
+                          client.get_results,
+                          'robot_healthcheck', 'oom', 'master', 10)
+
+    def test_timeout(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def responder(_):
+            release.wait(5)
+            return 200, json.dumps({'results': []}), {}
+
+        _, client = self._start(responder=responder)
+        client.retries = 0
+        client.timeout = 0.2
+        self.assertRaises(testapi_client.TestApiTimeout,
+                          client.get_results,
+                          'robot_healthcheck', 'oom', 'master', 10)
+
+    def test_iter_results(self):
+        fake_api, client = self._start(results=RESULTS, page_size=4)
+        results = client.iter_results('robot_healthcheck', 'oom', 'master',
+                                      10, fields=['_id', 'criteria'])
+        first = next(results)
+        self.assertEqual(first, {'_id': 'id5', 'criteria': 'PASS'})
+        # the second page is requested lazily
+        self.assertEqual(len(fake_api.requests), 1)
+        self.assertEqual([res['_id'] for res in results],
+                         ['id4', 'id3', 'id2', 'id1', 'id0'])
+        self.assertEqual(len(fake_api.requests), 2)
+        self.assertIn('&page=2', fake_api.requests[1]['path'])
+
+    def test_iter_results_bad_response(self):
+        _, client = self._start(
+            responder=lambda _: (200, '{"results": [{"_id": 1}, ', {}))
+        self.assertRaises(testapi_client.TestApiBadResponse, list,
+                          client.iter_results('robot_healthcheck', 'oom',
+                                              'master', 10))
+
+    def test_connection_error(self):
+        client = testapi_client.TestApiClient(
+            "http://127.0.0.1:1/api/v1/results", timeout=1, retries=0)
+        self.addCleanup(client.close)
+        self.assertRaises(testapi_client.TestApiConnectionError,
+                          client.get_results,
+                          'robot_healthcheck', 'oom', 'master', 10)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
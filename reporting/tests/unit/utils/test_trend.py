@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 Orange and others.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import datetime
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from reporting.utils import history_store
+from reporting.utils import trend
+
+
+class trendTesting(unittest.TestCase):
+
+    logging.disable(logging.CRITICAL)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.history = history_store.HistoryStore(
+            os.path.join(self.tmp_dir, "history.db"))
+        self.addCleanup(self.history.close)
+
+    def test_downsample(self):
+        points = [["2018-03-%02d 10:00" % day, score]
+                  for day, score in zip(range(1, 7), [0, 100, 50, 50, 0, 30])]
+        self.assertEqual(trend.downsample(points, 10), points)
+        self.assertEqual(trend.downsample(points, 3),
+                         [["2018-03-02 10:00", 50.0],
+                          ["2018-03-04 10:00", 50.0],
+                          ["2018-03-06 10:00", 15.0]])
+        self.assertEqual(len(trend.downsample(points, 4)), 3)
+
+    def test_export_trend(self):
+        now = datetime.datetime.now()
+        for days, installer, score in ((40, 'oom', 10.0), (2, 'oom', 50.0),
+                                       (1, 'oom', 75.0), (1, 'heat', 0)):
+            date = (now - datetime.timedelta(days=days)).strftime(
+                "%Y-%m-%d %H:%M")
+            self.history.add('master', installer, 'robot_healthcheck',
+                             date, '2/3', score)
+        trend_file = os.path.join(self.tmp_dir,
+                                  "trend-oom-robot_healthcheck.json")
+        with open(trend_file, "w") as my_file:
+            my_file.write("[]")
+        with open(trend_file) as previous_file:
+            file_name = trend.export_trend(self.history, self.tmp_dir,
+                                           'master', 'oom',
+                                           'robot_healthcheck', 30, 60)
+            # replaced, not truncated under the readers
+            self.assertEqual(previous_file.read(), "[]")
+        self.assertEqual(file_name, "trend-oom-robot_healthcheck.json")
+        with open(os.path.join(self.tmp_dir, file_name)) as my_file:
+            points = json.load(my_file)
+        self.assertEqual([point[1] for point in points], [50.0, 75.0])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -8,9 +8,24 @@
 # http://www.apache.org/licenses/LICENSE-2.0
 
 import logging
+import multiprocessing
+import os
+import shutil
+import StringIO
+import tempfile
+import threading
 import unittest
 
+import mock
+
+from reporting.utils import log_queue
 from reporting.utils import reporting_utils
+from reporting.utils import testapi_client
+
+
+def log_in_child(message):
+    logging.getLogger("ONAP-Functest-Status").error(message)
+    return True
 
 
 class reportingUtilsTesting(unittest.TestCase):
@@ -23,6 +38,154 @@ class reportingUtilsTesting(unittest.TestCase):
     def test_foo(self):
         self.assertTrue(0 < 1)
 
+    def _write_config(self, config_file, period):
+        with open(config_file, "w") as my_file:
+            my_file.write("general:\n    period: %s\n"
+                          "    log:\n        log_level: ERROR\n"
+                          "    store:\n        dir:\n" % period)
+
+    def test_reporting_config(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        config_file = os.path.join(tmp_dir, "reporting.yaml")
+        self._write_config(config_file, 10)
+        config = self.test.ReportingConfig(config_file)
+        with mock.patch('reporting.utils.reporting_utils.yaml.safe_load',
+                        wraps=self.test.yaml.safe_load) as mock_load:
+            self.assertEqual(config.get('general.period'), 10)
+            self.assertEqual(config.get('general.log.log_level'), 'ERROR')
+            self.assertEqual(config.get('general.period'), 10)
+            self.assertEqual(mock_load.call_count, 1)
+            self.assertRaises(ValueError, config.get, 'general.foo')
+            # left empty to disable
+            self.assertIsNone(config.get('general.store.dir'))
+            self.assertRaises(ValueError, config.get, 'general.store.dir.foo')
+
+            # reload only when the modification time changes
+            self._write_config(config_file, 30)
+            mtime = os.path.getmtime(config_file) + 10
+            os.utime(config_file, (mtime, mtime))
+            self.assertEqual(config.get('general.period'), 30)
+            self.assertEqual(mock_load.call_count, 2)
+
+    @mock.patch('reporting.utils.reporting_utils.getApiResults')
+    def test_get_api_results_pool(self, mock_get):
+        mock_get.side_effect = lambda case, installer, version, criteria: {
+            'results': [case, installer, version, criteria]}
+        queries = [('robot_dcae', 'oom', 'master', False),
+                   ('robot_dcae', 'oom', 'master', True),
+                   ('robot_healthcheck', 'heat', 'beijing', False)]
+        results = self.test.getApiResultsPool(queries, nb_workers=2)
+        self.assertEqual(len(results), 3)
+        for query in queries:
+            self.assertEqual(results[query]['results'], list(query))
+
+    @mock.patch('reporting.utils.reporting_utils.getApiResults')
+    def test_get_api_results_pool_error(self, mock_get):
+        error = testapi_client.TestApiTimeout("timeout")
+        mock_get.side_effect = [error, {'results': []}]
+        queries = [('robot_dcae', 'oom', 'master', False),
+                   ('robot_dcae', 'heat', 'master', False)]
+        results = self.test.getApiResultsPool(queries, nb_workers=1)
+        self.assertIs(results[queries[0]], error)
+        self.assertEqual(results[queries[1]], {'results': []})
+
+    def test_get_api_results_pool_empty(self):
+        self.assertEqual(self.test.getApiResultsPool([], nb_workers=2), {})
+
+    def _get_logger_config(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        log_file = os.path.relpath(os.path.join(tmp_dir, "reporting.log"))
+        config = {'general.log.log_file': log_file,
+                  'general.log.log_level': 'INFO'}
+        for patcher in (
+                mock.patch('reporting.utils.reporting_utils.get_config',
+                           side_effect=config.get),
+                mock.patch('sys.stderr', StringIO.StringIO())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        root_logger = logging.getLogger()
+        self.addCleanup(root_logger.setLevel, root_logger.level)
+        self.addCleanup(self.test.stopLogger)
+        logging.disable(logging.NOTSET)
+        self.addCleanup(logging.disable, logging.CRITICAL)
+        return log_file
+
+    def test_get_logger(self):
+        log_file = self._get_logger_config()
+        nb_handlers = len(logging.getLogger().handlers)
+        logger = self.test.getLogger("ONAP-Functest-Status")
+        self.assertIs(self.test.getLogger("ONAP-Functest-Status"), logger)
+        self.test.getLogger("ONAP-Reporting-Service")
+        # the handlers are attached once
+        self.assertEqual(len(logging.getLogger().handlers), nb_handlers + 1)
+        logger.info("Case score: %s", "3/3")
+        logging.getLogger("reporting.utils.trend").debug("not logged")
+        self.test.stopLogger()
+        self.assertEqual(len(logging.getLogger().handlers), nb_handlers)
+        with open(log_file) as my_file:
+            lines = my_file.readlines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].endswith(
+            " [ONAP-Functest-Status] [INFO ]  Case score: 3/3\n"))
+
+    def test_get_logger_listener_thread(self):
+        self._get_logger_config()
+        logger = self.test.getLogger("ONAP-Functest-Status")
+        threads = []
+        handler = logging.Handler()
+        handler.emit = lambda record: threads.append(
+            threading.current_thread())
+        listener = self.test.LOG_HANDLERS[0][1]
+        listener.handlers += (handler,)
+        try:
+            raise ValueError("failed")
+        except ValueError:
+            logger.exception("Error")
+        self.test.stopLogger()
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_get_logger_forked_process(self):
+        log_file = self._get_logger_config()
+        logger = self.test.getLogger("ONAP-Functest-Status")
+        queue_handler = self.test.LOG_HANDLERS[0][0]
+        # a process forked by a pool writes its records directly
+        with mock.patch('os.getpid', return_value=queue_handler.pid + 1):
+            logger.error("PDF not generated")
+        with open(log_file) as my_file:
+            self.assertIn("PDF not generated", my_file.read())
+
+    def test_get_logger_pool_after_fork(self):
+        log_file = self._get_logger_config()
+        self.test.getLogger("ONAP-Functest-Status")
+        file_handler = self.test.LOG_HANDLERS[0][1].handlers[0]
+        # the listener thread is writing a record when the pool forks
+        locked = threading.Event()
+        release = threading.Event()
+
+        def write():
+            with file_handler.lock:
+                locked.set()
+                release.wait()
+        thread = threading.Thread(target=write)
+        thread.start()
+        locked.wait()
+        pool = multiprocessing.Pool(
+            1, initializer=log_queue.reinit_after_fork)
+        try:
+            result = pool.apply_async(log_in_child, ("Page rendered",))
+            self.assertTrue(result.get(timeout=10))
+        finally:
+            release.set()
+            thread.join()
+            # a blocked worker would never end
+            pool.terminate()
+            pool.join()
+        with open(log_file) as my_file:
+            self.assertIn("Page rendered", my_file.read())
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -0,0 +1,190 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Frontend bundles of the reporting pages
+
+  The third party libraries are vendored once (downloaded in the vendor
+  directory) then concatenated and minified with the page scripts and
+  styles in one JS and one CSS bundle per page, so that a page loads two
+  local files instead of fetching several CDNs.
+
+  The libraries are only downloaded by the bundle command, e.g. when
+  building the docker image:
+      python -m reporting.utils.bundle
+  the runs of the reporting build the bundles without network from the
+  libraries already vendored, leaving the missing ones out
+"""
+import hashlib
+import logging
+import os
+import sys
+
+import requests
+
+from reporting.utils import render
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+LOGGER = logging.getLogger(__name__)
+
+
+class BundleError(Exception):
+    """
+    A library cannot be vendored
+    """
+
+
+def vendor_library(url, path, sha256=None, proxies=None, timeout=30):
+    """
+    Download a library if it is not vendored yet
+    sha256 is the expected hash of the library, if known
+    """
+    # pylint: disable=too-many-arguments
+    if os.path.exists(path):
+        return path
+    try:
+        response = requests.get(url, proxies=proxies, timeout=timeout)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as exc:
+        raise BundleError("Cannot vendor %s: %s" % (url, exc))
+    if sha256 and hashlib.sha256(response.content).hexdigest() != sha256:
+        raise BundleError("Unexpected content for %s" % url)
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    render.write_atomic(path, response.content)
+    LOGGER.info("%s vendored in %s", url, path)
+    return path
+
+
+def vendor_libraries(libraries, vendor_dir, proxies=None):
+    """
+    Vendor a list of {name, url, sha256} libraries
+    return the list of the libraries which could not be vendored
+    """
+    missing = []
+    for library in libraries:
+        try:
+            vendor_library(library['url'],
+                           os.path.join(vendor_dir, library['name']),
+                           library.get('sha256'), proxies)
+        except BundleError as exc:
+            LOGGER.error("%s", exc)
+            missing.append(library['name'])
+    return missing
+
+
+def minify(content, ext):
+    """
+    Minify JS or CSS content, if rjsmin or rcssmin is installed
+    """
+    if ext == ".js" and rjsmin is not None:
+        return rjsmin.jsmin(content)
+    if ext == ".css" and rcssmin is not None:
+        return rcssmin.cssmin(content)
+    return content
+
+
+def build_bundle(sources, output):
+    """
+    Concatenate and minify the sources of a bundle
+
+    the missing sources are left out of the bundle
+    the bundle is written only if its content changed so that its
+    fingerprint and its compressed files are kept
+    return True if the bundle was written
+    """
+    ext = os.path.splitext(output)[1]
+    contents = []
+    for source in sources:
+        try:
+            with open(source) as my_file:
+                contents.append(minify(my_file.read(), ext))
+        except IOError as exc:
+            LOGGER.warning("%s left out of %s: %s", source, output, exc)
+    # a script missing its last semicolon must not run into the next one
+    content = (";\n" if ext == ".js" else "\n").join(contents)
+    try:
+        with open(output) as my_file:
+            if my_file.read() == content:
+                return False
+    except IOError:
+        pass
+    directory = os.path.dirname(output)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    render.write_atomic(output, content)
+    return True
+
+
+def build_bundles(bundles, bundle_dir):
+    """
+    Build the {name: sources} bundles in the bundle directory
+    return the list of the bundles which changed
+    """
+    changed = []
+    for name, sources in sorted(bundles.items()):
+        output = os.path.join(bundle_dir, name)
+        if build_bundle(sources, output):
+            LOGGER.info("Bundle %s built from %s", output, sources)
+            changed.append(output)
+    return changed
+
+
+def build(config, download=False):
+    """
+    Build the bundles of a configuration (general.bundle), downloading
+    the libraries not vendored yet if download is True (general.proxy)
+    the bundles are built from the available libraries
+    return the list of the bundles which changed
+    raise a BundleError if some libraries are not vendored, once the
+    bundles are built
+    """
+    vendor_dir = config.get('general.bundle.vendor_dir')
+    libraries = config.get('general.bundle.vendor') or []
+    if download:
+        missing = vendor_libraries(libraries, vendor_dir,
+                                   config.get('general.proxy'))
+    else:
+        missing = [library['name'] for library in libraries
+                   if not os.path.exists(os.path.join(vendor_dir,
+                                                      library['name']))]
+    changed = build_bundles(config.get('general.bundle.bundles'),
+                            config.get('general.bundle.dir'))
+    if missing:
+        raise BundleError("Libraries not vendored: %s" % missing)
+    return changed
+
+
+def main():
+    """
+    Vendor the libraries and build the bundles
+    """
+    from reporting.utils import reporting_utils
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        for output in build(reporting_utils.get_reporting_config(),
+                            download=True):
+            print(output)
+    except BundleError as exc:
+        LOGGER.error("%s", exc)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Incremental statistics of the testcases
+
+  The running state of each (version, installer, testcase) cell is kept
+  between the runs and only the results not applied yet update it, in
+  constant time per result newer than the last one applied:
+      streaks: length of the current streak, longest passing streak
+      flip rate: share of the consecutive results of the largest window
+                 changing of criteria (flakiness)
+      pass rates: share of passed results over the N last results of
+                  each window
+      MTTR: mean time from the first failure to the next pass
+  The state before the results of the last overlap hours (checkpoint) is
+  kept with these results. Each update reads the results of this window
+  to find the ones pushed late; only then are the results of the window
+  applied again from the checkpoint, in order. The results older than
+  the checkpoint are ignored.
+"""
+import collections
+import datetime
+import json
+import os
+# datetime.strptime is not thread safe until _strptime is imported
+import _strptime  # noqa pylint: disable=unused-import
+
+from reporting.utils import render
+from reporting.utils import result_batch
+from reporting.utils import result_store
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _parse_date(date):
+    try:
+        return datetime.datetime.strptime(date[:19], DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def _get_key(result):
+    # order of the results, by date then by id for the same date
+    return [result.get('start_date') or "",
+            str(result_store.get_result_id(result))]
+
+
+class CellStats(object):
+    """
+    Running statistics of a cell over its results in date order
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, windows, state=None, overlap=0):
+        self.windows = sorted(windows)
+        self.overlap = overlap
+        state = state or {}
+        self._load(state)
+        if 'recent' in state:
+            # state before the results of the overlap window and the
+            # [start_date, id, passed] of these results, oldest first
+            self.checkpoint = state['checkpoint']
+            self.recent = state['recent']
+        else:
+            # state saved without checkpoint, the results older than
+            # the last one applied cannot be applied any more
+            self.checkpoint = (self.get_state() if self.last is not None
+                               else None)
+            self.recent = []
+
+    def _load(self, state):
+        # [start_date, id] of the last result applied
+        self.last = state.get('last')
+        self.nb_results = state.get('nb_results', 0)
+        self.streak = state.get('streak', 0)
+        self.streak_passing = state.get('streak_passing')
+        self.longest_pass_streak = state.get('longest_pass_streak', 0)
+        # criteria of the results of the largest window, oldest first
+        self.outcomes = collections.deque(state.get('outcomes', []),
+                                          maxlen=self.windows[-1])
+        self.window_passes = list(state.get('window_passes') or [
+            sum(list(self.outcomes)[-window:]) for window in self.windows])
+        self.window_flips = state.get('window_flips', 0)
+        self.failure_start = state.get('failure_start')
+        self.nb_recoveries = state.get('nb_recoveries', 0)
+        self.recovery_time = state.get('recovery_time', 0.0)
+
+    def get_state(self):
+        """
+        Running state of the statistics, JSON serializable
+        """
+        return {'windows': self.windows,
+                'last': self.last,
+                'nb_results': self.nb_results,
+                'streak': self.streak,
+                'streak_passing': self.streak_passing,
+                'longest_pass_streak': self.longest_pass_streak,
+                'outcomes': list(self.outcomes),
+                'window_passes': list(self.window_passes),
+                'window_flips': self.window_flips,
+                'failure_start': self.failure_start,
+                'nb_recoveries': self.nb_recoveries,
+                'recovery_time': self.recovery_time}
+
+    def to_dict(self):
+        """
+        State of the statistics with its checkpoint, JSON serializable
+        """
+        state = self.get_state()
+        state['checkpoint'] = self.checkpoint
+        state['recent'] = self.recent
+        return state
+
+    def _add_outcome(self, passed):
+        outcomes = self.outcomes
+        if outcomes and outcomes[-1] != passed:
+            self.window_flips += 1
+        if len(outcomes) == outcomes.maxlen and len(outcomes) > 1:
+            # the oldest result leaves the largest window
+            if outcomes[0] != outcomes[1]:
+                self.window_flips -= 1
+        for index, window in enumerate(self.windows):
+            if len(outcomes) >= window:
+                self.window_passes[index] -= outcomes[-window]
+            self.window_passes[index] += passed
+        outcomes.append(passed)
+
+    def add(self, start_date, result_id, passed):
+        """
+        Apply a result newer than the last one applied
+        """
+        passed = int(bool(passed))
+        if self.streak_passing == bool(passed):
+            self.streak += 1
+        else:
+            self.streak = 1
+            self.streak_passing = bool(passed)
+        if passed:
+            self.longest_pass_streak = max(self.longest_pass_streak,
+                                           self.streak)
+            if self.failure_start is not None:
+                start, end = (_parse_date(self.failure_start),
+                              _parse_date(start_date))
+                if start is not None and end is not None:
+                    self.nb_recoveries += 1
+                    self.recovery_time += (end - start).total_seconds()
+                self.failure_start = None
+        elif self.failure_start is None:
+            self.failure_start = start_date
+        self._add_outcome(passed)
+        self.nb_results += 1
+        self.last = [start_date, str(result_id)]
+
+    def _move_checkpoint(self):
+        # the recent entries older than the overlap window before the
+        # newest one are applied to the checkpoint
+        limit = _parse_date(self.recent[-1][0])
+        if limit is None:
+            limit = self.recent[-1][0]
+        else:
+            limit = str(limit - datetime.timedelta(hours=self.overlap))
+        nb_old = 0
+        while self.recent[nb_old][0] < limit:
+            nb_old += 1
+        if not nb_old:
+            return
+        # statistics at the checkpoint
+        stats = CellStats(self.windows, self.checkpoint)
+        for entry in self.recent[:nb_old]:
+            stats.add(*entry)
+        self.checkpoint = stats.get_state()
+        self.recent = self.recent[nb_old:]
+
+    def update(self, results):
+        """
+        Apply the results not applied yet
+        results are sorted from the newest to the oldest like the
+        TestAPI answers, only the ones newer than the checkpoint are read
+        the results of the overlap window are applied again from the
+        checkpoint when a result is pushed late among them
+        return the nb of new results applied
+        """
+        start = self.checkpoint['last'] if self.checkpoint else None
+        applied = set(tuple(entry[:2]) for entry in self.recent)
+        new_entries = []
+        for result in results:
+            key = _get_key(result)
+            if start is not None and key[0] < start[0]:
+                break
+            if (start is None or key > start) and tuple(key) not in applied:
+                applied.add(tuple(key))
+                new_entries.append(key + [int(result_batch.has_pass(
+                    result.get('criteria')))])
+        if not new_entries:
+            return 0
+        new_entries.sort()
+        if self.last is None or new_entries[0][:2] > self.last:
+            entries = new_entries
+            self.recent.extend(new_entries)
+        else:
+            # pushed late, applied in order from the checkpoint
+            self._load(self.checkpoint or {})
+            entries = self.recent = sorted(self.recent + new_entries)
+        for entry in entries:
+            self.add(*entry)
+        self._move_checkpoint()
+        return len(new_entries)
+
+    def get_summary(self):
+        """
+        Statistics of the cell for the templates
+        rates in percent and MTTR in hours, None when undefined
+        """
+        nb_outcomes = len(self.outcomes)
+        mttr = None
+        if self.nb_recoveries:
+            mttr = round(self.recovery_time / self.nb_recoveries / 3600, 1)
+        return {
+            'nb_results': self.nb_results,
+            'streak': self.streak,
+            'streak_passing': self.streak_passing,
+            'longest_pass_streak': self.longest_pass_streak,
+            'flip_rate': (round(100.0 * self.window_flips /
+                                (nb_outcomes - 1), 1)
+                          if nb_outcomes > 1 else None),
+            'pass_rates': [
+                [window, round(100.0 * passes / min(window, nb_outcomes), 1)
+                 if nb_outcomes else None]
+                for window, passes in zip(self.windows,
+                                          self.window_passes)],
+            'mttr': mttr,
+            'failing_since': self.failure_start}
+
+
+class StatsStore(object):
+    """
+    CellStats of all the cells, persisted in a JSON file
+    without file the statistics are computed from the results given
+    to the first update
+    """
+
+    def __init__(self, stats_file, windows, overlap=None):
+        self.stats_file = stats_file
+        self.windows = sorted(windows)
+        # hours during which the results pushed late are applied in order
+        self.overlap = overlap or 0
+        self.stats = {}
+        states = {}
+        if stats_file:
+            try:
+                with open(stats_file) as my_file:
+                    states = json.load(my_file)
+            except (IOError, ValueError):
+                pass
+        for cell, state in states.items():
+            # the statistics of other windows are computed again
+            if state.get('windows') == self.windows:
+                self.stats[cell] = CellStats(self.windows, state,
+                                             self.overlap)
+
+    def get(self, cell):
+        """
+        Get the CellStats of a (version, installer, testcase) cell
+        """
+        key = "/".join(cell)
+        try:
+            return self.stats[key]
+        except KeyError:
+            self.stats[key] = CellStats(self.windows,
+                                        overlap=self.overlap)
+            return self.stats[key]
+
+    def update(self, cell, results):
+        """
+        Apply the new results of a cell
+        return the summary of its statistics
+        """
+        stats = self.get(cell)
+        stats.update(results)
+        return stats.get_summary()
+
+    def save(self):
+        """
+        Atomically save the statistics
+        """
+        if not self.stats_file:
+            return
+        directory = os.path.dirname(self.stats_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        render.write_atomic(
+            self.stats_file,
+            json.dumps(dict((cell, stats.to_dict())
+                            for cell, stats in self.stats.items()),
+                       sort_keys=True))
@@ -0,0 +1,134 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  SQLite store of the testcase scores history
+
+  One row per (version, installer, testcase, date) replaces the append
+  only testcases_history.txt files, which are exported from the store
+"""
+import csv
+import sqlite3
+
+HISTORY_HEADER = ["date", "testcase", "installer", "detail", "score"]
+# header of the legacy scenario_history_<installer>.csv files
+SCENARIO_HISTORY_HEADER = ["date", "scenario", "installer", "detail",
+                           "score"]
+
+
+class HistoryStore(object):
+    """
+    History of the scores of the testcases
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.connection = sqlite3.connect(db_file)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "version TEXT NOT NULL, installer TEXT NOT NULL, "
+                "testcase TEXT NOT NULL, date TEXT NOT NULL, "
+                "detail TEXT, score TEXT)")
+            self.connection.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS history_idx ON history "
+                "(version, installer, testcase, date)")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS history_date_idx ON history "
+                "(date)")
+
+    def close(self):
+        """
+        Close the database
+        """
+        self.connection.close()
+
+    def add(self, version, installer, testcase, date, detail, score):
+        """
+        Add the score of a testcase, replacing the one of the same date
+        """
+        self.add_many([(version, installer, testcase, date, detail, score)])
+
+    def add_many(self, rows):
+        """
+        Add (version, installer, testcase, date, detail, score) rows
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO history "
+                "(version, installer, testcase, date, detail, score) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [tuple(str(value) for value in row) for row in rows])
+
+    def has_history(self, version):
+        """
+        Check if some scores are stored for a version
+        """
+        cursor = self.connection.execute(
+            "SELECT 1 FROM history WHERE version = ? LIMIT 1", (version,))
+        return cursor.fetchone() is not None
+
+    def import_history_file(self, version, history_file):
+        """
+        Import a testcases_history.txt file of a version
+        return the number of imported rows
+        """
+        with open(history_file) as my_file:
+            rows = [(version, row['installer'], row['testcase'],
+                     row['date'], row['detail'], row['score'])
+                    for row in csv.DictReader(my_file)
+                    if row.get('installer') and row.get('testcase')]
+        self.add_many(rows)
+        return len(rows)
+
+    def get_history(self, version, installer=None, testcase=None,
+                    since=None):
+        """
+        Get the (date, testcase, installer, detail, score) rows of
+        a version sorted by date
+        """
+        query = ("SELECT date, testcase, installer, detail, score "
+                 "FROM history WHERE version = ?")
+        params = [version]
+        for column, value in (("installer", installer),
+                              ("testcase", testcase)):
+            if value is not None:
+                query += " AND %s = ?" % column
+                params.append(value)
+        if since is not None:
+            query += " AND date >= ?"
+            params.append(since)
+        query += " ORDER BY date, rowid"
+        return self.connection.execute(query, params).fetchall()
+
+    def export_csv(self, csv_file, version, installer=None, testcase=None,
+                   since=None, header=None):
+        """
+        Export the history of a version to a csv file with the
+        testcases_history.txt format, header by default
+        """
+        # pylint: disable=too-many-arguments
+        # the display tree is published while it is generated, imported
+        # here as the rendering depends on jinja2
+        from reporting.utils import render
+        lines = [",".join(header or HISTORY_HEADER)]
+        lines.extend(",".join(row) for row in
+                     self.get_history(version, installer, testcase, since))
+        render.write_atomic(csv_file,
+                            "".join(line + "\n" for line in lines).encode(
+                                "utf-8"))
+
+    def prune(self, oldest_date):
+        """
+        Remove the scores older than a date
+        return the number of removed rows
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM history WHERE date < ?", (oldest_date,))
+        return cursor.rowcount
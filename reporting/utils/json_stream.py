@@ -0,0 +1,117 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Incremental parsing of a JSON object read by chunks
+
+  The elements of one array member of the top level object are decoded
+  one at a time so that only the element being decoded is held in memory
+"""
+import codecs
+import json
+import re
+
+WHITESPACE = re.compile(r'\s*')
+
+ITEM = object()
+
+# buffered characters already decoded before the buffer is trimmed
+TRIM_SIZE = 65536
+
+
+class JSONStreamError(ValueError):
+    """
+    The stream is not a valid JSON object
+    """
+
+
+class _Reader(object):
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = u""
+        self.pos = 0
+        self.exhausted = False
+
+    def _read(self):
+        if self.exhausted:
+            raise JSONStreamError("Unexpected end of the JSON stream")
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.exhausted = True
+            chunk = b""
+        if self.pos > TRIM_SIZE:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += self.decoder.decode(chunk, final=self.exhausted)
+
+    def skip_whitespace(self):
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return
+            self._read()
+
+    def peek(self):
+        self.skip_whitespace()
+        return self.buf[self.pos]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise JSONStreamError("Expected %s at %s" % (char, self.pos))
+        self.pos += 1
+
+    def decode(self):
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                self._read()
+                continue
+            # a number may continue in the next chunk
+            if end == len(self.buf) and not self.exhausted:
+                self._read()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_object(chunks, array_key):
+    """
+    Iterate over a JSON object given as chunks of bytes
+
+    yield (ITEM, element) for each element of the array member array_key
+    and (key, value) for the other members of the object
+    """
+    reader = _Reader(chunks)
+    reader.expect(u"{")
+    if reader.peek() == u"}":
+        return
+    while True:
+        key = reader.decode()
+        reader.expect(u":")
+        if key == array_key and reader.peek() == u"[":
+            reader.expect(u"[")
+            if reader.peek() == u"]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield ITEM, reader.decode()
+                    if reader.peek() == u"]":
+                        reader.pos += 1
+                        break
+                    reader.expect(u",")
+        else:
+            yield key, reader.decode()
+        if reader.peek() == u"}":
+            return
+        reader.expect(u",")
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Non blocking logging
+
+  The records are put in a queue by a QueueHandler and written to the
+  log file and the console by the handlers of a QueueListener thread so
+  that the disk I/O does not slow the thread logging them.
+  The standard QueueHandler and QueueListener are used when available
+  (python 3), the equivalent classes below otherwise.
+
+  Python 2 does not reinitialise the locks of the handlers in a forked
+  process: the multiprocessing pools start their workers with
+  reinit_after_fork so that a lock held by the listener thread at fork
+  time does not block the workers.
+"""
+import logging
+import os
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class QueueHandler(logging.Handler):
+    """
+    Handler putting the records in a queue
+    """
+
+    def __init__(self, record_queue):
+        logging.Handler.__init__(self)
+        self.queue = record_queue
+
+    def prepare(self, record):
+        """
+        Merge the message, its arguments and its traceback before the
+        record is queued so that the handlers of the listener do not
+        format mutable args
+        """
+        message = self.format(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+
+
+class QueueListener(object):
+    """
+    Thread passing the records of a queue to its handlers
+    """
+    _sentinel = None
+
+    def __init__(self, record_queue, *handlers, **kwargs):
+        self.queue = record_queue
+        self.handlers = handlers
+        self.respect_handler_level = kwargs.get('respect_handler_level',
+                                                False)
+        self._thread = None
+
+    def start(self):
+        """
+        Start the thread of the listener
+        """
+        self._thread = threading.Thread(target=self._monitor)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def handle(self, record):
+        """
+        Pass a record to the handlers
+        """
+        for handler in self.handlers:
+            if (not self.respect_handler_level or
+                    record.levelno >= handler.level):
+                handler.handle(record)
+
+    def _monitor(self):
+        while True:
+            record = self.queue.get()
+            if record is self._sentinel:
+                break
+            self.handle(record)
+
+    def stop(self):
+        """
+        Handle the queued records then stop the thread
+        """
+        if self._thread is not None:
+            self.queue.put_nowait(self._sentinel)
+            self._thread.join()
+            self._thread = None
+
+
+try:
+    from logging.handlers import QueueHandler  # noqa pylint: disable=E0611
+    from logging.handlers import QueueListener  # noqa pylint: disable=E0611
+except ImportError:
+    pass
+
+
+class ProcessQueueHandler(QueueHandler):
+    """
+    QueueHandler of a process with a QueueListener
+
+    the processes forked by a multiprocessing pool inherit the handler
+    but not the thread of the listener, they pass their records to the
+    handlers of the listener directly
+    """
+
+    def __init__(self, record_queue, listener):
+        QueueHandler.__init__(self, record_queue)
+        self.listener = listener
+        self.pid = os.getpid()
+
+    def emit(self, record):
+        if os.getpid() != self.pid:
+            self.listener.handle(record)
+        else:
+            QueueHandler.emit(self, record)
+
+
+def reinit_after_fork():
+    """
+    Give new locks to the handlers of the root logger and of their
+    listeners, in a forked process
+    """
+    for handler in logging.getLogger().handlers:
+        handler.createLock()
+        listener = getattr(handler, 'listener', None)
+        if listener is not None:
+            for listener_handler in listener.handlers:
+                listener_handler.createLock()
+
+
+def start_listener(*handlers):
+    """
+    Start a QueueListener passing the records to the handlers
+    return the handler queuing the records and the listener
+    """
+    record_queue = queue.Queue(-1)
+    listener = QueueListener(record_queue, *handlers,
+                             respect_handler_level=True)
+    listener.start()
+    return ProcessQueueHandler(record_queue, listener), listener
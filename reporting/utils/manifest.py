@@ -0,0 +1,95 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Manifest of the generated outputs
+
+  The fingerprint of the inputs of each output (results, template,
+  configuration) is kept between the runs so that only the outputs
+  whose inputs changed are generated again
+"""
+import hashlib
+import json
+import os
+
+from reporting.utils import render
+from reporting.utils import result_store
+
+
+def get_fingerprint(*inputs):
+    """
+    Fingerprint of a list of JSON serializable inputs
+    """
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True)).hexdigest()
+
+
+def get_file_hash(path):
+    """
+    Content hash of a file
+    """
+    content_hash = hashlib.sha256()
+    with open(path, "rb") as my_file:
+        for chunk in iter(lambda: my_file.read(65536), b""):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def get_results_fingerprint(results):
+    """
+    Fingerprint of the results of a query
+    results may be the testapi_client.TestApiError of the query
+    """
+    if isinstance(results, Exception):
+        return get_fingerprint({'error': type(results).__name__})
+    return get_fingerprint(sorted(
+        [result_store.get_result_id(res), res.get('start_date'),
+         res.get('criteria')] for res in results['results']))
+
+
+class Manifest(object):
+    """
+    {output: fingerprint} of the outputs of the last run
+    """
+
+    def __init__(self, manifest_file):
+        self.manifest_file = manifest_file
+        try:
+            with open(manifest_file) as my_file:
+                self.fingerprints = json.load(my_file)
+        except (IOError, ValueError):
+            self.fingerprints = {}
+        self.skipped = []
+
+    def is_changed(self, output, fingerprint, path=None):
+        """
+        Check if an output must be generated again
+        path is the file of the output if it must still exist
+        the output is recorded as skipped if it did not change
+        """
+        if (self.fingerprints.get(output) == fingerprint and
+                (path is None or os.path.exists(path))):
+            self.skipped.append(output)
+            return False
+        return True
+
+    def update(self, output, fingerprint):
+        """
+        Record the fingerprint of a generated output
+        """
+        self.fingerprints[output] = fingerprint
+
+    def save(self):
+        """
+        Atomically save the manifest
+        """
+        directory = os.path.dirname(self.manifest_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        render.write_atomic(
+            self.manifest_file,
+            json.dumps(self.fingerprints, indent=2, sort_keys=True))
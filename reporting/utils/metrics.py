@@ -0,0 +1,229 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Timing and metrics of the reporting runs
+
+  The durations of the stages of a run (fetch, request, parse, score,
+  render, write...) are recorded as spans tagged with their version,
+  installer and testcase, next to counters such as the nb of TestAPI
+  requests and the nb of bytes read or written.
+  The spans are aggregated per stage and labels so that a long running
+  service does not keep them all, the aggregates are exported as a JSON
+  run summary and in the Prometheus text format.
+"""
+import contextlib
+import datetime
+import json
+import threading
+import time
+
+PREFIX = "reporting"
+
+# nb of slowest cells of the summary
+NB_SLOWEST = 10
+
+
+def _get_labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()
+                        if value is not None))
+
+
+def _escape(value):
+    return (value.replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (key, _escape(value))
+                             for key, value in labels)
+
+
+class Metrics(object):
+    """
+    Thread safe registry of the spans and counters of a run
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans = {}
+        self.counters = {}
+        self.start = time.time()
+
+    def reset(self):
+        """
+        Forget the spans and counters, e.g. at the start of a run
+        """
+        with self.lock:
+            self.spans = {}
+            self.counters = {}
+            self.start = time.time()
+
+    def observe(self, stage, duration, **labels):
+        """
+        Record the duration (in seconds) of a stage
+        """
+        key = (stage, _get_labels(labels))
+        with self.lock:
+            aggregate = self.spans.setdefault(key, [0, 0.0, 0.0])
+            aggregate[0] += 1
+            aggregate[1] += duration
+            aggregate[2] = max(aggregate[2], duration)
+
+    @contextlib.contextmanager
+    def span(self, stage, **labels):
+        """
+        Record the duration of the block of a with statement
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.time() - start, **labels)
+
+    def incr(self, name, value=1, **labels):
+        """
+        Increment a counter
+        """
+        key = (name, _get_labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def get_stages(self):
+        """
+        Get the {stage: {count, total, max}} of all the labels
+        """
+        stages = {}
+        with self.lock:
+            spans = list(self.spans.items())
+        for (stage, _), (count, total, maximum) in spans:
+            aggregate = stages.setdefault(
+                stage, {'count': 0, 'total': 0.0, 'max': 0.0})
+            aggregate['count'] += count
+            aggregate['total'] += total
+            aggregate['max'] = max(aggregate['max'], maximum)
+        return stages
+
+    def get_cells(self):
+        """
+        Get the stages of each (version, installer, testcase) cell,
+        slowest cells first
+        """
+        cells = {}
+        with self.lock:
+            spans = list(self.spans.items())
+        for (stage, labels), (_, total, _) in spans:
+            labels = dict(labels)
+            if 'testcase' not in labels:
+                continue
+            cell = (labels.get('version'), labels.get('installer'),
+                    labels['testcase'])
+            stages = cells.setdefault(cell, {})
+            stages[stage] = stages.get(stage, 0.0) + total
+        return sorted(({'version': cell[0], 'installer': cell[1],
+                        'testcase': cell[2], 'total': sum(stages.values()),
+                        'stages': stages}
+                       for cell, stages in cells.items()),
+                      key=lambda cell: -cell['total'])
+
+    def get_summary(self, nb_slowest=NB_SLOWEST):
+        """
+        Get the JSON summary of the run
+        """
+        with self.lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+        return {
+            'start': datetime.datetime.fromtimestamp(
+                self.start).strftime("%Y-%m-%d %H:%M:%S"),
+            'duration': time.time() - self.start,
+            'stages': self.get_stages(),
+            'slowest_cells': self.get_cells()[:nb_slowest],
+            'spans': [{'stage': stage, 'labels': dict(labels),
+                       'count': count, 'total': total, 'max': maximum}
+                      for (stage, labels), (count, total, maximum)
+                      in spans],
+            'counters': [{'name': name, 'labels': dict(labels),
+                          'value': value}
+                         for (name, labels), value in counters]}
+
+    def get_prometheus(self, prefix=PREFIX):
+        """
+        Get the metrics in the Prometheus text format
+        """
+        with self.lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+        name = prefix + "_stage_duration_seconds"
+        lines = ["# HELP %s Duration of the stages of the run" % name,
+                 "# TYPE %s summary" % name]
+        for (stage, labels), (count, total, _) in spans:
+            labels = _format_labels((('stage', stage),) + labels)
+            lines.append("%s_sum%s %r" % (name, labels, total))
+            lines.append("%s_count%s %d" % (name, labels, count))
+        counter_names = []
+        for (counter, _), _ in counters:
+            if counter not in counter_names:
+                counter_names.append(counter)
+        for counter in counter_names:
+            name = "%s_%s_total" % (prefix, counter)
+            lines.append("# TYPE %s counter" % name)
+            lines.extend("%s%s %r" % (name, _format_labels(labels), value)
+                         for (key, labels), value in counters
+                         if key == counter)
+        name = prefix + "_run_start_timestamp_seconds"
+        lines.extend(["# TYPE %s gauge" % name,
+                      "%s %r" % (name, self.start),
+                      "# TYPE %s_run_duration_seconds gauge" % prefix,
+                      "%s_run_duration_seconds %r" % (
+                          prefix, time.time() - self.start)])
+        return "\n".join(lines) + "\n"
+
+    def write_summary(self, path, nb_slowest=NB_SLOWEST):
+        """
+        Write the JSON summary of the run
+        """
+        # render records its durations in the metrics
+        from reporting.utils import render
+        render.write_atomic(path, json.dumps(
+            self.get_summary(nb_slowest), indent=2, sort_keys=True))
+
+    def write_prometheus(self, path, prefix=PREFIX):
+        """
+        Write the metrics in the Prometheus text format, e.g. for the
+        textfile collector of the node exporter
+        """
+        from reporting.utils import render
+        render.write_atomic(path, self.get_prometheus(prefix))
+
+
+# registry of the process
+METRICS = Metrics()
+
+
+def observe(stage, duration, **labels):
+    """
+    Record the duration of a stage in the registry of the process
+    """
+    METRICS.observe(stage, duration, **labels)
+
+
+def span(stage, **labels):
+    """
+    Record the duration of a with block in the registry of the process
+    """
+    return METRICS.span(stage, **labels)
+
+
+def incr(name, value=1, **labels):
+    """
+    Increment a counter of the registry of the process
+    """
+    METRICS.incr(name, value, **labels)
@@ -0,0 +1,181 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  PDF export of the reporting pages
+
+  The pages are converted by wkhtmltopdf (pdfkit) in a pool of worker
+  processes. The remote CSS/JS of a page are replaced by their local
+  copies, or dropped, so that a conversion never waits for the network.
+  The converted copy of a page is written out of the display directory,
+  its relative links resolved from the directory of the page.
+  The content hash of each exported page is kept in a manifest and the
+  pages that did not change since their last export are skipped.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import urllib
+
+import pdfkit
+
+from reporting.utils import log_queue
+from reporting.utils import manifest as manifest_utils
+
+LOGGER = logging.getLogger(__name__)
+
+EXPORTED = "exported"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+# <script src="http..."></script> and <link href="http..."> of the pages
+REMOTE_ASSET = re.compile(
+    r'<script[^>]*\ssrc="(?P<script>(https?:)?//[^"]+)"[^>]*>\s*</script>|'
+    r'<link[^>]*\shref="(?P<link>(https?:)?//[^"]+)"[^>]*>')
+
+HEAD = re.compile(r'<head(\s[^>]*)?>', re.IGNORECASE)
+
+
+def get_pdf_path(html_path):
+    """
+    Path of the PDF export of a page
+    """
+    return os.path.splitext(html_path)[0] + ".pdf"
+
+
+def localize_assets(html, assets):
+    """
+    Replace the remote CSS/JS of a page by their local copies
+
+    assets is a dict {remote url: local path}, the remote CSS/JS without
+    local copy, or whose local copy does not exist, are removed
+    """
+    def replace(match):
+        url = match.group('script') or match.group('link')
+        local_path = assets.get(url)
+        if local_path is None or not os.path.isfile(local_path):
+            LOGGER.debug("No local copy of %s, removed", url)
+            return ""
+        return match.group(0).replace(
+            url, "file://" + os.path.abspath(local_path))
+
+    return REMOTE_ASSET.sub(replace, html)
+
+
+def set_base(html, directory):
+    """
+    Resolve the relative links of a page from a directory
+    """
+    base = '<base href="file://%s/">' % urllib.quote(
+        os.path.abspath(directory))
+    match = HEAD.search(html)
+    if match is None:
+        return base + html
+    return html[:match.end()] + base + html[match.end():]
+
+
+def get_content_hash(html, assets, options):
+    """
+    Hash of what a PDF export depends on
+    """
+    return manifest_utils.get_fingerprint(
+        hashlib.sha256(html).hexdigest(), sorted(assets.items()),
+        sorted(options.items()))
+
+
+def export_page(html_path, html, options):
+    """
+    Convert a page (with its remote assets already localized) to PDF
+
+    the page is converted from a temporary copy out of the display
+    directory, the PDF is written atomically
+    return the (html_path, status) of the export
+    """
+    directory = os.path.dirname(html_path) or "."
+    pdf_path = get_pdf_path(html_path)
+    fd, tmp_html = tempfile.mkstemp(suffix=".html")
+    with os.fdopen(fd, "wb") as my_file:
+        my_file.write(html)
+    fd, tmp_pdf = tempfile.mkstemp(dir=directory, suffix=".pdf")
+    os.close(fd)
+    try:
+        try:
+            pdfkit.from_file(tmp_html, tmp_pdf, options=options)
+        except IOError as exc:
+            # wkhtmltopdf fails on some assets but the PDF is generated
+            if not os.path.getsize(tmp_pdf):
+                raise
+            LOGGER.debug("PDF of %s generated anyway: %s", html_path, exc)
+        os.chmod(tmp_pdf, 0o644)
+        os.rename(tmp_pdf, pdf_path)
+        return html_path, EXPORTED
+    except Exception as exc:  # pylint: disable=broad-except
+        LOGGER.error("Impossible to generate the PDF of %s: %s",
+                     html_path, exc)
+        os.remove(tmp_pdf)
+        return html_path, FAILED
+    finally:
+        os.remove(tmp_html)
+
+
+def _export_job(args):
+    return export_page(*args)
+
+
+def export_pages(html_paths, manifest_file, assets=None, options=None,
+                 nb_processes=0):
+    """
+    Export a list of pages to PDF
+
+    the pages whose content hash is the one of their last export, and
+    whose PDF still exists, are skipped
+    nb_processes is the nb of wkhtmltopdf run at the same time,
+    0 for the nb of cores
+    return the list of the (html_path, status) of the pages
+    """
+    assets = assets or {}
+    options = options or {}
+    manifest = manifest_utils.Manifest(manifest_file)
+    statuses = []
+    jobs = []
+    hashes = {}
+    for html_path in html_paths:
+        with open(html_path, "rb") as my_file:
+            html = my_file.read()
+        content_hash = get_content_hash(html, assets, options)
+        if not manifest.is_changed(html_path, content_hash,
+                                   get_pdf_path(html_path)):
+            statuses.append((html_path, SKIPPED))
+            continue
+        hashes[html_path] = content_hash
+        html = set_base(localize_assets(html.decode("utf-8"), assets),
+                        os.path.dirname(html_path) or ".").encode("utf-8")
+        jobs.append((html_path, html, options))
+
+    if not nb_processes:
+        nb_processes = multiprocessing.cpu_count()
+    nb_processes = min(nb_processes, len(jobs))
+    if nb_processes < 2:
+        statuses.extend(_export_job(job) for job in jobs)
+    else:
+        pool = multiprocessing.Pool(
+            nb_processes, initializer=log_queue.reinit_after_fork)
+        try:
+            statuses.extend(pool.map(_export_job, jobs))
+        finally:
+            pool.close()
+            pool.join()
+
+    for html_path, status in statuses:
+        if status == EXPORTED:
+            manifest.update(html_path, hashes[html_path])
+    manifest.save()
+    return statuses
@@ -0,0 +1,157 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Rendering of the reporting pages
+
+  The templates are compiled once in a shared Jinja2 environment, kept
+  between runs in a bytecode cache, and the pages are rendered in
+  parallel then written atomically so that a page is never half written
+  The render and write durations of the pages rendered by the worker
+  processes are recorded in the metrics of the parent process
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+
+import jinja2
+
+from reporting.utils import log_queue
+from reporting.utils import metrics
+from reporting.utils import svg
+
+TEMPLATE_DIR = "./reporting/functest/template"
+
+ENVIRONMENTS = {}
+
+
+@jinja2.contextfilter
+def asset_filter(context, path):
+    """
+    Fingerprinted path of an asset, from the assets of the page context
+    """
+    return (context.get('assets') or {}).get(path, path)
+
+
+def gauge_svg_filter(score):
+    """
+    Inline SVG gauge of a score
+    """
+    return jinja2.Markup(svg.get_gauge_svg(score))
+
+
+def trend_svg_filter(points):
+    """
+    Inline SVG trend line of [date, score] points
+    """
+    return jinja2.Markup(svg.get_trend_svg(points or []))
+
+
+def get_environment(template_dir=TEMPLATE_DIR, cache_dir=None):
+    """
+    Get the Jinja2 environment shared by all the pages of a template
+    directory
+    """
+    try:
+        return ENVIRONMENTS[(template_dir, cache_dir)]
+    except KeyError:
+        bytecode_cache = None
+        if cache_dir:
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            bytecode_cache = jinja2.FileSystemBytecodeCache(cache_dir)
+        environment = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(template_dir),
+            autoescape=True,
+            bytecode_cache=bytecode_cache)
+        environment.filters['asset'] = asset_filter
+        environment.filters['gauge_svg'] = gauge_svg_filter
+        environment.filters['trend_svg'] = trend_svg_filter
+        ENVIRONMENTS[(template_dir, cache_dir)] = environment
+        return environment
+
+
+def write_atomic(path, content, mode=0o644):
+    """
+    Write a file through a temporary file renamed to path
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as my_file:
+            my_file.write(content)
+        os.chmod(tmp_path, mode)
+        os.rename(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def _render(template_name, output_path, context, template_dir, cache_dir):
+    # pylint: disable=too-many-arguments
+    template = get_environment(template_dir, cache_dir).get_template(
+        template_name)
+    start = time.time()
+    content = template.render(**context).encode("utf-8")
+    render_time = time.time() - start
+    write_atomic(output_path, content)
+    return (output_path, render_time, time.time() - start - render_time,
+            len(content))
+
+
+def _record(output_path, render_time, write_time, nb_bytes):
+    metrics.observe('render', render_time, page=output_path)
+    metrics.observe('write', write_time, output='page', page=output_path)
+    metrics.incr('bytes_written', nb_bytes, output='page')
+    return output_path
+
+
+def render_page(template_name, output_path, context,
+                template_dir=TEMPLATE_DIR, cache_dir=None):
+    """
+    Render a page and write it atomically
+    """
+    # pylint: disable=too-many-arguments
+    return _record(*_render(template_name, output_path, context,
+                            template_dir, cache_dir))
+
+
+def _render_job(args):
+    job, template_dir, cache_dir = args
+    return _render(job[0], job[1], job[2], template_dir, cache_dir)
+
+
+def render_pages(jobs, nb_processes=0, template_dir=TEMPLATE_DIR,
+                 cache_dir=None):
+    """
+    Render a list of (template_name, output_path, context) jobs
+
+    The templates are compiled before the worker processes are started
+    so that they are shared by all of them
+    nb_processes is the nb of worker processes, 0 for the nb of cores
+    return the list of the written pages
+    """
+    jobs = list(jobs)
+    environment = get_environment(template_dir, cache_dir)
+    for template_name in set(job[0] for job in jobs):
+        environment.get_template(template_name)
+
+    args = [(job, template_dir, cache_dir) for job in jobs]
+    if not nb_processes:
+        nb_processes = multiprocessing.cpu_count()
+    nb_processes = min(nb_processes, len(jobs))
+    if nb_processes < 2:
+        return [_record(*_render_job(arg)) for arg in args]
+    pool = multiprocessing.Pool(nb_processes,
+                                initializer=log_queue.reinit_after_fork)
+    try:
+        return [_record(*page) for page in pool.map(_render_job, args)]
+    finally:
+        pool.close()
+        pool.join()
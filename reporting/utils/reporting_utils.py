@@ -6,19 +6,51 @@
 #
 # http://www.apache.org/licenses/LICENSE-2.0
 #
+import atexit
 import logging
-import json
 import os
-import requests
-import pdfkit
+import threading
+from multiprocessing.pool import ThreadPool
 import yaml
 
+from reporting.utils import history_store
+from reporting.utils import log_queue
+from reporting.utils import metrics
+from reporting.utils import result_batch
+from reporting.utils import result_store
+
+# testapi_client (requests) and pdfkit are imported by the functions
+# using them so that the configuration and the scoring utilities are
+# imported quickly, e.g. to export the history
+
+LOGGER = logging.getLogger(__name__)
+
 
 # ----------------------------------------------------------
 #
 #               YAML UTILS
 #
 # -----------------------------------------------------------
+class ConfigError(ValueError):
+    """
+    A parameter is not defined in the configuration
+    """
+
+
+def _get_parameter(file_yaml, parameter):
+    """
+    Returns the value of a dotted parameter in a parsed yaml document
+    a parameter left empty is None
+    """
+    value = file_yaml
+    for element in parameter.split("."):
+        if not isinstance(value, dict) or element not in value:
+            raise ConfigError("The parameter %s is not defined in"
+                              " reporting.yaml" % parameter)
+        value = value[element]
+    return value
+
+
 def get_parameter_from_yaml(parameter, config_file):
     """
     Returns the value of a given parameter in file.yaml
@@ -28,21 +60,72 @@ def get_parameter_from_yaml(parameter, config_file):
     with open(config_file) as my_file:
         file_yaml = yaml.safe_load(my_file)
     my_file.close()
-    value = file_yaml
-    for element in parameter.split("."):
-        value = value.get(element)
-        if value is None:
-            raise ValueError("The parameter %s is not defined in"
-                             " reporting.yaml" % parameter)
-    return value
+    return _get_parameter(file_yaml, parameter)
+
+
+class ReportingConfig(object):
+    """
+    Configuration loaded once from a yaml file
+
+    The file is parsed again only when its modification time changes
+    and the values of the dotted parameters are computed once per load
+    """
+
+    def __init__(self, config_file):
+        self.config_file = config_file
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._yaml = None
+        self._values = {}
+
+    def _load(self):
+        mtime = os.path.getmtime(self.config_file)
+        if mtime != self._mtime:
+            with open(self.config_file) as my_file:
+                self._yaml = yaml.safe_load(my_file)
+            self._values = {}
+            self._mtime = mtime
+
+    def get(self, parameter):
+        """
+        Returns the value of a parameter given in string format with dots
+        Example: general.log.log_level
+        """
+        with self._lock:
+            self._load()
+            try:
+                return self._values[parameter]
+            except KeyError:
+                value = _get_parameter(self._yaml, parameter)
+                self._values[parameter] = value
+                return value
+
+
+CONFIGS = {}
+CONFIGS_LOCK = threading.Lock()
+
+
+def get_reporting_config(config_file=None):
+    """
+    Get the configuration object of a yaml configuration file
+    default to the file referenced by CONFIG_REPORTING_YAML
+    """
+    if config_file is None:
+        config_file = os.environ["CONFIG_REPORTING_YAML"]
+    with CONFIGS_LOCK:
+        try:
+            return CONFIGS[config_file]
+        except KeyError:
+            config = ReportingConfig(config_file)
+            CONFIGS[config_file] = config
+            return config
 
 
 def get_config(parameter):
     """
     Get configuration parameter from yaml configuration file
     """
-    yaml_ = os.environ["CONFIG_REPORTING_YAML"]
-    return get_parameter_from_yaml(parameter, yaml_)
+    return get_reporting_config().get(parameter)
 
 
 # ----------------------------------------------------------
@@ -50,26 +133,53 @@ def get_config(parameter):
 #               LOGGER UTILS
 #
 # -----------------------------------------------------------
+LOG_FORMAT = "%(asctime)s [%(name)s] [%(levelname)-5.5s]  %(message)s"
+
+# (queue handler, listener) of the root logger
+LOG_HANDLERS = []
+LOG_LOCK = threading.Lock()
+
+
+def stopLogger():
+    """
+    Write the queued records and detach the handlers of getLogger
+    """
+    with LOG_LOCK:
+        for queue_handler, listener in LOG_HANDLERS:
+            logging.getLogger().removeHandler(queue_handler)
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        del LOG_HANDLERS[:]
+
+
 def getLogger(module):
     """
     Get Logger
+
+    the file and console handlers are attached once to the root logger,
+    behind a queue so that the records are written by a listener thread,
+    the level and the file come from the cached configuration
     """
-    log_formatter = logging.Formatter("%(asctime)s [" +
-                                      module +
-                                      "] [%(levelname)-5.5s]  %(message)s")
-    logger = logging.getLogger()
     log_file = get_config('general.log.log_file')
     log_level = get_config('general.log.log_level')
-
-    file_handler = logging.FileHandler("{0}/{1}".format('.', log_file))
-    file_handler.setFormatter(log_formatter)
-    logger.addHandler(file_handler)
-
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(log_formatter)
-    logger.addHandler(console_handler)
-    logger.setLevel(log_level)
-    return logger
+    root_logger = logging.getLogger()
+    with LOG_LOCK:
+        if not LOG_HANDLERS:
+            log_formatter = logging.Formatter(LOG_FORMAT)
+            file_handler = logging.FileHandler(
+                "{0}/{1}".format('.', log_file))
+            file_handler.setFormatter(log_formatter)
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(log_formatter)
+            queue_handler, listener = log_queue.start_listener(
+                file_handler, console_handler)
+            root_logger.addHandler(queue_handler)
+            LOG_HANDLERS.append((queue_handler, listener))
+            # the queued records are written before the process exits
+            atexit.register(stopLogger)
+        root_logger.setLevel(log_level)
+    return logging.getLogger(module)
 
 
 # ----------------------------------------------------------
@@ -77,36 +187,332 @@ def getLogger(module):
 #               REPORTING UTILS
 #
 # -----------------------------------------------------------
-def getApiResults(case, installer, version, criteria):
+TESTAPI_CLIENTS = {}
+TESTAPI_CLIENTS_LOCK = threading.Lock()
+# overrides the mode of the cache of the TestAPI answers
+TESTAPI_CACHE_VARIABLE = "TESTAPI_CACHE_MODE"
+
+# fields dispatching the results of a batch call to their queries
+BATCH_FIELDS = ('case_name', 'installer', 'version')
+# answers of a TestAPI rejecting the queries without case
+BATCH_UNSUPPORTED_STATUS = (400, 404, 405, 422)
+
+
+def get_testapi_cache_settings():
+    """
+    Get the directory and the mode of the cache of the TestAPI answers,
+    the mode may be overridden by TESTAPI_CACHE_MODE
+    (None, None) when the answers are not cached
+    """
+    cache_dir = get_config('testapi.cache.dir')
+    if not cache_dir:
+        return None, None
+    return (cache_dir, os.environ.get(TESTAPI_CACHE_VARIABLE) or
+            get_config('testapi.cache.mode'))
+
+
+def get_result_store():
+    """
+    Get the result_store.ResultStore of the configuration, None without
+    store or when the TestAPI answers are recorded or replayed as the
+    queries of the store depend on its content
+    """
+    from reporting.utils import response_cache
+    store_dir = get_config('general.store.dir')
+    if not store_dir or get_testapi_cache_settings()[1] in (
+            response_cache.RECORD, response_cache.REPLAY):
+        return None
+    return result_store.ResultStore(store_dir)
+
+
+def get_testapi_client():
+    """
+    Get the TestAPI client shared by all the requests of the process
+    so that the connections are kept alive and reused
+    """
+    from reporting.utils import response_cache
+    from reporting.utils import testapi_client
+    url_base = get_config('testapi.url')
+    proxy = get_config('general.proxy')
+    settings = (url_base,
+                tuple(sorted(proxy.items())),
+                get_config('testapi.timeout'),
+                get_config('testapi.retries'),
+                get_config('testapi.backoff_factor'),
+                get_config('general.nb_workers'),
+                get_testapi_cache_settings())
+    with TESTAPI_CLIENTS_LOCK:
+        try:
+            return TESTAPI_CLIENTS[settings]
+        except KeyError:
+            cache_dir, cache_mode = settings[6]
+            client = testapi_client.TestApiClient(
+                url_base, proxies=proxy, timeout=settings[2],
+                retries=settings[3], backoff_factor=settings[4],
+                pool_size=settings[5],
+                cache=response_cache.ResponseCache(cache_dir, cache_mode)
+                if cache_dir else None)
+            TESTAPI_CLIENTS[settings] = client
+            return client
+
+
+def getApiResults(case, installer, version, criteria, from_date=None):
     """
     Get Results by calling the API
 
     criteria is to consider N last results for the case success criteria
+    from_date is to consider only the results started since this date
+    raise a testapi_client.TestApiError if the results cannot be retrieved
     """
-    results = json.dumps([])
-    # to remove proxy (to be removed at the end for local test only)
-    # proxy_handler = urllib2.ProxyHandler({})
-    # opener = urllib2.build_opener(proxy_handler)
-    # urllib2.install_opener(opener)
-    # url = "http://127.0.0.1:8000/results?case=" + case + \
-    #       "&period=30&installer=" + installer
     period = get_config('general.period')
-    url_base = get_config('testapi.url')
-    nb_tests = get_config('general.nb_iteration_tests_success_criteria')
+    nb_tests = None
+    if criteria:
+        nb_tests = get_config('general.nb_iteration_tests_success_criteria')
+    if get_config('testapi.streaming'):
+        # parse the answer incrementally and keep only the needed fields
+        return {'results': list(get_testapi_client().iter_results(
+            case, installer, version, period, nb_tests, from_date,
+            get_config('testapi.fields')))}
+    return get_testapi_client().get_results(case, installer, version,
+                                            period, nb_tests, from_date)
 
-    url = (url_base + "?case=" + case +
-           "&period=" + str(period) + "&installer=" + installer +
-           "&version=" + version)
+
+def _mergeStoredResults(case, installer, version, criteria, store,
+                        new_results, fetch_date):
+    # pylint: disable=too-many-arguments
+    period = get_config('general.period')
+    with store.lock(case, installer, version):
+        # loaded again, results may have been pushed during the retrieval
+        entry = store.load(case, installer, version)
+        entry = store.merge(entry, new_results,
+                            result_store.get_period_start(period))
+        entry['period'] = period
+        entry['fetched'] = max(entry.get('fetched') or "", fetch_date)
+        with metrics.span('write', output='store', testcase=case,
+                          installer=installer, version=version):
+            store.save(case, installer, version, entry)
+
+    results = entry['results']
     if criteria:
-        url += "&last=" + str(nb_tests)
-    proxy = get_config('general.proxy')
-    response = requests.get(url, proxies=proxy)
+        nb_tests = get_config('general.nb_iteration_tests_success_criteria')
+        results = results[:nb_tests]
+    return {'results': results}
+
+
+def loadStoredResults(case, installer, version, criteria, store):
+    """
+    Get Results from a result_store.ResultStore without calling the API
+    """
+    results = store.load(case, installer, version)['results']
+    if criteria:
+        nb_tests = get_config('general.nb_iteration_tests_success_criteria')
+        results = results[:nb_tests]
+    return {'results': results}
+
+
+def addStoredResults(case, installer, version, new_results, store):
+    """
+    Add results pushed by a CI job to a result_store.ResultStore
+
+    the period and the date of the last retrieval of the entry are left
+    unchanged so that the next run retrieves the results of the API
+    since its last retrieval, not since the pushed results
+    """
+    period = get_config('general.period')
+    with store.lock(case, installer, version):
+        entry = store.load(case, installer, version)
+        if not entry.get('fetched'):
+            # entry stored before the dates of retrieval
+            entry['fetched'] = entry['watermark']
+        entry = store.merge(entry, new_results,
+                            result_store.get_period_start(period))
+        with metrics.span('write', output='store', testcase=case,
+                          installer=installer, version=version):
+            store.save(case, installer, version, entry)
+    return {'results': entry['results']}
+
+
+def getStoredResults(case, installer, version, criteria, store):
+    """
+    Get Results from a result_store.ResultStore
+
+    only the results newer than the last retrieval are requested to the
+    API, they are merged in the store and the results older than the
+    period are evicted so that the answer is the one of getApiResults
+    """
+    period = get_config('general.period')
+    overlap = get_config('general.store.overlap')
+    entry = store.load(case, installer, version)
+    from_date = store.get_from_date(entry, period, overlap)
+    fetch_date = result_store.get_fetch_date()
+    new_results = getApiResults(case, installer, version, False, from_date)
+    return _mergeStoredResults(case, installer, version, criteria, store,
+                               new_results['results'], fetch_date)
+
+
+def getBatchApiResults(installer, version, from_date=None):
+    """
+    Get the results of all the cases of a version in a single call
+
+    installer may be None to get the results of all the installers
+    the pages of the answer are followed, the fields needed to dispatch
+    the results to their (case, installer, version) are always kept
+    raise a testapi_client.TestApiError if the results cannot be retrieved
+    """
+    fields = None
+    if get_config('testapi.streaming'):
+        fields = get_config('testapi.fields')
+        if fields is not None:
+            fields = list(fields) + [field for field in BATCH_FIELDS
+                                     if field not in fields]
+    return list(get_testapi_client().iter_results(
+        None, installer, version, get_config('general.period'),
+        from_date=from_date, fields=fields))
+
+
+def splitBatchResults(results, queries):
+    """
+    Dispatch the results of a batch call to the queries of their
+    (case, installer, version), the order of the results is kept
+    """
+    cells = dict(((case, installer, version), [])
+                 for case, installer, version, _ in queries)
+    for res in results:
+        cell = tuple(res.get(field) for field in BATCH_FIELDS)
+        if cell in cells:
+            cells[cell].append(res)
+    return cells
+
 
+def _getBatchResultsOrErrors(batch, queries, store=None):
+    from reporting.utils import testapi_client
+    installer, version = batch
+    from_date = None
+    answers = {}
+    if store is not None:
+        period = get_config('general.period')
+        overlap = get_config('general.store.overlap')
+        from_dates = dict((query, store.get_from_date(
+            store.load(*query[:3]), period, overlap)) for query in queries)
+        new_queries = [query for query in queries
+                       if from_dates[query] is None]
+        if len(new_queries) < len(queries):
+            # the cells never retrieved over the period are retrieved
+            # alone, the others from their oldest retrieval
+            for query in new_queries:
+                answers[query] = _getApiResultsOrError(query, store)
+            queries = [query for query in queries
+                       if from_dates[query] is not None]
+            from_date = min(from_dates[query] for query in queries)
+    fetch_date = result_store.get_fetch_date()
     try:
-        results = json.loads(response.content)
-    except Exception:  # pylint: disable=broad-except
-        print "Error when retrieving results form API"
+        with metrics.span('fetch', installer=installer, version=version):
+            results = getBatchApiResults(installer, version, from_date)
+    except testapi_client.TestApiHTTPError as exc:
+        if exc.status_code not in BATCH_UNSUPPORTED_STATUS:
+            metrics.incr('fetch_errors', len(queries), installer=installer,
+                         version=version)
+            answers.update((query, exc) for query in queries)
+            return answers
+        LOGGER.warning("Batch query not supported (%s), "
+                       "fall back to one query per case", exc)
+        answers.update((query, _getApiResultsOrError(query, store))
+                       for query in queries)
+        return answers
+    except testapi_client.TestApiError as exc:
+        metrics.incr('fetch_errors', len(queries), installer=installer,
+                     version=version)
+        answers.update((query, exc) for query in queries)
+        return answers
+
+    cells = splitBatchResults(results, queries)
+    for query in queries:
+        cell_results = cells[query[:3]]
+        if store is not None:
+            answers[query] = _mergeStoredResults(
+                *query, store=store, new_results=cell_results,
+                fetch_date=fetch_date)
+        else:
+            answers[query] = {'results': cell_results}
+    return answers
+
+
+def _getApiResultsOrError(query, store=None):
+    from reporting.utils import testapi_client
+    case, installer, version, _ = query
+    try:
+        with metrics.span('fetch', testcase=case, installer=installer,
+                          version=version):
+            if store is not None:
+                return getStoredResults(*query, store=store)
+            return getApiResults(*query)
+    except testapi_client.TestApiError as exc:
+        metrics.incr('fetch_errors', testcase=case, installer=installer,
+                     version=version)
+        return exc
+
+
+def _getQueryResultsOrError(query, store=None):
+    return {query: _getApiResultsOrError(query, store)}
+
+
+def getBatches(queries, batch):
+    """
+    Group the queries that can be retrieved in a single call
+
+    batch is 'installer' for one call per installer and version,
+    'version' for one call per version, None for one call per query
+    the queries on the last results cannot be grouped
+    return a dict {(installer, version): queries} and the other queries
+    """
+    batches = {}
+    single_queries = []
+    for query in queries:
+        _, installer, version, criteria = query
+        if batch not in ('installer', 'version') or criteria:
+            single_queries.append(query)
+            continue
+        key = (installer if batch == 'installer' else None, version)
+        batches.setdefault(key, []).append(query)
+    for key, batch_queries in list(batches.items()):
+        # a single query is not worth a batch
+        if len(batch_queries) < 2:
+            single_queries.extend(batches.pop(key))
+    return batches, single_queries
+
+
+def getApiResultsPool(queries, nb_workers=None, store=None, batch=None):
+    """
+    Get Results for a list of queries by calling the API concurrently
 
+    queries is a list of (case, installer, version, criteria) tuples
+    at most nb_workers requests are in flight at the same time
+    if a result_store.ResultStore is given only the new results are
+    requested to the API
+    if batch is given ('installer' or 'version') the results of several
+    cases are retrieved in a single call then dispatched to their queries
+    results are returned as a dict indexed by query, a query that failed
+    is associated with its testapi_client.TestApiError
+    """
+    queries = list(queries)
+    if not queries:
+        return {}
+    if nb_workers is None:
+        nb_workers = get_config('general.nb_workers')
+    batches, single_queries = getBatches(queries, batch)
+    jobs = ([(_getBatchResultsOrErrors, (key, batch_queries))
+             for key, batch_queries in batches.items()] +
+            [(_getQueryResultsOrError, (query,))
+             for query in single_queries])
+    pool = ThreadPool(max(1, min(int(nb_workers), len(jobs))))
+    try:
+        answers = pool.map(lambda job: job[0](*job[1], store=store), jobs)
+    finally:
+        pool.close()
+        pool.join()
+    results = {}
+    for answer in answers:
+        results.update(answer)
     return results
 
 
@@ -114,73 +520,53 @@ def getNbtestOk(results):
     """
     based on default value (PASS) count the number of test OK
     """
-    nb_test_ok = 0
-    for my_result in results:
-        for res_k, res_v in my_result.iteritems():
-            try:
-                if "PASS" in res_v:
-                    nb_test_ok += 1
-            except TypeError:
-                # print "Cannot retrieve test status"
-                pass
-    return nb_test_ok
+    return result_batch.count_pass(results)
 
 
-def getCaseScore(testCase, installer, version):
+def getCaseScore(testCase, installer, version, results=None):
     """
     Get Result  for a given Functest Testcase
+
+    results may be given if the N last results have already been retrieved
     """
     # retrieve raw results
-    results = getApiResults(testCase, installer, version, True)
+    if results is None:
+        results = getApiResults(testCase, installer, version, True)
     # let's concentrate on test results only
     test_results = results['results']
+    if test_results is None:
+        return 0
+    # sort results by date
+    return result_batch.get_indicator(
+        result_batch.get_sorted_passed(test_results))
 
-    # if results found, analyze them
-    if test_results is not None:
-        test_results.reverse()
-
-        scenario_results = []
-
-        # print " ---------------- "
-        # print test_results
-        # print " ---------------- "
-        # print "nb of results:" + str(len(test_results))
-
-        for res_r in test_results:
-            scenario_results.append({res_r["start_date"]: res_r["criteria"]})
-        # sort results
-        scenario_results.sort()
-        # 4 levels for the results
-        # 3: 4+ consecutive runs passing the success criteria
-        # 2: <4 successful consecutive runs but passing the criteria
-        # 1: close to pass the success criteria
-        # 0: 0% success, not passing
-        # -1: no run available
-        test_result_indicator = 0
-        nb_test_ok = getNbtestOk(scenario_results)
-
-        # print "Nb test OK (last 10 days):"+ str(nb_test_ok)
-        # check that we have at least 4 runs
-        if len(scenario_results) < 1:
-            # No results available
-            test_result_indicator = 0
-        elif nb_test_ok < 1:
-            test_result_indicator = 0
-        elif nb_test_ok < 2:
-            test_result_indicator = 1
-        else:
-            # Test the last 4 run
-            if len(scenario_results) > 3:
-                last_4_run_results = scenario_results[-4:]
-                nb_test_ok_last_4 = getNbtestOk(last_4_run_results)
-                # print "Nb test OK (last 4 run):"+ str(nb_test_ok_last_4)
-                if nb_test_ok_last_4 > 3:
-                    test_result_indicator = 3
-                else:
-                    test_result_indicator = 2
-            else:
-                test_result_indicator = 2
-    return test_result_indicator
+
+def getCaseResults(testCase, installer, version, results=None):
+    """
+    Get the scores of a given Functest Testcase from a single retrieval
+    of the results over the period
+
+    result_period and result_percent are computed on the whole period
+    result_4 is computed on the N last results of the period
+    results may be given if they have already been retrieved
+    """
+    if results is None:
+        results = getApiResults(testCase, installer, version, False)
+    test_results = results['results']
+    nb_tests_period_run = len(test_results)
+    nb_tests_period_ok = result_batch.count_pass(test_results)
+
+    # sort the results once by date and keep the N last ones
+    nb_tests = get_config('general.nb_iteration_tests_success_criteria')
+    passed = result_batch.get_sorted_passed(test_results)
+    test_result_indicator = result_batch.get_indicator(
+        passed[max(0, len(passed) - nb_tests):])
+
+    return {'result_4': str(test_result_indicator) + "/3",
+            'result_period': (str(nb_tests_period_ok) + "/" +
+                              str(nb_tests_period_run)),
+            'result_percent': getScenarioPercent(nb_tests_period_ok,
+                                                 nb_tests_period_run)}
 
 
 def getScenarioPercent(scenario_score, scenario_criteria):
@@ -199,19 +585,15 @@ def getScenarioPercent(scenario_score, scenario_criteria):
 # -----------------------------------------------------------
 
 
-def export_csv(scenario_file_name, installer, version):
+def export_csv(history, installer, version):
     """
-    Generate sub files based on scenario_history.txt
+    Generate sub files based on the history_store.HistoryStore
     """
     scenario_installer_file_name = ("./display/" + version +
                                     "/functest/scenario_history_" +
                                     installer + ".csv")
-    scenario_installer_file = open(scenario_installer_file_name, "a")
-    with open(scenario_file_name, "r") as scenario_file:
-        scenario_installer_file.write("date,scenario,installer,detail,score\n")
-        for line in scenario_file:
-            if installer in line:
-                scenario_installer_file.write(line)
+    history.export_csv(scenario_installer_file_name, version, installer,
+                       header=history_store.SCENARIO_HISTORY_HEADER)
 
 
 def generate_csv(scenario_file):
@@ -227,6 +609,7 @@ def export_pdf(pdf_path, pdf_doc_name):
     """
     Export results to pdf
     """
+    import pdfkit
     try:
         pdfkit.from_file(pdf_path, pdf_doc_name)
     except IOError:
@@ -0,0 +1,326 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Disk cache of the TestAPI answers
+
+  Each answer is recorded with its ETag and Last-Modified headers under
+  the hash of its normalized url. Depending on the mode:
+      revalidate: the cached answers are revalidated by conditional
+                  requests, the body is not sent again when unchanged
+      record:     as revalidate, the result store is bypassed so that
+                  the queries of a later replay are recorded
+      replay:     only the recorded answers are used, without any
+                  network access
+  The answers of the queries from a date (incremental retrievals of the
+  result store) are not revalidated: their url changes with each run.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+try:
+    from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+except ImportError:
+    from urllib import urlencode
+    from urlparse import parse_qsl, urlsplit, urlunsplit
+
+REVALIDATE = "revalidate"
+RECORD = "record"
+REPLAY = "replay"
+MODES = (REVALIDATE, RECORD, REPLAY)
+
+
+def normalize_url(url):
+    """
+    Url with its query parameters sorted, the same query gets the same
+    entry whatever the order of its parameters
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path,
+                       query, ''))
+
+
+class CachedResponse(object):
+    """
+    Recorded answer served in place of a requests.Response, the body is
+    read from the file of the entry
+    """
+    status_code = 200
+    from_cache = True
+
+    def __init__(self, entry, body_file):
+        self.entry = entry
+        self.headers = entry['headers']
+        self.body_file = body_file
+        self._content = None
+
+    @property
+    def content(self):
+        """
+        Body of the answer
+        """
+        if self._content is None:
+            self._content = self.body_file.read()
+        return self._content
+
+    def json(self):
+        """
+        Decode the JSON body
+        """
+        return json.loads(self.content.decode('utf-8'))
+
+    def iter_content(self, chunk_size=1):
+        """
+        Iterate over the body by chunks
+        """
+        while True:
+            chunk = self.body_file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        """
+        Close the file of the entry
+        """
+        self.body_file.close()
+
+
+class Recording(object):
+    """
+    Answer of a url written to a temporary file, the entry of the url
+    is replaced once the recording is committed
+    """
+
+    def __init__(self, path, header):
+        self.path = path
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # created meanwhile by another worker
+                pass
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self.tmp_file = os.fdopen(fd, "wb")
+        try:
+            self.write(json.dumps(header).encode('utf-8') + b"\n")
+        except Exception:
+            self.abort()
+            raise
+
+    def write(self, data):
+        """
+        Write a part of the body
+        """
+        self.tmp_file.write(data)
+
+    def commit(self):
+        """
+        Atomically replace the entry by the recorded answer
+        """
+        try:
+            self.tmp_file.close()
+            os.rename(self.tmp_path, self.path)
+        except Exception:
+            self.abort()
+            raise
+
+    def abort(self):
+        """
+        Drop the recorded answer
+        """
+        self.tmp_file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class RecordingResponse(object):
+    """
+    Streamed requests.Response recorded while it is read
+    """
+
+    def __init__(self, response, cache, url):
+        self.response = response
+        self.cache = cache
+        self.url = url
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    def iter_content(self, chunk_size=1):
+        """
+        Iterate over the body by chunks, each chunk is written to the
+        recording as it is read, the recording is committed when the
+        last chunk is read and dropped if the body is not read entirely
+        """
+        recording = self.cache.record(self.url, self.headers)
+        committed = False
+        try:
+            for chunk in self.response.iter_content(chunk_size=chunk_size):
+                recording.write(chunk)
+                yield chunk
+            recording.commit()
+            committed = True
+        finally:
+            if not committed:
+                recording.abort()
+
+    def close(self):
+        """
+        Release the connection of the response
+        """
+        self.response.close()
+
+
+class ResponseCache(object):
+    """
+    TestAPI answers recorded in a directory
+    """
+
+    def __init__(self, cache_dir, mode=REVALIDATE):
+        if mode not in MODES:
+            raise ValueError("Unknown cache mode %s, modes: %s" % (
+                mode, ", ".join(MODES)))
+        self.cache_dir = cache_dir
+        self.mode = mode
+
+    @property
+    def replay(self):
+        """
+        Whether the answers are only read from the cache
+        """
+        return self.mode == REPLAY
+
+    def is_cached(self, url):
+        """
+        Whether the answer of a url is cached, not the answers of the
+        queries from a date when they are revalidated
+        """
+        if self.mode != REVALIDATE:
+            return True
+        return 'from' not in dict(parse_qsl(urlsplit(url).query))
+
+    def get_path(self, url):
+        """
+        Path of the entry of a url
+        """
+        key = hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + ".cache")
+
+    def open(self, url):
+        """
+        Get the CachedResponse of a url, None if not recorded
+        """
+        try:
+            my_file = open(self.get_path(url), "rb")
+        except IOError:
+            return None
+        try:
+            entry = json.loads(my_file.readline().decode('utf-8'))
+        except ValueError:
+            my_file.close()
+            return None
+        return CachedResponse(entry, my_file)
+
+    def load(self, url):
+        """
+        Get the entry of a url, None if not recorded
+        an entry is a dict with the url, the validators and the body
+        """
+        cached = self.open(url)
+        if cached is None:
+            return None
+        try:
+            return dict(cached.entry, body=cached.content)
+        finally:
+            cached.close()
+
+    def record(self, url, headers):
+        """
+        Start recording the answer of a url, the headers line and the
+        body are written in a single file
+        return a Recording
+        """
+        header = {'url': normalize_url(url),
+                  'headers': dict((name, headers[name])
+                                  for name in ('ETag', 'Last-Modified')
+                                  if headers.get(name))}
+        return Recording(self.get_path(url), header)
+
+    def save(self, url, headers, body):
+        """
+        Atomically record the answer of a url
+        """
+        recording = self.record(url, headers)
+        try:
+            recording.write(body)
+        except Exception:
+            recording.abort()
+            raise
+        recording.commit()
+
+    def touch(self, url):
+        """
+        Mark the entry of a url as used, its answer being unchanged
+        """
+        try:
+            os.utime(self.get_path(url), None)
+        except OSError:
+            pass
+
+    def prune(self, max_age, max_size=None):
+        """
+        Remove the entries not used for max_age days, then the least
+        recently used ones while the entries exceed max_size MB
+        return the nb of entries removed
+        """
+        oldest = time.time() - max_age * 86400
+        entries = []
+        for directory, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                path = os.path.join(directory, file_name)
+                try:
+                    entries.append((os.path.getmtime(path),
+                                    os.path.getsize(path), path))
+                except OSError:
+                    # removed meanwhile
+                    pass
+        entries.sort(reverse=True)
+        size = sum(entry[1] for entry in entries)
+        nb_removed = 0
+        while entries and (entries[-1][0] < oldest or (
+                max_size is not None and size > max_size * 1024 * 1024)):
+            _, entry_size, path = entries.pop()
+            size -= entry_size
+            try:
+                os.remove(path)
+                nb_removed += 1
+            except OSError:
+                pass
+        return nb_removed
+
+    @staticmethod
+    def get_conditional_headers(entry):
+        """
+        Headers of the request revalidating an entry
+        """
+        if entry is None:
+            return {}
+        conditions = {}
+        if entry['headers'].get('ETag'):
+            conditions['If-None-Match'] = entry['headers']['ETag']
+        if entry['headers'].get('Last-Modified'):
+            conditions['If-Modified-Since'] = entry['headers'][
+                'Last-Modified']
+        return conditions
@@ -0,0 +1,69 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Scores of the TestAPI results
+
+  The scores of a cell are computed in one pass over its result
+  documents: count_pass, get_sorted_passed and get_indicator.
+"""
+
+
+def has_pass(value):
+    """
+    Check if a value contains PASS, like the TestAPI criteria
+    """
+    try:
+        return "PASS" in value
+    except TypeError:
+        return False
+
+
+def count_pass(results):
+    """
+    Count the PASS values of all the fields of result documents
+    """
+    nb_test_ok = 0
+    for res in results:
+        for value in res.values():
+            try:
+                if "PASS" in value:
+                    nb_test_ok += 1
+            except TypeError:
+                pass
+    return nb_test_ok
+
+
+def get_sorted_passed(results):
+    """
+    Get the PASS flags of the criteria of result documents sorted by
+    start date (then criteria)
+    """
+    return [has_pass(criteria) for _, criteria in sorted(
+        (res.get('start_date'), res.get('criteria')) for res in results)]
+
+
+def get_indicator(passed):
+    """
+    Get the 0-3 indicator from the PASS flags of results sorted by
+    start date
+    """
+    # 4 levels for the results
+    # 3: 4+ consecutive runs passing the success criteria
+    # 2: <4 successful consecutive runs but passing the criteria
+    # 1: close to pass the success criteria
+    # 0: 0% success, not passing
+    nb_test_ok = sum(passed)
+    if len(passed) < 1 or nb_test_ok < 1:
+        return 0
+    if nb_test_ok < 2:
+        return 1
+    # Test the last 4 run
+    if len(passed) > 3 and sum(passed[-4:]) > 3:
+        return 3
+    return 2
@@ -0,0 +1,152 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Local store of the TestAPI results
+
+  The raw result documents of each (case, installer, version) are kept
+  in a json file with the start_date of the newest result (watermark)
+  and the date of their last retrieval (fetched), so that only the
+  results newer than the last retrieval are retrieved, even for the
+  cells without results
+  The entry of a cell is loaded, merged and saved under the lock of the
+  cell so that a retrieval and an ingestion do not overwrite each other
+"""
+import datetime
+import json
+import os
+import tempfile
+import threading
+# datetime.strptime is not thread safe until _strptime is imported
+import _strptime  # noqa pylint: disable=unused-import
+
+# locks of the entries, shared by the stores of the same directory
+LOCKS = {}
+LOCKS_LOCK = threading.Lock()
+
+
+def get_period_start(period, now=None):
+    """
+    Oldest start_date of the period, computed like the TestAPI does
+    the start_date of the results are in UTC
+    """
+    if now is None:
+        now = datetime.datetime.utcnow()
+    return str(now - datetime.timedelta(days=period))
+
+
+def get_fetch_date(now=None):
+    """
+    Date of a retrieval, in the format of the start_date of the results
+    """
+    if now is None:
+        now = datetime.datetime.utcnow()
+    return str(now)
+
+
+def get_result_id(result):
+    """
+    Identifier of a result document
+    """
+    return result.get('_id') or result.get('start_date')
+
+
+class ResultStore(object):
+    """
+    Results of the (case, installer, version) persisted on disk
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+
+    def lock(self, case, installer, version):
+        """
+        Lock of the entry of a (case, installer, version) in the process
+        """
+        with LOCKS_LOCK:
+            return LOCKS.setdefault(
+                (os.path.abspath(self.store_dir), case, installer, version),
+                threading.Lock())
+
+    def get_path(self, case, installer, version):
+        """
+        Path of the file of a (case, installer, version)
+        """
+        return os.path.join(self.store_dir, version, installer,
+                            case + ".json")
+
+    def load(self, case, installer, version):
+        """
+        Get the entry of a (case, installer, version)
+        an entry is a dict with the period, the watermark, the date of
+        the last retrieval and the results
+        """
+        try:
+            with open(self.get_path(case, installer, version)) as my_file:
+                return json.load(my_file)
+        except (IOError, ValueError):
+            return {'period': None, 'watermark': None, 'fetched': None,
+                    'results': []}
+
+    def save(self, case, installer, version, entry):
+        """
+        Atomically save the entry of a (case, installer, version)
+        """
+        path = self.get_path(case, installer, version)
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # created meanwhile by another worker
+                pass
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as my_file:
+            json.dump(entry, my_file)
+        os.rename(tmp_path, path)
+
+    @staticmethod
+    def merge(entry, new_results, period_start):
+        """
+        Merge new results in an entry and evict the results older
+        than the beginning of the period
+        results are kept sorted from the newest to the oldest like the
+        TestAPI answers
+        """
+        results = dict((get_result_id(res), res) for res in entry['results'])
+        for res in new_results:
+            results[get_result_id(res)] = res
+        results = [res for res in results.values()
+                   if res['start_date'] >= period_start]
+        results.sort(key=lambda res: res['start_date'], reverse=True)
+        entry['results'] = results
+        if results:
+            entry['watermark'] = results[0]['start_date']
+        else:
+            entry['watermark'] = None
+        return entry
+
+    @staticmethod
+    def get_from_date(entry, period, overlap):
+        """
+        Date from which the results must be retrieved, None to retrieve
+        the whole period
+        results are retrieved again overlap hours before the last
+        retrieval (the watermark for the entries stored without its
+        date) as CI jobs may push their results after newer ones
+        """
+        watermark = entry.get('fetched') or entry['watermark']
+        if entry['period'] != period or watermark is None:
+            return None
+        watermark = watermark[:19]
+        try:
+            watermark = datetime.datetime.strptime(watermark,
+                                                   "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+        return str(watermark - datetime.timedelta(hours=overlap))
@@ -0,0 +1,176 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Static output of the display directory served by nginx
+
+  The CSS/JS trees are published with fingerprinted names so that they
+  can be cached forever by the browsers, the pages reference them
+  through the asset manifest.
+  The text outputs are precompressed (.gz, and .br if the brotli module
+  is installed) so that nginx serves them with gzip_static.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+
+from reporting.utils import render
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+LOGGER = logging.getLogger(__name__)
+
+ASSET_MANIFEST = "assets.json"
+
+COMPRESSED_EXTENSIONS = ('.html', '.csv', '.json', '.txt', '.css', '.js',
+                         '.svg')
+
+# minimum size of a file worth compressing
+MIN_SIZE = 256
+
+FINGERPRINT = re.compile(r'\.[0-9a-f]{8}(?=\.[^.]+$)')
+
+
+def get_fingerprinted_name(path, content_hash):
+    """
+    Name of an asset with the fingerprint of its content
+    """
+    root, ext = os.path.splitext(path)
+    return "%s.%s%s" % (root, content_hash[:8], ext)
+
+
+def _is_up_to_date(path, source):
+    return (os.path.exists(path) and
+            os.path.getmtime(path) >= os.path.getmtime(source))
+
+
+def _remove_old_fingerprints(path, fingerprinted):
+    directory = os.path.dirname(path)
+    root, ext = os.path.splitext(os.path.basename(path))
+    for name in os.listdir(directory):
+        if (name != os.path.basename(fingerprinted) and
+                FINGERPRINT.sub("", name) == root + ext and
+                name != root + ext):
+            os.remove(os.path.join(directory, name))
+
+
+def publish_assets(asset_dirs, display_dir):
+    """
+    Copy the asset trees in the display directory, each file with its
+    name and with its fingerprinted name
+
+    return the asset manifest {path: fingerprinted path}, the paths are
+    relative to the display directory, the manifest is also written
+    in the display directory
+    """
+    assets = {}
+    for asset_dir in asset_dirs:
+        for directory, _, names in os.walk(asset_dir):
+            for name in names:
+                source = os.path.join(directory, name)
+                path = os.path.relpath(source, os.path.dirname(
+                    os.path.normpath(asset_dir)) or ".")
+                target = os.path.join(display_dir, path)
+                if not os.path.exists(os.path.dirname(target)):
+                    os.makedirs(os.path.dirname(target))
+                if not _is_up_to_date(target, source):
+                    shutil.copy2(source, target)
+                with open(source, "rb") as my_file:
+                    content_hash = hashlib.sha256(
+                        my_file.read()).hexdigest()
+                fingerprinted = get_fingerprinted_name(target, content_hash)
+                if not os.path.exists(fingerprinted):
+                    shutil.copy2(source, fingerprinted)
+                    _remove_old_fingerprints(target, fingerprinted)
+                assets[path.replace(os.sep, "/")] = os.path.relpath(
+                    fingerprinted, display_dir).replace(os.sep, "/")
+    if not os.path.exists(display_dir):
+        os.makedirs(display_dir)
+    manifest_file = os.path.join(display_dir, ASSET_MANIFEST)
+    content = json.dumps(assets, indent=2, sort_keys=True)
+    try:
+        with open(manifest_file) as my_file:
+            changed = my_file.read() != content
+    except IOError:
+        changed = True
+    if changed:
+        render.write_atomic(manifest_file, content)
+    return assets
+
+
+def precompress_file(path, use_brotli=True):
+    """
+    Write the .gz (and .br) siblings of a file
+    return the list of the written files
+    """
+    with open(path, "rb") as my_file:
+        content = my_file.read()
+    mtime = os.path.getmtime(path)
+    written = []
+    gz_path = path + ".gz"
+    tmp_path = gz_path + ".tmp"
+    with open(tmp_path, "wb") as raw_file:
+        # the name and the mtime are left out of the gzip header
+        gz_file = gzip.GzipFile("", "wb", 9, raw_file, 0)
+        gz_file.write(content)
+        gz_file.close()
+    os.rename(tmp_path, gz_path)
+    written.append(gz_path)
+    if use_brotli and brotli is not None:
+        br_path = path + ".br"
+        render.write_atomic(br_path, brotli.compress(content))
+        written.append(br_path)
+    # nginx serves the precompressed files with the mtime of the source
+    for compressed in written:
+        os.chmod(compressed, 0o644)
+        os.utime(compressed, (mtime, mtime))
+    return written
+
+
+def precompress_tree(directory, use_brotli=True):
+    """
+    Precompress the text outputs of a directory which changed since
+    their last compression
+    return the list of the compressed files
+    """
+    compressed = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            if (not name.endswith(COMPRESSED_EXTENSIONS) or
+                    os.path.getsize(path) < MIN_SIZE):
+                continue
+            gz_path = path + ".gz"
+            # the mtimes are set with a microsecond precision
+            if (os.path.exists(gz_path) and abs(
+                    os.path.getmtime(gz_path) - os.path.getmtime(path)) <
+                    0.001):
+                continue
+            precompress_file(path, use_brotli)
+            compressed.append(path)
+    LOGGER.debug("%s files precompressed in %s", len(compressed), directory)
+    return compressed
+
+
+def load_assets(display_dir):
+    """
+    Get the asset manifest written by the last publish_assets, empty if
+    the assets were never published
+    """
+    try:
+        with open(os.path.join(display_dir, ASSET_MANIFEST)) as my_file:
+            return json.load(my_file)
+    except (IOError, ValueError):
+        return {}
@@ -0,0 +1,186 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Static SVG charts of the status pages
+
+  The gauge of the score and the trend line of each testcase are drawn
+  when the page is generated, with the geometry of js/gauge.js and
+  js/trend.js, so that the pages need no JS to show them and are
+  exported as is to PDF
+"""
+import colorsys
+import datetime
+import math
+
+from xml.sax.saxutils import escape
+
+# js/gauge.js configuration
+GAUGE_WIDTH = 250
+GAUGE_HEIGHT = 100
+GAUGE_RADIUS = 75
+GAUGE_RING_INSET = 20
+GAUGE_RING_WIDTH = 40
+GAUGE_SECTIONS = 7
+GAUGE_TICKS = (0, 20, 40, 60, 80, 100)
+GAUGE_LABEL_INSET = 10
+GAUGE_MIN_ANGLE = -90
+GAUGE_MAX_ANGLE = 90
+POINTER_WIDTH = 7
+POINTER_TAIL_LENGTH = 5
+POINTER_HEAD_LENGTH = 60
+
+# js/trend.js configuration
+TREND_WIDTH = 300
+TREND_HEIGHT = 130
+TREND_MARGIN = {'top': 20, 'right': 30, 'bottom': 50, 'left': 40}
+
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def _number(value):
+    # shortest form of a coordinate rounded to 0.1
+    text = ("%.1f" % value).rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def get_gauge_color(ratio):
+    """
+    Color of a gauge section, from red (0) to green (1) through the hue
+    like d3.interpolateHsl
+    """
+    red, green, blue = colorsys.hls_to_rgb(ratio / 3.0, 0.5, 1.0)
+    return "#%02x%02x%02x" % tuple(int(round(color * 255))
+                                   for color in (red, green, blue))
+
+
+def get_gauge_angle(score):
+    """
+    Angle in degrees of the pointer of a score between 0 and 100
+    """
+    score = min(max(score, 0.0), 100.0)
+    return GAUGE_MIN_ANGLE + score / 100.0 * (GAUGE_MAX_ANGLE -
+                                              GAUGE_MIN_ANGLE)
+
+
+def _get_arc_path(start_angle, end_angle, inner_radius, outer_radius):
+    # angles in degrees clockwise from 12 o'clock, like d3.svg.arc
+    def point(radius, angle):
+        return (radius * math.sin(math.radians(angle)),
+                -radius * math.cos(math.radians(angle)))
+    large = 1 if end_angle - start_angle > 180 else 0
+    points = (point(outer_radius, start_angle),
+              point(outer_radius, end_angle),
+              point(inner_radius, end_angle),
+              point(inner_radius, start_angle))
+    return "M%s,%sA%s,%s 0 %s,1 %s,%sL%s,%sA%s,%s 0 %s,0 %s,%sZ" % tuple(
+        _number(value) for value in (
+            points[0] + (outer_radius, outer_radius, large) + points[1] +
+            points[2] + (inner_radius, inner_radius, large) + points[3]))
+
+
+def get_gauge_svg(score):
+    """
+    SVG gauge of a score between 0 and 100
+    """
+    try:
+        score = float(score)
+    except (TypeError, ValueError):
+        score = 0.0
+    outer_radius = GAUGE_RADIUS - GAUGE_RING_INSET
+    inner_radius = outer_radius - GAUGE_RING_WIDTH
+    section = float(GAUGE_MAX_ANGLE - GAUGE_MIN_ANGLE) / GAUGE_SECTIONS
+    center = 'translate(%s,%s)' % (GAUGE_RADIUS, GAUGE_RADIUS)
+    parts = ['<svg class="gauge" xmlns="http://www.w3.org/2000/svg" '
+             'width="%s" height="%s" role="img">' % (GAUGE_WIDTH,
+                                                     GAUGE_HEIGHT),
+             '<title>%s%%</title>' % _number(score),
+             '<g class="arc" transform="%s">' % center]
+    for index in range(GAUGE_SECTIONS):
+        parts.append('<path fill="%s" d="%s"/>' % (
+            get_gauge_color(float(index) / GAUGE_SECTIONS),
+            _get_arc_path(GAUGE_MIN_ANGLE + index * section,
+                          GAUGE_MIN_ANGLE + (index + 1) * section,
+                          inner_radius, outer_radius)))
+    parts.append('</g><g class="label" transform="%s" text-anchor="middle" '
+                 'font-size="14" font-weight="bold" fill="#666">' % center)
+    for tick in GAUGE_TICKS:
+        parts.append('<text transform="rotate(%s) translate(0,%s)">%s'
+                     '</text>' % (_number(get_gauge_angle(tick)),
+                                  GAUGE_LABEL_INSET - GAUGE_RADIUS, tick))
+    parts.append(
+        '</g><g class="pointer" transform="%s" fill="#e85116" '
+        'stroke="#b64011"><path d="M%s,0L0,%sL%s,0L0,%sZ" '
+        'transform="rotate(%s)"/></g></svg>' % (
+            center, _number(POINTER_WIDTH / 2.0), -POINTER_HEAD_LENGTH,
+            _number(-POINTER_WIDTH / 2.0), POINTER_TAIL_LENGTH,
+            _number(get_gauge_angle(score))))
+    return "".join(parts)
+
+
+def _parse_date(date):
+    return datetime.datetime.strptime(date[:16], DATE_FORMAT)
+
+
+def get_trend_svg(points):
+    """
+    SVG trend line of the [date, score] points sorted by date
+    the points whose date or score cannot be parsed are skipped
+    empty without points
+    """
+    parsed_points = []
+    for date, score in points:
+        try:
+            parsed_points.append((_parse_date(date), float(score)))
+        except (TypeError, ValueError):
+            pass
+    points = parsed_points
+    if not points:
+        return ""
+    width = TREND_WIDTH - TREND_MARGIN['left'] - TREND_MARGIN['right']
+    height = TREND_HEIGHT - TREND_MARGIN['top'] - TREND_MARGIN['bottom']
+    first, last = points[0][0], points[-1][0]
+    duration = (last - first).total_seconds()
+    max_score = max(score for _, score in points) or 100.0
+
+    def get_x(date):
+        if not duration:
+            return width / 2.0
+        return (date - first).total_seconds() / duration * width
+
+    def get_y(score):
+        return height - score / max_score * height
+
+    coordinates = [(_number(get_x(date)), _number(get_y(score)))
+                   for date, score in points]
+    parts = ['<svg class="trend" xmlns="http://www.w3.org/2000/svg" '
+             'width="%s" height="%s" role="img">' % (TREND_WIDTH,
+                                                     TREND_HEIGHT),
+             '<g transform="translate(%s,%s)" font-size="10">' % (
+                 TREND_MARGIN['left'], TREND_MARGIN['top']),
+             '<g class="x axis" transform="translate(0,%s)" '
+             'text-anchor="middle"><path d="M0,0H%s" stroke="#000" '
+             'fill="none"/>' % (height, width)]
+    for date in sorted(set((first, last))):
+        parts.append('<text x="%s" y="15">%s</text>' % (
+            _number(get_x(date)), date.strftime("%m-%d")))
+    parts.append('</g><g class="y axis" text-anchor="end">'
+                 '<path d="M0,0V%s" stroke="#000" fill="none"/>' % height)
+    for score in (0, max_score):
+        parts.append('<text x="-4" y="%s" dy=".32em">%s</text>' % (
+            _number(get_y(score)), _number(score)))
+    parts.append('</g><path class="line" d="M%s" stroke="steelblue" '
+                 'fill="none"/>' % "L".join(
+                     ",".join(coordinate) for coordinate in coordinates))
+    for (date, score), (x_coord, y_coord) in zip(points, coordinates):
+        parts.append('<circle r="2.5" cx="%s" cy="%s"><title>%s</title>'
+                     '</circle>' % (x_coord, y_coord, escape(
+                         "%s: %s%%" % (date.strftime(DATE_FORMAT),
+                                       _number(score)))))
+    parts.append('</g></svg>')
+    return "".join(parts)
@@ -0,0 +1,334 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  TestAPI HTTP client
+
+  Keep-alive connections are pooled in a requests Session, every request
+  is sent with a timeout and retried with an exponential backoff on
+  connection errors, timeouts, 5xx answers and invalid JSON bodies
+
+  The results can also be streamed: the results array is parsed
+  incrementally, only the projected fields of each result are kept and
+  the next pages are requested when the previous one is consumed
+
+  Leaving the case (or the installer) out of a query retrieves the
+  results of several cells in a single call
+
+  The nb of requests, the nb of bytes read and the time spent waiting
+  for the TestAPI (request) or decoding its answers (parse) are recorded
+  in the metrics of the process
+
+  With a response_cache.ResponseCache the answers are recorded on disk
+  and revalidated by conditional requests, or replayed without network
+"""
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import quote
+
+from reporting.utils import json_stream
+from reporting.utils import metrics
+from reporting.utils import response_cache
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TestApiError(Exception):
+    """
+    Base error when retrieving results from the TestAPI
+    """
+
+    def __init__(self, message, url=None):
+        super(TestApiError, self).__init__(message)
+        self.url = url
+
+
+class TestApiConnectionError(TestApiError):
+    """
+    The TestAPI cannot be reached
+    """
+
+
+class TestApiTimeout(TestApiError):
+    """
+    The TestAPI did not answer within the timeout
+    """
+
+
+class TestApiNotRecorded(TestApiError):
+    """
+    The answer of a replayed request was not recorded
+    """
+
+
+class TestApiHTTPError(TestApiError):
+    """
+    The TestAPI answered with an HTTP error status
+    """
+
+    def __init__(self, message, url=None, status_code=None):
+        super(TestApiHTTPError, self).__init__(message, url)
+        self.status_code = status_code
+
+
+class TestApiBadResponse(TestApiError):
+    """
+    The TestAPI answer is not valid JSON
+    """
+
+
+class TestApiClient(object):
+    """
+    Client of the TestAPI results endpoint
+    """
+    # pylint: disable=too-many-arguments
+
+    RETRY_STATUS = (500, 502, 503, 504)
+
+    CHUNK_SIZE = 65536
+
+    def __init__(self, url, proxies=None, timeout=10, retries=3,
+                 backoff_factor=0.5, pool_size=10, cache=None):
+        self.url = url
+        self.cache = cache
+        self.proxies = proxies or {}
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept': 'application/json',
+                                     'Accept-Encoding': 'gzip, deflate'})
+
+    def close(self):
+        """
+        Close the pooled connections
+        """
+        self.session.close()
+
+    def build_url(self, case, installer, version, period, last=None,
+                  from_date=None, page=None):
+        """
+        Build the url of the results of a case over a period
+        case, installer or version may be None to get the results of
+        all the cases, installers or versions in one call
+        """
+        # pylint: disable=too-many-arguments
+        params = [('case', case), ('period', period),
+                  ('installer', installer), ('version', version)]
+        url = self.url + "?" + "&".join(
+            key + "=" + str(value) for key, value in params
+            if value is not None)
+        if last:
+            url += "&last=" + str(last)
+        if from_date:
+            url += "&from=" + quote(from_date)
+        if page:
+            url += "&page=" + str(page)
+        return url
+
+    def _open(self, url, stream=False):
+        cache = self.cache
+        if cache is not None and not cache.is_cached(url):
+            cache = None
+        cached = None
+        if cache is not None:
+            cached = cache.open(url)
+            if cache.replay:
+                if cached is None:
+                    metrics.incr('testapi_cache', result='miss')
+                    raise TestApiNotRecorded("No recorded answer", url)
+                metrics.incr('testapi_cache', result='replay')
+                return cached
+        try:
+            response = self._request(url, stream, cached)
+        except Exception:
+            if cached is not None:
+                cached.close()
+            raise
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            cache.touch(url)
+            metrics.incr('testapi_cache', result='not_modified')
+            return cached
+        if cached is not None:
+            cached.close()
+        if response.status_code >= 400:
+            response.close()
+            raise TestApiHTTPError("HTTP error %s" % response.status_code,
+                                   url, response.status_code)
+        if cache is None:
+            return response
+        metrics.incr('testapi_cache', result='miss' if cached is None
+                     else 'modified')
+        if stream:
+            # recorded while the body is read
+            return response_cache.RecordingResponse(response, cache, url)
+        cache.save(url, response.headers, response.content)
+        return response
+
+    def _request(self, url, stream, cached):
+        headers = {}
+        if cached is not None:
+            headers = response_cache.ResponseCache.get_conditional_headers(
+                cached.entry)
+        try:
+            response = self.session.get(url, proxies=self.proxies,
+                                        timeout=self.timeout, stream=stream,
+                                        headers=headers)
+        except requests.exceptions.Timeout as exc:
+            metrics.incr('testapi_errors', error='timeout')
+            raise TestApiTimeout(str(exc), url)
+        except requests.exceptions.RequestException as exc:
+            metrics.incr('testapi_errors', error='connection')
+            raise TestApiConnectionError(str(exc), url)
+        metrics.incr('testapi_requests', status=response.status_code)
+        return response
+
+    def _get_once(self, url):
+        start = time.time()
+        response = self._open(url)
+        try:
+            if not getattr(response, 'from_cache', False):
+                metrics.incr('testapi_bytes', len(response.content))
+            metrics.observe('request', time.time() - start)
+            try:
+                with metrics.span('parse'):
+                    return response.json()
+            except ValueError as exc:
+                metrics.incr('testapi_errors', error='bad_response')
+                raise TestApiBadResponse("Invalid JSON answer: %s" % exc,
+                                         url)
+        finally:
+            response.close()
+
+    def _is_retryable(self, error):
+        if isinstance(error, TestApiHTTPError):
+            return error.status_code in self.RETRY_STATUS
+        return not isinstance(error, TestApiNotRecorded)
+
+    def _retry(self, func, url):
+        attempt = 0
+        while True:
+            try:
+                return func(url)
+            except TestApiError as exc:
+                if attempt >= self.retries or not self._is_retryable(exc):
+                    raise
+                delay = self.backoff_factor * (2 ** attempt)
+                LOGGER.warning("TestAPI request %s failed (%s), "
+                               "retry in %ss", url, exc, delay)
+                time.sleep(delay)
+                attempt += 1
+
+    def get(self, url):
+        """
+        Get the JSON document of a url, retrying on transient errors
+        """
+        return self._retry(self._get_once, url)
+
+    def get_results(self, case, installer, version, period, last=None,
+                    from_date=None):
+        """
+        Get the results of a case over a period
+        last is to consider only the N last results
+        from_date is to consider only the results started since this date
+        the pages of the answer are followed, the document of the first
+        page is returned with the results of all the pages
+        """
+        # pylint: disable=too-many-arguments
+        document = self.get(self.build_url(case, installer, version,
+                                           period, last, from_date))
+        pagination = document.get('pagination') or {}
+        total_pages = pagination.get('total_pages') or 1
+        for page in range(2, total_pages + 1):
+            document['results'].extend(self.get(self.build_url(
+                case, installer, version, period, last, from_date,
+                page))['results'])
+        return document
+
+    def _read_chunks(self, response, timings):
+        # timings[0] is the time spent waiting for the chunks
+        chunks = response.iter_content(chunk_size=self.CHUNK_SIZE)
+        while True:
+            start = time.time()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                timings[0] += time.time() - start
+            if not getattr(response, 'from_cache', False):
+                metrics.incr('testapi_bytes', len(chunk))
+            yield chunk
+
+    def _iter_page(self, url, fields, pagination):
+        start = time.time()
+        response = self._retry(lambda url_: self._open(url_, stream=True),
+                               url)
+        # time waiting for the TestAPI and time spent in the generator,
+        # the time spent by the caller between two results is left out
+        open_time = time.time() - start
+        timings = [open_time, 0.0]
+        try:
+            chunks = self._read_chunks(response, timings)
+            start = time.time()
+            for key, value in json_stream.iter_object(chunks, 'results'):
+                if key is json_stream.ITEM:
+                    if fields is not None:
+                        value = dict((field, value.get(field))
+                                     for field in fields)
+                    timings[1] += time.time() - start
+                    yield value
+                    start = time.time()
+                elif key == 'pagination' and isinstance(value, dict):
+                    pagination.update(value)
+            # the end of the body, recorded by a cache once entirely read
+            for _ in chunks:
+                pass
+            timings[1] += time.time() - start
+        except json_stream.JSONStreamError as exc:
+            metrics.incr('testapi_errors', error='bad_response')
+            raise TestApiBadResponse("Invalid JSON answer: %s" % exc, url)
+        except requests.exceptions.RequestException as exc:
+            metrics.incr('testapi_errors', error='connection')
+            raise TestApiConnectionError(str(exc), url)
+        finally:
+            response.close()
+            metrics.observe('request', timings[0])
+            # the time spent in the generator includes the chunk waits
+            metrics.observe('parse', max(
+                0.0, timings[1] - (timings[0] - open_time)))
+
+    def iter_results(self, case, installer, version, period, last=None,
+                     from_date=None, fields=None):
+        """
+        Iterate over the results of a case over a period
+
+        the answers are parsed incrementally, only the fields of each
+        result are kept (all of them if None) and the next page is
+        requested once the results of the previous one are consumed
+        """
+        # pylint: disable=too-many-arguments
+        page = 1
+        while True:
+            pagination = {}
+            url = self.build_url(case, installer, version, period, last,
+                                 from_date, page if page > 1 else None)
+            for result in self._iter_page(url, fields, pagination):
+                yield result
+            total_pages = pagination.get('total_pages') or 1
+            if page >= total_pages:
+                return
+            page += 1
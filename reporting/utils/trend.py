@@ -0,0 +1,97 @@
+#!/usr/bin/python
+#
+# This program and the accompanying materials
+# are made available under the terms of the Apache License, Version 2.0
+# which accompanies this distribution, and is available at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+"""
+  Trend lines of the testcases
+
+  Each status page loads one small json file per testcase with the
+  [date, score] points of its trend line over the display window
+  instead of the full history of all the installers and testcases
+  The same points are drawn as static SVG in the status page
+"""
+import datetime
+import json
+import os
+
+from reporting.utils import render
+
+
+def get_trend_file_name(installer, testcase):
+    """
+    Name of the trend file of an (installer, testcase)
+    """
+    return "trend-" + installer + "-" + testcase + ".json"
+
+
+def get_window_start(window, now=None):
+    """
+    Oldest date of the display window, in the history date format
+    """
+    if now is None:
+        now = datetime.datetime.now()
+    return (now - datetime.timedelta(days=window)).strftime("%Y-%m-%d %H:%M")
+
+
+def downsample(points, max_points):
+    """
+    Reduce a list of [date, score] points sorted by date to max_points
+    each point is the mean score of consecutive points at the date of
+    the last one
+    """
+    if max_points < 1 or len(points) <= max_points:
+        return points
+    step = -(-len(points) // max_points)
+    sampled = []
+    for index in range(0, len(points), step):
+        bucket = points[index:index + step]
+        score = sum(point[1] for point in bucket) / len(bucket)
+        sampled.append([bucket[-1][0], round(score, 1)])
+    return sampled
+
+
+def get_trend(history, version, installer, testcase, window, max_points):
+    """
+    Get the [date, score] points of the trend line of a testcase
+    """
+    rows = history.get_history(version, installer, testcase,
+                               since=get_window_start(window))
+    points = []
+    for row in rows:
+        try:
+            points.append([row[0], round(float(row[4]), 1)])
+        except ValueError:
+            pass
+    return downsample(points, max_points)
+
+
+def export_trend(history, directory, version, installer, testcase,
+                 window, max_points):
+    """
+    Write the trend file of a testcase next to the status page
+    return the trend file name
+    """
+    # pylint: disable=too-many-arguments
+    file_name = get_trend_file_name(installer, testcase)
+    points = get_trend(history, version, installer, testcase,
+                       window, max_points)
+    render.write_atomic(os.path.join(directory, file_name),
+                        json.dumps(points, separators=(',', ':')))
+    return file_name
+
+
+def load_trend(directory, installer, testcase):
+    """
+    Get the [date, score] points of the trend file of a testcase
+    empty if not exported
+    """
+    try:
+        with open(os.path.join(directory, get_trend_file_name(
+                installer, testcase))) as my_file:
+            return json.load(my_file)
+    except (IOError, ValueError):
+        return []